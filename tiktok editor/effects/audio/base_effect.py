@@ -4,6 +4,10 @@ class BaseAudioEffect:
     def __init__(self, intensity=0.5):
         self.intensity = intensity
     
+    def params(self):
+        """Settings that define the output, used to build cache keys"""
+        return {'intensity': self.intensity}
+    
     def set_intensity(self, intensity):
         self.intensity = intensity
     
@@ -1,6 +1,8 @@
 from .base_effect import BaseAudioEffect
 import numpy as np
-from scipy import signal
+from utils.lazy_import import lazy_import
+
+signal = lazy_import('scipy.signal')
 
 class BassBoost(BaseAudioEffect):
     def __init__(self, intensity=0.5):
@@ -1,5 +1,7 @@
 import numpy as np
-from scipy import signal
+from utils.lazy_import import lazy_import
+
+signal = lazy_import('scipy.signal')
 
 class AudioEffect:
     def __init__(self):
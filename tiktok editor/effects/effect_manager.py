@@ -68,54 +68,40 @@ class EffectManager:
             icon="crop.png"
         )
         
-        self.register_effect(
-            name="Blur",
-            category=EffectCategory.VIDEO,
-            class_ref=Blur,
-            description="Ajouter un effet de flou",
-            parameters=[
-                EffectParameter(
-                    name="intensity",
-                    type="float",
-                    default=0.5,
-                    min_value=0.0,
-                    max_value=1.0,
-                    label="Intensité"
-                )
-            ],
-            icon="blur.png"
-        )
-        
-        # Add other video effects...
-        
-        # Audio Effects
-        self.register_effect(
-            name="Echo",
-            category=EffectCategory.AUDIO,
-            class_ref=Echo,
-            description="Ajouter un effet d'écho",
-            parameters=[
-                EffectParameter(
-                    name="delay",
-                    type="float",
-                    default=0.3,
-                    min_value=0.1,
-                    max_value=1.0,
-                    label="Délai"
-                ),
-                EffectParameter(
-                    name="feedback",
-                    type="float",
-                    default=0.5,
-                    min_value=0.0,
-                    max_value=0.9,
-                    label="Retour"
-                )
-            ],
-            icon="echo.png"
-        )
+        intensity_effects = [
+            ("Blur", EffectCategory.VIDEO, Blur, "Ajouter un effet de flou", "blur.png"),
+            ("LightBar", EffectCategory.VIDEO, LightBar, "Barre lumineuse animée", "light_bar.png"),
+            ("ColorFilter", EffectCategory.VIDEO, ColorFilter, "Ajuster la saturation des couleurs", "color.png"),
+            ("Mirror", EffectCategory.VIDEO, Mirror, "Retourner l'image horizontalement", "mirror.png"),
+            ("Vignette", EffectCategory.VIDEO, Vignette, "Assombrir les bords de l'image", "vignette.png"),
+            # Audio Effects
+            ("PitchShift", EffectCategory.AUDIO, PitchShift, "Changer la hauteur de la voix", "pitch.png"),
+            ("Reverb", EffectCategory.AUDIO, Reverb, "Ajouter de la réverbération", "reverb.png"),
+            ("Echo", EffectCategory.AUDIO, Echo, "Ajouter un effet d'écho", "echo.png"),
+            ("BassBoost", EffectCategory.AUDIO, BassBoost, "Renforcer les basses", "bass.png"),
+            ("Normalize", EffectCategory.AUDIO, Normalize, "Normaliser le volume", "normalize.png"),
+            ("Compression", EffectCategory.AUDIO, Compression, "Compresser la dynamique", "compression.png"),
+        ]
         
-        # Add other audio effects...
+        # The other effects only take an intensity, like their constructors
+        for name, category, class_ref, description, icon in intensity_effects:
+            self.register_effect(
+                name=name,
+                category=category,
+                class_ref=class_ref,
+                description=description,
+                parameters=[
+                    EffectParameter(
+                        name="intensity",
+                        type="float",
+                        default=0.5,
+                        min_value=0.0,
+                        max_value=1.0,
+                        label="Intensité"
+                    )
+                ],
+                icon=icon
+            )
     
     def register_effect(self, name: str, category: EffectCategory, 
                        class_ref: Type, description: str, 
@@ -253,23 +239,21 @@ class EffectChain:
         self.video_effects.clear()
         self.audio_effects.clear()
     
+    def _preset_entry(self, effect) -> Dict[str, Any]:
+        """Name and registered parameters of an effect (not its runtime state)"""
+        name = effect.__class__.__name__
+        params = effect.params() if hasattr(effect, 'params') else {}
+        effect_info = self.effect_manager.get_effect(name)
+        if effect_info:
+            declared = {param.name for param in effect_info.parameters}
+            params = {key: value for key, value in params.items() if key in declared}
+        return {'name': name, 'params': params}
+    
     def save_as_preset(self, name: str):
-        """Save current chain as a preset"""
+        """Save current chain as a preset (same layout as a render spec)"""
         preset_data = {
-            'video': [
-                {
-                    'name': effect.__class__.__name__,
-                    'params': effect.__dict__
-                }
-                for effect in self.video_effects
-            ],
-            'audio': [
-                {
-                    'name': effect.__class__.__name__,
-                    'params': effect.__dict__
-                }
-                for effect in self.audio_effects
-            ]
+            'video': [self._preset_entry(effect) for effect in self.video_effects],
+            'audio': [self._preset_entry(effect) for effect in self.audio_effects]
         }
         self.effect_manager.save_preset(name, preset_data)
     
@@ -5,6 +5,7 @@ from .color_filter import ColorFilter
 from .blur import Blur
 from .mirror import Mirror
 from .vignette import Vignette
+from .planner import EffectChainPlanner, EffectPlan
 
 __all__ = [
     'BaseVisualEffect',
@@ -13,5 +14,7 @@ __all__ = [
     'ColorFilter',
     'Blur',
     'Mirror',
-    'Vignette'
+    'Vignette',
+    'EffectChainPlanner',
+    'EffectPlan'
 ]
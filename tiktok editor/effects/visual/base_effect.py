@@ -1,9 +1,90 @@
 class BaseVisualEffect:
+    # Effects whose output depends on previously processed frames must see
+    # frames in order, so the export pipeline never runs them in parallel
+    stateful = False
+    
+    # Geometry effects move pixels around (Crop, Mirror). Pixelwise effects
+    # compute each output pixel from the input pixel at the same place, so
+    # they can run on horizontal strips of the frame (see apply_region)
+    geometry = False
+    pixelwise = False
+    
+    # in_place: apply() may write its result into the frame it is given.
+    # supports_out: apply() accepts an ``out`` buffer of the input's shape.
+    # Together they let the export pipeline recycle frame buffers.
+    in_place = False
+    supports_out = False
+    
+    # Effects that look things up by frame number get apply(..., frame_index=i)
+    uses_frame_index = False
+    
+    # Size of the frames being processed relative to the source. Downscaled
+    # previews set it so pixel-sized parameters (kernel sizes, line widths)
+    # look the same as in the full-resolution export.
+    scale = 1.0
+    
     def __init__(self, intensity=0.5):
         self.intensity = intensity
+        self._resources = {}
+        self._resource_params = None
+    
+    def __getstate__(self):
+        # Precomputed resources are rebuilt on demand, don't ship them to worker processes
+        state = self.__dict__.copy()
+        state['_resources'] = {}
+        state['_resource_params'] = None
+        return state
+    
+    def params(self) -> dict:
+        """Settings that define the output, used to build cache keys"""
+        return {'intensity': self.intensity}
+    
+    def resource_params(self) -> tuple:
+        """Parameters the precomputed resources depend on"""
+        return (self.intensity,)
+    
+    def get_resource(self, name, shape, build):
+        """Return ``build(shape)``, computed once per frame shape and parameter set.
+        
+        Use it for data that only depends on the frame size and the effect
+        parameters (masks, overlays, LUTs). Everything is rebuilt when
+        resource_params() changes.
+        """
+        params = self.resource_params()
+        if params != self._resource_params:
+            self._resources = {}
+            self._resource_params = params
+        
+        key = (name, tuple(shape))
+        resources = self._resources
+        resource = resources.get(key)
+        if resource is None:
+            # Worker threads may build the same resource twice, the result is identical
+            resource = build(shape)
+            resources[key] = resource
+        return resource
     
     def set_intensity(self, intensity):
         self.intensity = intensity
     
-    def apply(self, frame):
+    def set_scale(self, scale):
+        self.scale = scale
+    
+    def apply(self, frame, out=None):
         return frame
+    
+    def apply_region(self, region, y_offset, frame_shape):
+        """Apply a pixelwise effect in place to the rows of a frame starting at y_offset"""
+        raise NotImplementedError
+    
+    def is_identity(self) -> bool:
+        """True when the effect leaves frames unchanged at its current settings"""
+        return False
+    
+    def commutes_with(self, effect, exact=True) -> bool:
+        """True when applying this effect before or after ``effect`` gives the same frame.
+        
+        With ``exact=False`` an effect may also report differences that are
+        limited to the frame borders.
+        """
+        return False
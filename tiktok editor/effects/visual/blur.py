@@ -2,10 +2,26 @@ from .base_effect import BaseVisualEffect
 import cv2
 
 class Blur(BaseVisualEffect):
+    supports_out = True
+    
     def __init__(self, intensity=0.5):
         super().__init__(intensity)
     
-    def apply(self, frame):
+    def _kernel_size(self):
         # Calculate kernel size based on intensity (odd numbers only)
-        kernel_size = int(self.intensity * 20) * 2 + 1
-        return cv2.GaussianBlur(frame, (kernel_size, kernel_size), 0)
+        return int(self.intensity * 20 * self.scale) * 2 + 1
+    
+    def apply(self, frame, out=None):
+        kernel_size = self._kernel_size()
+        return cv2.GaussianBlur(frame, (kernel_size, kernel_size), 0, dst=out)
+    
+    def is_identity(self):
+        return self._kernel_size() == 1
+    
+    def commutes_with(self, effect, exact=True):
+        # The kernel is symmetric, so flipping before or after is the same.
+        # Cropping first only changes the border extrapolation at the crop
+        # edges (within the kernel radius).
+        if effect.__class__.__name__ == 'Mirror':
+            return True
+        return not exact and effect.__class__.__name__ == 'Crop'
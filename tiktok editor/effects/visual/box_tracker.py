@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+Box = Tuple[float, float, float, float]  # x, y, width, height
+
+
+class FaceBoxTracker:
+    """Follows a box between detections with sparse Lucas-Kanade optical flow.
+
+    ``reset`` anchors the box and picks corners in its central part
+    (``inner`` of its size, where the face is rather than the margins around
+    it), ``update`` moves
+    and scales the box with the median motion of the points that survive a
+    forward-backward check. Works on small grayscale frames, so it costs a
+    fraction of a face detection.
+    """
+
+    def __init__(self, max_points: int = 40, min_points: int = 6, max_fb_error: float = 1.0,
+                 inner: float = 0.3):
+        self.max_points = max_points
+        self.inner = inner
+        self.min_points = min_points
+        self.max_fb_error = max_fb_error
+        self.lk_params = dict(
+            winSize=(15, 15),
+            maxLevel=2,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        )
+        self.box: Optional[Box] = None
+        self._points: Optional[np.ndarray] = None
+        self._previous: Optional[np.ndarray] = None
+
+    def _find_points(self, gray: np.ndarray, box: Box) -> Optional[np.ndarray]:
+        x, y, w, h = box
+        x, y = x + w * (1 - self.inner) / 2, y + h * (1 - self.inner) / 2
+        w, h = w * self.inner, h * self.inner
+        x, y, w, h = (int(round(v)) for v in (x, y, w, h))
+        mask = np.zeros_like(gray)
+        mask[max(0, y):max(0, y + h), max(0, x):max(0, x + w)] = 255
+        return cv2.goodFeaturesToTrack(gray, self.max_points, 0.01, 3, mask=mask)
+
+    def reset(self, gray: np.ndarray, box: Box):
+        """Anchor the tracker on a detected box"""
+        self.box = box
+        self._previous = gray
+        self._points = self._find_points(gray, box)
+
+    def update(self, gray: np.ndarray) -> Optional[Box]:
+        """Box in ``gray``, or None once too few points can be followed"""
+        if self.box is None or self._points is None or len(self._points) < self.min_points:
+            self.box = None
+            return None
+
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self._previous, gray, self._points, None, **self.lk_params)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._previous, points, None, **self.lk_params)
+        fb_error = np.linalg.norm((self._points - back).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+
+        if good.sum() < self.min_points:
+            self.box = None
+            return None
+
+        old = self._points.reshape(-1, 2)[good]
+        new = points.reshape(-1, 2)[good]
+        dx, dy = np.median(new - old, axis=0)
+
+        # Scale from the change in spread of the points around their center
+        old_spread = np.median(np.linalg.norm(old - old.mean(axis=0), axis=1))
+        new_spread = np.median(np.linalg.norm(new - new.mean(axis=0), axis=1))
+        scale = new_spread / old_spread if old_spread > 1e-3 else 1.0
+        scale = float(np.clip(scale, 0.9, 1.1))
+
+        x, y, w, h = self.box
+        cx, cy = x + w / 2 + dx, y + h / 2 + dy
+        w, h = w * scale, h * scale
+        self.box = (cx - w / 2, cy - h / 2, w, h)
+
+        self._previous = gray
+        self._points = new.reshape(-1, 1, 2)
+        if len(self._points) < self.max_points // 2:
+            # Top up the points so the track survives until the next detection
+            refreshed = self._find_points(gray, self.box)
+            if refreshed is not None and len(refreshed) > len(self._points):
+                self._points = refreshed
+        return self.box
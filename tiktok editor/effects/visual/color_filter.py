@@ -3,15 +3,41 @@ import cv2
 import numpy as np
 
 class ColorFilter(BaseVisualEffect):
+    pixelwise = True
+    in_place = True
+    
     def __init__(self, intensity=0.5):
         super().__init__(intensity)
     
-    def apply(self, frame):
-        # Convert to HSV
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    def _build_saturation_lut(self, shape):
+        # Hue and value unchanged, saturation scaled with the same rounding
+        # and clipping as cv2.multiply on uint8
+        identity = np.arange(256)
+        saturation = np.clip(np.round(identity * (1 + self.intensity)), 0, 255)
+        lut = np.stack([identity, saturation, identity], axis=1)
+        return lut.astype(np.uint8).reshape(1, 256, 3)
+    
+    def apply(self, frame, out=None):
+        # Convert to HSV (in place)
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=frame)
         
         # Modify saturation based on intensity
-        hsv[:,:,1] = cv2.multiply(hsv[:,:,1], 1 + self.intensity)
+        lut = self.get_resource('saturation_lut', (), self._build_saturation_lut)
+        cv2.LUT(hsv, lut, dst=hsv)
         
         # Convert back to BGR
-        return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+        return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=hsv)
+    
+    def apply_region(self, region, y_offset, frame_shape):
+        self.apply(region)
+    
+    def is_identity(self):
+        return self.intensity == 0
+    
+    def commutes_with(self, effect, exact=True):
+        # Only depends on the pixel value, so moving pixels around commutes.
+        # A face-tracking Crop detects on the filtered pixels, and its resize
+        # fallback interpolates, which does not commute with the LUT.
+        if effect.__class__.__name__ == 'Mirror':
+            return True
+        return not exact and effect.__class__.__name__ == 'Crop'
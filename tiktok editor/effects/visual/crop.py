@@ -1,10 +1,12 @@
 import cv2
 import numpy as np
-import mediapipe as mp
 from .base_effect import BaseVisualEffect
+from .face_detector_pool import get_face_detector_pool
+from .box_tracker import FaceBoxTracker
 from enum import Enum
 from dataclasses import dataclass
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Union
+from .face_track import FaceTrack
 
 class VideoRatio(Enum):
     RATIO_16_9 = (16/9, "16:9")
@@ -21,6 +23,14 @@ class VideoRatio(Enum):
     def label(self) -> str:
         return self.value[1]
 
+    @classmethod
+    def from_label(cls, label: str) -> 'VideoRatio':
+        """Ratio from its label, e.g. '9:16'"""
+        for ratio in cls:
+            if ratio.label == label:
+                return ratio
+        raise ValueError(f"Unknown video ratio: {label}")
+
 @dataclass
 class CropRegion:
     x: int
@@ -29,19 +39,23 @@ class CropRegion:
     height: int
 
 class Crop(BaseVisualEffect):
-    def __init__(self, ratio: VideoRatio = VideoRatio.RATIO_16_9, track_face: bool = False):
+    geometry = True
+    
+    def __init__(self, ratio: Union[VideoRatio, str] = VideoRatio.RATIO_16_9, track_face: bool = False,
+                 face_track: Optional[FaceTrack] = None):
         super().__init__()
+        # Effect specs and presets give the ratio by its label
+        if isinstance(ratio, str):
+            ratio = VideoRatio.from_label(ratio)
         self.ratio = ratio
         self.track_face = track_face
         
-        # Initialize face detection if needed
+        # Precomputed crop path (see processors.face_tracker); when set, the
+        # crop window is looked up by frame index instead of detected
+        self.face_track = face_track
+        
+        # Initialize face tracking state if needed (detectors come from a shared pool)
         if self.track_face:
-            self.mp_face_detection = mp.solutions.face_detection
-            self.face_detection = self.mp_face_detection.FaceDetection(
-                model_selection=1,  # 0 for close faces, 1 for far faces
-                min_detection_confidence=0.5
-            )
-            
             # For smoothing face tracking
             self.last_face_region = None
             self.smoothing_factor = 0.3  # Adjust for smoother transitions
@@ -49,42 +63,91 @@ class Crop(BaseVisualEffect):
             # For stabilization
             self.stabilization_buffer = []
             self.buffer_size = 5  # Number of frames to consider for stabilization
+            
+            # Detection runs on a downscaled copy, every few frames or on a
+            # scene change; optical flow follows the face in between
+            self.detect_every = 5
+            self.detection_size = 320  # Longest side in pixels
+            self.scene_change_threshold = 30.0  # Mean abs difference (0-255)
+            self.max_lost_frames = 60  # Hold the last window this long before centering
+            self.tracker = FaceBoxTracker()
+            self._frames_since_detection = 0
+            self._lost_frames = 0
+            self._last_thumbnail = None
+            self._current_region = None
+    
+    @property
+    def stateful(self) -> bool:
+        # Live face tracking smooths the crop window over previous frames
+        return self.track_face and self.face_track is None
+    
+    @property
+    def uses_frame_index(self) -> bool:
+        return self.track_face and self.face_track is not None
+    
+    def params(self) -> dict:
+        # The face track is derived from the source, it is not a setting
+        return {'ratio': self.ratio.label, 'track_face': self.track_face}
     
-    def _detect_face(self, frame: np.ndarray) -> Optional[CropRegion]:
+    def set_face_track(self, face_track: Optional[FaceTrack]):
+        """Use a precomputed crop path (None goes back to live detection)"""
+        self.face_track = face_track
+    
+    @staticmethod
+    def _face_region_from_bbox(bbox, frame_width: int, frame_height: int) -> CropRegion:
+        """Region around a relative face bounding box, with margins, in pixels"""
+        # Convert relative coordinates to absolute
+        x = max(0, int(bbox.xmin * frame_width))
+        y = max(0, int(bbox.ymin * frame_height))
+        width = min(int(bbox.width * frame_width), frame_width - x)
+        height = min(int(bbox.height * frame_height), frame_height - y)
+        
+        # Add margin around face (75% of face size)
+        margin_x = int(width * 0.75)
+        margin_y = int(height * 0.75)
+        
+        # Calculate new dimensions ensuring they stay within frame
+        new_x = max(0, x - margin_x)
+        new_y = max(0, y - margin_y)
+        new_width = min(frame_width - new_x, width + 2 * margin_x)
+        new_height = min(frame_height - new_y, height + 2 * margin_y)
+        
+        # Ensure minimum size
+        min_size = min(frame_width, frame_height) // 4
+        new_width = max(new_width, min_size)
+        new_height = max(new_height, min_size)
+        
+        return CropRegion(new_x, new_y, new_width, new_height)
+    
+    def _downscale(self, frame: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Copy of the frame at detection size, and the scale factor used"""
+        frame_height, frame_width = frame.shape[:2]
+        scale = self.detection_size / max(frame_height, frame_width)
+        if scale >= 1:
+            return frame, 1.0
+        small = cv2.resize(frame, (max(1, int(frame_width * scale)),
+                                   max(1, int(frame_height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        return small, scale
+    
+    def _detect_face(self, frame: np.ndarray, small: Optional[np.ndarray] = None) -> Optional[CropRegion]:
         """Detect face in frame using MediaPipe"""
         try:
+            # Detect on a small copy, the bounding box is relative anyway
+            frame_height, frame_width = frame.shape[:2]
+            if small is None:
+                small, _ = self._downscale(frame)
+            
             # Convert BGR to RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.face_detection.process(rgb_frame)
+            rgb_frame = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            with get_face_detector_pool().borrow() as detector:
+                results = detector.process(rgb_frame)
             
             if results.detections:
                 # Get the first detected face
                 detection = results.detections[0]
                 bbox = detection.location_data.relative_bounding_box
-                
-                # Convert relative coordinates to absolute
-                frame_height, frame_width = frame.shape[:2]
-                x = max(0, int(bbox.xmin * frame_width))
-                y = max(0, int(bbox.ymin * frame_height))
-                width = min(int(bbox.width * frame_width), frame_width - x)
-                height = min(int(bbox.height * frame_height), frame_height - y)
-                
-                # Add margin around face (75% of face size)
-                margin_x = int(width * 0.75)
-                margin_y = int(height * 0.75)
-                
-                # Calculate new dimensions ensuring they stay within frame
-                new_x = max(0, x - margin_x)
-                new_y = max(0, y - margin_y)
-                new_width = min(frame_width - new_x, width + 2 * margin_x)
-                new_height = min(frame_height - new_y, height + 2 * margin_y)
-                
-                # Ensure minimum size
-                min_size = min(frame_width, frame_height) // 4
-                new_width = max(new_width, min_size)
-                new_height = max(new_height, min_size)
-                
-                return CropRegion(new_x, new_y, new_width, new_height)
+                return self._face_region_from_bbox(bbox, frame_width, frame_height)
             
             return None
             
@@ -123,40 +186,101 @@ class Crop(BaseVisualEffect):
         self.last_face_region = CropRegion(smooth_x, smooth_y, smooth_w, smooth_h)
         return self.last_face_region
     
-    def _get_crop_dimensions(self, frame: np.ndarray) -> Tuple[int, int, int, int]:
+    def _scene_changed(self, gray: np.ndarray) -> bool:
+        """Cheap motion/cut check on a tiny grayscale thumbnail"""
+        thumbnail = cv2.resize(gray, (32, 18), interpolation=cv2.INTER_AREA)
+        previous = self._last_thumbnail
+        self._last_thumbnail = thumbnail
+        if previous is None:
+            return True
+        return float(cv2.absdiff(thumbnail, previous).mean()) > self.scene_change_threshold
+    
+    def _track_face(self, frame: np.ndarray) -> Optional[CropRegion]:
+        """Face region for this frame, detecting only when needed"""
+        small, scale = self._downscale(frame)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        
+        scene_changed = self._scene_changed(gray)
+        if scene_changed:
+            # Don't pan across cuts, nor follow or hold the previous shot's face
+            self.last_face_region = None
+            self.stabilization_buffer = []
+            self.tracker = FaceBoxTracker()
+            self._current_region = None
+            self._lost_frames = 0
+        
+        if scene_changed or self._frames_since_detection >= self.detect_every - 1:
+            self._frames_since_detection = 0
+            face_region = self._detect_face(frame, small)
+            if face_region is not None:
+                # Re-anchor the tracker on the detection
+                face_region = self._smooth_region(face_region)
+                self.tracker.reset(gray, (face_region.x * scale, face_region.y * scale,
+                                          face_region.width * scale, face_region.height * scale))
+                self._current_region = face_region
+                self._lost_frames = 0
+                return face_region
+        else:
+            self._frames_since_detection += 1
+        
+        # Between detections (or when one misses), follow the face with optical flow
+        box = self.tracker.update(gray)
+        if box is not None:
+            x, y, w, h = (v / scale for v in box)
+            self._current_region = CropRegion(int(x), int(y), int(w), int(h))
+            self.last_face_region = self._current_region
+            self._lost_frames = 0
+            return self._current_region
+        
+        # Lost the face: hold the last window for a while rather than snapping to center
+        self._lost_frames += 1
+        if self._current_region is not None and self._lost_frames <= self.max_lost_frames:
+            return self._current_region
+        self._current_region = None
+        return None
+    
+    def crop_from_face(self, face_region: CropRegion, width: int, height: int) -> Tuple[int, int, int, int]:
+        """Crop window of the target ratio centered on a face region"""
+        target_ratio = self.ratio.ratio_value
+        
+        # Calculate crop dimensions while maintaining ratio
+        if target_ratio > 1:  # Wider than tall
+            crop_height = face_region.height
+            crop_width = int(crop_height * target_ratio)
+        else:  # Taller than wide
+            crop_width = face_region.width
+            crop_height = int(crop_width / target_ratio)
+        
+        # Ensure dimensions are even
+        crop_width = (crop_width // 2) * 2
+        crop_height = (crop_height // 2) * 2
+        
+        # Center the crop around face
+        x = face_region.x + (face_region.width - crop_width) // 2
+        y = face_region.y + (face_region.height - crop_height) // 2
+        
+        # Ensure within frame bounds
+        x = max(0, min(x, width - crop_width))
+        y = max(0, min(y, height - crop_height))
+        
+        return x, y, crop_width, crop_height
+    
+    def _get_crop_dimensions(self, frame: np.ndarray,
+                             frame_index: Optional[int] = None) -> Tuple[int, int, int, int]:
         """Calculate crop dimensions based on ratio and face tracking"""
         height, width = frame.shape[:2]
         target_ratio = self.ratio.ratio_value
         
-        if self.track_face:
-            face_region = self._detect_face(frame)
+        if self.track_face and self.face_track is not None and frame_index is not None:
+            rect = self.face_track.crop_rect(frame_index, width, height)
+            if rect:
+                return rect
+        elif self.track_face:
+            face_region = self._track_face(frame)
             if face_region:
-                # Smooth the tracking
-                face_region = self._smooth_region(face_region)
-                
-                # Calculate crop dimensions while maintaining ratio
-                if target_ratio > 1:  # Wider than tall
-                    crop_height = face_region.height
-                    crop_width = int(crop_height * target_ratio)
-                else:  # Taller than wide
-                    crop_width = face_region.width
-                    crop_height = int(crop_width / target_ratio)
-                
-                # Ensure dimensions are even
-                crop_width = (crop_width // 2) * 2
-                crop_height = (crop_height // 2) * 2
-                
-                # Center the crop around face
-                x = face_region.x + (face_region.width - crop_width) // 2
-                y = face_region.y + (face_region.height - crop_height) // 2
-                
-                # Ensure within frame bounds
-                x = max(0, min(x, width - crop_width))
-                y = max(0, min(y, height - crop_height))
-                
-                return x, y, crop_width, crop_height
+                return self.crop_from_face(face_region, width, height)
             
-            # If face detection fails, fall back to center crop
+            # No face for a while, fall back to center crop
             self.last_face_region = None
             self.stabilization_buffer = []
         
@@ -174,10 +298,10 @@ class Crop(BaseVisualEffect):
             y = (height - new_height) // 2
             return 0, y, width, new_height
     
-    def apply(self, frame: np.ndarray) -> np.ndarray:
+    def apply(self, frame: np.ndarray, out=None, frame_index: Optional[int] = None) -> np.ndarray:
         """Apply crop effect to frame"""
         try:
-            x, y, crop_width, crop_height = self._get_crop_dimensions(frame)
+            x, y, crop_width, crop_height = self._get_crop_dimensions(frame, frame_index)
             
             # Ensure dimensions are valid
             if crop_width <= 0 or crop_height <= 0:
@@ -202,7 +326,10 @@ class Crop(BaseVisualEffect):
     
     def cleanup(self):
         """Cleanup resources"""
-        if hasattr(self, 'face_detection') and self.face_detection:
-            self.face_detection.close()
+        # The detector belongs to the shared pool, only reset tracking state
+        if self.track_face:
             self.last_face_region = None
             self.stabilization_buffer = []
+            self.tracker = FaceBoxTracker()
+            self._current_region = None
+            self._last_thumbnail = None
@@ -0,0 +1,109 @@
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from utils.lazy_import import lazy_import
+
+# MediaPipe is only loaded when the first detector is created
+mp = lazy_import('mediapipe')
+
+
+class FaceDetectorPool:
+    """Process-wide pool of MediaPipe face detectors.
+
+    A detector is not safe to use from two threads at once, so callers borrow
+    one for the duration of a ``process`` call. Detectors are created on
+    demand (at most ``max_size``), reused across Crop instances and closed at
+    interpreter exit.
+    """
+
+    def __init__(self, model_selection: int = 1, min_detection_confidence: float = 0.5,
+                 max_size: Optional[int] = None):
+        self.model_selection = model_selection
+        self.min_detection_confidence = min_detection_confidence
+        self.max_size = max_size
+        self._condition = threading.Condition()
+        self._idle: List = []
+        self._created = 0
+        self._closed = False
+
+    def _create(self):
+        return mp.solutions.face_detection.FaceDetection(
+            model_selection=self.model_selection,  # 0 for close faces, 1 for far faces
+            min_detection_confidence=self.min_detection_confidence
+        )
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise Exception("Face detector pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self.max_size is None or self._created < self.max_size:
+                    self._created += 1
+                    break
+                self._condition.wait()
+
+        # Load the model outside the lock, other threads can keep borrowing
+        try:
+            return self._create()
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, detector):
+        with self._condition:
+            if self._closed:
+                detector.close()
+                return
+            self._idle.append(detector)
+            self._condition.notify()
+
+    @contextmanager
+    def borrow(self):
+        """Borrow a detector: ``with pool.borrow() as detector: detector.process(rgb)``"""
+        detector = self._acquire()
+        try:
+            yield detector
+        finally:
+            self._release(detector)
+
+    def close(self):
+        """Close idle detectors; borrowed ones are closed when returned"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for detector in idle:
+            try:
+                detector.close()
+            except Exception:
+                pass
+
+
+_pools: Dict[Tuple[int, float], FaceDetectorPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_face_detector_pool(model_selection: int = 1,
+                           min_detection_confidence: float = 0.5) -> FaceDetectorPool:
+    """Shared detector pool for these detection settings"""
+    key = (model_selection, min_detection_confidence)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = FaceDetectorPool(model_selection, min_detection_confidence)
+            _pools[key] = pool
+        return pool
+
+
+@atexit.register
+def close_face_detector_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
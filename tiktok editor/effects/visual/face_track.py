@@ -0,0 +1,41 @@
+import numpy as np
+from typing import Optional, Tuple
+
+
+class FaceTrack:
+    """Precomputed crop window for every frame of a clip.
+
+    Rectangles are stored as (x, y, width, height) relative to the frame size,
+    so the same track serves full-resolution exports and scaled previews.
+    Rows are NaN where no face was found anywhere in the clip.
+    """
+
+    def __init__(self, rects: np.ndarray, fps: float):
+        self.rects = np.asarray(rects, dtype=np.float32).reshape(-1, 4)
+        self.fps = fps
+
+    def __len__(self) -> int:
+        return len(self.rects)
+
+    def crop_rect(self, frame_index: int, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """Crop window in pixels for ``frame_index``, or None to use a center crop"""
+        if not len(self.rects):
+            return None
+        rect = self.rects[min(max(0, frame_index), len(self.rects) - 1)]
+        if np.isnan(rect).any():
+            return None
+
+        crop_width = int(round(rect[2] * width)) // 2 * 2
+        crop_height = int(round(rect[3] * height)) // 2 * 2
+        x = max(0, min(int(round(rect[0] * width)), width - crop_width))
+        y = max(0, min(int(round(rect[1] * height)), height - crop_height))
+        return x, y, crop_width, crop_height
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, rects=self.rects, fps=np.float64(self.fps))
+
+    @classmethod
+    def load(cls, path: str) -> 'FaceTrack':
+        with np.load(path) as data:
+            return cls(data['rects'], float(data['fps']))
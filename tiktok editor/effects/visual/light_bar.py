@@ -3,17 +3,29 @@ import cv2
 import numpy as np
 
 class LightBar(BaseVisualEffect):
+    # The bar position advances with every processed frame
+    stateful = True
+    in_place = True
+    
     def __init__(self, intensity=0.5):
         super().__init__(intensity)
         self.position = 0
         self.direction = 1
     
-    def apply(self, frame):
+    def params(self):
+        # Where the bar starts is part of the output (effects reused from the
+        # preview carry on from where it left off)
+        return {'intensity': self.intensity, 'position': self.position, 'direction': self.direction}
+    
+    def apply(self, frame, out=None):
         height, width = frame.shape[:2]
-        frame = frame.copy()
         bar_pos = int(self.position * width)
-        frame[:, max(0, bar_pos-2):min(width, bar_pos+2)] += int(50 * self.intensity)
+        half_width = max(1, int(round(2 * self.scale)))
+        frame[:, max(0, bar_pos-half_width):min(width, bar_pos+half_width)] += int(50 * self.intensity)
         self.position += 0.01 * self.direction
         if self.position >= 1 or self.position <= 0:
             self.direction *= -1
         return frame
+    
+    def is_identity(self):
+        return int(50 * self.intensity) == 0
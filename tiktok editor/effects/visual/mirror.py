@@ -2,11 +2,14 @@ from .base_effect import BaseVisualEffect
 import cv2
 
 class Mirror(BaseVisualEffect):
+    geometry = True
+    supports_out = True
+    
     def __init__(self, intensity=0.5):
         super().__init__(intensity)
     
-    def apply(self, frame):
+    def apply(self, frame, out=None):
         if self.intensity > 0.5:  # Vertical mirror
-            return cv2.flip(frame, 0)
+            return cv2.flip(frame, 0, dst=out)
         else:  # Horizontal mirror
-            return cv2.flip(frame, 1)
+            return cv2.flip(frame, 1, dst=out)
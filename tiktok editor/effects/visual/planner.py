@@ -0,0 +1,137 @@
+import numpy as np
+from typing import List
+
+
+class FusedPixelStage:
+    """Runs consecutive pixelwise effects strip by strip in one pass.
+
+    Each strip of rows goes through every effect while it is still in the CPU
+    cache, instead of every effect walking the whole frame in turn.
+    """
+
+    stateful = False
+    geometry = False
+    pixelwise = True
+    in_place = True
+    supports_out = False
+
+    # Rows per strip are chosen so a strip is about this many bytes
+    strip_bytes = 256 * 1024
+
+    def __init__(self, effects: list):
+        self.effects = list(effects)
+
+    @property
+    def name(self) -> str:
+        return '+'.join(effect.__class__.__name__ for effect in self.effects)
+
+    def apply(self, frame: np.ndarray, out=None) -> np.ndarray:
+        if not frame.flags.writeable:
+            frame = frame.copy()
+
+        rows = frame.shape[0]
+        row_bytes = max(1, frame.shape[1] * frame.itemsize * (frame.shape[2] if frame.ndim > 2 else 1))
+        step = max(16, self.strip_bytes // row_bytes)
+
+        for y in range(0, rows, step):
+            region = frame[y:y + step]
+            for effect in self.effects:
+                effect.apply_region(region, y, frame.shape)
+        return frame
+
+    def apply_region(self, region, y_offset, frame_shape):
+        for effect in self.effects:
+            effect.apply_region(region, y_offset, frame_shape)
+
+
+class EffectPlan:
+    """Result of planning an effect chain: the effects to run and why"""
+
+    def __init__(self, original: list, effects: list, notes: List[str]):
+        self.original = list(original)
+        self.effects = effects
+        self.notes = notes
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        for effect in self.effects:
+            frame = effect.apply(frame)
+        return frame
+
+    def describe(self) -> str:
+        """Human-readable summary of the original chain, the plan and each rewrite"""
+        def names(effects):
+            return ' -> '.join(getattr(e, 'name', e.__class__.__name__) for e in effects) or '(none)'
+
+        lines = [f"original: {names(self.original)}", f"planned:  {names(self.effects)}"]
+        lines += [f"  - {note}" for note in self.notes]
+        return '\n'.join(lines)
+
+    def __str__(self) -> str:
+        return self.describe()
+
+
+class EffectChainPlanner:
+    """Rewrites a visual effect chain into a cheaper equivalent one.
+
+    - effects that are no-ops at their current settings are dropped
+    - geometry effects (Crop, Mirror) move ahead of effects they commute with,
+      so the other effects run on the smaller, cropped frame
+    - runs of consecutive pixelwise effects are fused into one strip-by-strip pass
+
+    By default the planned chain renders exactly the same frames as the
+    original one (and as the unplanned preview). With ``exact=False`` the
+    planner also accepts reorderings that only change pixels near the crop
+    edges (e.g. Blur after Crop instead of before).
+    """
+
+    def __init__(self, exact: bool = True, fuse: bool = True):
+        self.exact = exact
+        self.fuse = fuse
+
+    def plan(self, effects: list) -> EffectPlan:
+        notes = []
+
+        # 1. Skip no-ops
+        planned = []
+        for effect in effects:
+            if effect.is_identity():
+                notes.append(f"dropped {effect.__class__.__name__} (no-op at intensity {effect.intensity})")
+            else:
+                planned.append(effect)
+
+        # 2. Bubble geometry effects towards the front, never past another
+        #    geometry effect or anything they do not commute with
+        for i in range(len(planned)):
+            effect = planned[i]
+            if not effect.geometry:
+                continue
+            j = i
+            while (j > 0 and not planned[j - 1].geometry
+                   and planned[j - 1].commutes_with(effect, exact=self.exact)):
+                planned[j] = planned[j - 1]
+                j -= 1
+            planned[j] = effect
+            if j != i:
+                skipped = ', '.join(e.__class__.__name__ for e in planned[j + 1:i + 1])
+                notes.append(f"moved {effect.__class__.__name__} before {skipped}")
+
+        # 3. Fuse runs of pixelwise effects
+        if self.fuse:
+            fused = []
+            run = []
+            for effect in planned + [None]:
+                if effect is not None and effect.pixelwise and not effect.stateful:
+                    run.append(effect)
+                    continue
+                if len(run) > 1:
+                    stage = FusedPixelStage(run)
+                    fused.append(stage)
+                    notes.append(f"fused {stage.name} into one pass")
+                else:
+                    fused.extend(run)
+                run = []
+                if effect is not None:
+                    fused.append(effect)
+            planned = fused
+
+        return EffectPlan(effects, planned, notes)
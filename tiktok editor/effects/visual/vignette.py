@@ -3,11 +3,14 @@ import cv2
 import numpy as np
 
 class Vignette(BaseVisualEffect):
+    pixelwise = True
+    in_place = True
+    
     def __init__(self, intensity=0.5):
         super().__init__(intensity)
     
-    def apply(self, frame):
-        rows, cols = frame.shape[:2]
+    def _build_mask(self, shape):
+        rows, cols = shape[:2]
         
         # Generate vignette mask
         kernel_x = cv2.getGaussianKernel(cols, cols/2)
@@ -18,8 +21,23 @@ class Vignette(BaseVisualEffect):
         # Apply intensity
         mask = (1 - self.intensity) + (mask * self.intensity)
         
-        # Apply mask to each channel
-        for i in range(3):
-            frame[:,:,i] = frame[:,:,i] * mask
-            
-        return frame.astype(np.uint8)
+        # Fixed-point gain (65535 = 1.0), one plane per channel for cv2.multiply
+        mask = np.round(mask * 65535).astype(np.uint16)
+        channels = shape[2] if len(shape) > 2 else 1
+        return np.repeat(mask[:, :, None], channels, axis=2)
+    
+    def apply(self, frame, out=None):
+        mask = self.get_resource('mask', frame.shape, self._build_mask)
+        return cv2.multiply(frame, mask, dst=frame, scale=1/65535, dtype=cv2.CV_8U)
+    
+    def apply_region(self, region, y_offset, frame_shape):
+        mask = self.get_resource('mask', frame_shape, self._build_mask)
+        mask = mask[y_offset:y_offset + region.shape[0]]
+        cv2.multiply(region, mask, dst=region, scale=1/65535, dtype=cv2.CV_8U)
+    
+    def is_identity(self):
+        return self.intensity == 0
+    
+    def commutes_with(self, effect, exact=True):
+        # The mask is symmetric around the frame center, so mirroring commutes
+        return effect.__class__.__name__ == 'Mirror'
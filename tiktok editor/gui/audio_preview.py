@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 from PyQt6.QtWidgets import QLabel
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QImage, QPixmap
@@ -6,6 +5,10 @@ from io import BytesIO
 import os
 import numpy as np
 import soundfile as sf
+from utils.lazy_import import lazy_import
+
+# matplotlib is only needed once a waveform is drawn
+plt = lazy_import('matplotlib.pyplot')
 
 class AudioWaveformWidget(QLabel):
     def __init__(self):
@@ -23,7 +26,7 @@ class AudioWaveformWidget(QLabel):
                 font-size: 14px;
             }
         """)
-        plt.style.use('dark_background')
+        self._style_applied = False
     
     def update_waveform(self, audio_path):
         if not audio_path or not os.path.exists(audio_path):
@@ -34,6 +37,10 @@ class AudioWaveformWidget(QLabel):
             # Load audio file using soundfile
             audio_data, sample_rate = sf.read(audio_path)
             
+            if not self._style_applied:
+                plt.style.use('dark_background')
+                self._style_applied = True
+            
             # Create figure with dark background
             plt.figure(figsize=(10, 2), facecolor='#0d0e23')
             ax = plt.gca()
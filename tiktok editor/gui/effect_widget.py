@@ -292,20 +292,27 @@ class EffectWidget(QWidget):
         else:
             self.settings_container.hide()
     
+    def _set_effect_instance(self, effect):
+        """Replace the current effect, releasing what the old one holds"""
+        old_effect = self.effect_instance
+        self.effect_instance = effect
+        if old_effect is not None and old_effect is not effect and hasattr(old_effect, 'cleanup'):
+            old_effect.cleanup()
+    
     def on_toggle(self, state):
         if state == Qt.CheckState.Checked.value:
             if self.effect_name == "Crop":
                 ratio = self.ratio_combo.currentData()
                 track_face = self.face_track.isChecked()
-                self.effect_instance = self.effect_class(ratio=ratio, track_face=track_face)
+                self._set_effect_instance(self.effect_class(ratio=ratio, track_face=track_face))
             else:
-                self.effect_instance = self.effect_class()
+                self._set_effect_instance(self.effect_class())
                 if self.settings_widget:
                     for name, value in self.settings_widget.settings.items():
                         if hasattr(self.effect_instance, 'update_setting'):
                             self.effect_instance.update_setting(name, value)
         else:
-            self.effect_instance = None
+            self._set_effect_instance(None)
         
         if self.callback:
             self.callback()
@@ -315,7 +322,7 @@ class EffectWidget(QWidget):
         if self.toggle.isChecked():
             ratio = self.ratio_combo.currentData()
             track_face = self.face_track.isChecked()
-            self.effect_instance = self.effect_class(ratio=ratio, track_face=track_face)
+            self._set_effect_instance(self.effect_class(ratio=ratio, track_face=track_face))
             if self.callback:
                 self.callback()
             self.effectChanged.emit()
@@ -324,7 +331,7 @@ class EffectWidget(QWidget):
         if self.toggle.isChecked():
             ratio = self.ratio_combo.currentData()
             track_face = self.face_track.isChecked()
-            self.effect_instance = self.effect_class(ratio=ratio, track_face=track_face)
+            self._set_effect_instance(self.effect_class(ratio=ratio, track_face=track_face))
             if self.callback:
                 self.callback()
             self.effectChanged.emit()
@@ -0,0 +1,69 @@
+import threading
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
+from processors.frame_pipeline import ExportCancelled
+
+
+class ExportWorker(QThread):
+    """Runs an export off the GUI thread.
+
+    Progress is emitted as whole percents, at most a few times per second,
+    so the GUI thread is not flooded with one signal per frame. ``cancel``
+    stops decoding, effects and the FFmpeg encoder and removes the partial
+    file; the worker then emits ``exportCancelled``.
+    """
+    progressChanged = pyqtSignal(int)
+    exportFinished = pyqtSignal(str)
+    exportFailed = pyqtSignal(str)
+    exportCancelled = pyqtSignal()
+
+    def __init__(self, renderer, input_path: str, output_path: str,
+                 video_effects: list, audio_effects: list,
+                 min_interval: float = 0.2, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self.input_path = input_path
+        self.output_path = output_path
+        self.video_effects = video_effects
+        self.audio_effects = audio_effects
+        self.min_interval = min_interval  # Seconds between progress signals
+        self._cancel_event = threading.Event()
+        self._last_emit = 0.0
+        self._last_value = -1
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def is_cancelling(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def _on_progress(self, progress: float):
+        value = int(progress)
+        now = time.monotonic()
+        if value == self._last_value:
+            return
+        if value < 100 and now - self._last_emit < self.min_interval:
+            return
+        self._last_emit, self._last_value = now, value
+        self.progressChanged.emit(value)
+
+    def run(self):
+        try:
+            self.renderer.render_effects(
+                self.input_path,
+                self.output_path,
+                self.video_effects,
+                self.audio_effects,
+                self._on_progress,
+                cancel_event=self._cancel_event
+            )
+        except ExportCancelled:
+            self.exportCancelled.emit()
+        except Exception as e:
+            self.exportFailed.emit(str(e))
+        else:
+            self.exportFinished.emit(self.output_path)
+        finally:
+            for effect in self.video_effects:
+                if hasattr(effect, 'cleanup'):
+                    effect.cleanup()
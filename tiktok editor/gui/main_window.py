@@ -2,20 +2,35 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                            QPushButton, QListWidget, QGroupBox, QProgressBar,
                            QTabWidget, QMessageBox, QFileDialog, QLabel,
                            QScrollArea, QApplication, QCheckBox, QSlider)
-from PyQt6.QtCore import Qt, QTimer, QUrl
+from PyQt6.QtCore import Qt, QTimer, QUrl, pyqtSignal
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 import cv2
+import copy
 import os
 import sys
 import subprocess
+import shutil
+import threading
+import time
 import soundfile as sf
 import numpy as np
 from .video_preview import VideoPreviewWidget
 from .audio_preview import AudioWaveformWidget
 from .effect_widget import EffectWidget
+from .export_worker import ExportWorker
 from effects.visual import Crop, LightBar, ColorFilter, Blur, Mirror, Vignette
 from effects.audio import PitchShift, Reverb, Echo, BassBoost, Normalize, Compression
-from processors.video_processor import VideoProcessor
+from processors.audio_processor import AudioProcessor
+from processors.ffmpeg_reader import ffmpeg_available
+from processors.preview_decoder import PreviewDecoder
+from processors.preview_cache import PreviewFrameCache
+from processors.proxy_media import ProxyGenerator
+from render.renderer import Renderer
+from utils.media_handler import MediaHandler
+from utils.media_probe import get_video_info
+from utils.fingerprint import chain_signature
+from processors.frame_pool import apply_effects
+from processors.face_tracker import get_face_track
 
 class PlaybackState:
     Stopped = 0
@@ -23,6 +38,11 @@ class PlaybackState:
     Paused = 2
 
 class MainWindow(QMainWindow):
+    # Emitted from the preview decoder thread when a frame is buffered
+    previewFrameReady = pyqtSignal()
+    # Emitted from the proxy thread with (source video, proxy path)
+    proxyReady = pyqtSignal(str, str)
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Galaxy Video Processor")
@@ -32,11 +52,9 @@ class MainWindow(QMainWindow):
         self.temp_dir = os.path.join(os.getcwd(), 'temp')
         os.makedirs(self.temp_dir, exist_ok=True)
         
-        # Initialize VideoProcessor and check FFmpeg
+        # Check FFmpeg, exports and audio extraction depend on it
         try:
-            self.video_processor = VideoProcessor(self.temp_dir)
-            ffmpeg_path = self.video_processor._get_ffmpeg_path()
-            if not os.path.exists(ffmpeg_path):
+            if not ffmpeg_available():
                 raise Exception("FFmpeg non trouvé")
         except Exception as e:
             QMessageBox.critical(
@@ -47,19 +65,53 @@ class MainWindow(QMainWindow):
             )
             sys.exit(1)
         
+        # Exports run on a background worker through the headless renderer
+        self.renderer = Renderer(self.temp_dir)
+        self.export_worker = None
+        
+        # Audio extracted from the imported video, for the audio preview
+        self.media_handler = MediaHandler()
+        self.source_audio = None
+        
         # Initialize variables
         self.input_video = None
         self.preview_audio = None
-        self.cap = None
+        self.preview_decoder = None
+        self.preview_index = 0
+        self._refresh_pending = False
+        self.preview_dropped = 0  # Buffered frames discarded for being late
+        # Process preview frames at display size rather than source size
+        self.preview_at_display_size = True
+        # Processed preview frames, so replaying a section only costs a blit
+        self.preview_cache = PreviewFrameCache(max_bytes=512 * 1024 * 1024)
+        
+        # The preview plays a low-resolution proxy once it is transcoded,
+        # exports always read the original
+        self.use_proxy_media = True
+        self.proxy_generator = ProxyGenerator()
+        self.preview_source = None
+        self.source_size = None
+        self._proxy_cancel = threading.Event()
+        self._proxy_thread = None
+        
         self.audio_player = None
         self.audio_output = None
         
+        # Face tracks computed in the background, keyed by (video, ratio)
+        self.face_tracks = {}
+        self._face_track_threads = {}
+        
         # Setup UI
         self.initUI()
         
-        # Setup preview timer
+        # Setup preview timer, it only shows frames the decoder has ready.
+        # Which frame is shown follows the decoder's presentation clock.
         self.preview_timer = QTimer()
+        self.preview_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.preview_timer.timeout.connect(self.update_preview)
+        self.previewFrameReady.connect(self._on_preview_frame_ready,
+                                       Qt.ConnectionType.QueuedConnection)
+        self.proxyReady.connect(self._on_proxy_ready, Qt.ConnectionType.QueuedConnection)
         
         # Set style
         self.setStyleSheet("""
@@ -162,16 +214,20 @@ class MainWindow(QMainWindow):
         # Import/Export buttons
         self.import_btn = QPushButton("Importer Vidéo")
         self.export_btn = QPushButton("Exporter")
+        self.cancel_export_btn = QPushButton("Annuler")
         
         self.import_btn.clicked.connect(self.import_video)
         self.export_btn.clicked.connect(self.export_video)
+        self.cancel_export_btn.clicked.connect(self.cancel_export)
         
-        # Initially disable export button
+        # Initially disable export button, cancel only shows during an export
         self.export_btn.setEnabled(False)
+        self.cancel_export_btn.setVisible(False)
         
         # Add buttons to layout
         top_layout.addWidget(self.import_btn)
         top_layout.addWidget(self.export_btn)
+        top_layout.addWidget(self.cancel_export_btn)
         
         # Add status label
         self.status_label = QLabel("Aucune vidéo chargée")
@@ -211,8 +267,12 @@ class MainWindow(QMainWindow):
         self.play_btn.setEnabled(False)
         self.stop_btn.setEnabled(False)
         
+        # Frames dropped to keep playback in time
+        self.dropped_label = QLabel("")
+        
         video_controls.addWidget(self.play_btn)
         video_controls.addWidget(self.stop_btn)
+        video_controls.addWidget(self.dropped_label)
         video_controls.addStretch()
         left_panel.addLayout(video_controls)
         
@@ -241,7 +301,7 @@ class MainWindow(QMainWindow):
         ]
         
         for name, effect_class in visual_effects_list:
-            effect_widget = EffectWidget(name, effect_class, callback=self.update_preview)
+            effect_widget = EffectWidget(name, effect_class, callback=self.on_video_effects_changed)
             self.visual_effects.append(effect_widget)
             self.video_effects_layout.addWidget(effect_widget)
         
@@ -346,10 +406,7 @@ class MainWindow(QMainWindow):
             ]
             
             # Process audio preview
-            preview_audio_path = self.video_processor.process_preview_audio(
-                self.input_video,
-                active_effects
-            )
+            preview_audio_path = self._process_preview_audio(active_effects)
             
             # Update audio player
             if not self.audio_player:
@@ -378,6 +435,18 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Erreur", f"Erreur lors de la prévisualisation audio: {str(e)}")
     
+    def _process_preview_audio(self, effects):
+        """Audio of the imported video with ``effects`` applied, as a temp WAV file"""
+        if self.source_audio is None:
+            self.source_audio = self.media_handler.extract_audio(self.input_video)
+        
+        # A new file each time, the player may still hold the previous one
+        preview_path = os.path.join(self.temp_dir, f"preview_audio_{int(time.time() * 1000)}.wav")
+        if not effects:
+            shutil.copyfile(self.source_audio, preview_path)
+            return preview_path
+        return AudioProcessor(self.temp_dir).process_audio(self.source_audio, preview_path, effects)
+    
     def handle_audio_status(self, status):
         """Handle audio player status changes"""
         if status == QMediaPlayer.MediaStatus.EndOfMedia:
@@ -396,20 +465,35 @@ class MainWindow(QMainWindow):
         if file_name:
             try:
                 self.input_video = file_name
+                self.source_audio = None
                 
                 # Update UI
                 self.import_btn.setText(os.path.basename(file_name))
                 self.status_label.setText("Vidéo chargée: " + os.path.basename(file_name))
                 self.export_btn.setEnabled(True)
                 
-                # Initialize video capture
-                if self.cap is not None:
-                    self.cap.release()
-                self.cap = cv2.VideoCapture(file_name)
+                # Decode and process preview frames in the background, from
+                # the proxy if there is one already
+                self.preview_timer.stop()
+                self._proxy_cancel.set()
+                info = get_video_info(file_name)
+                self.source_size = (info['width'], info['height'])
+                proxy = self.proxy_generator.get_cached(file_name) if self.use_proxy_media else None
+                self.preview_index = 0
+                self._open_preview(proxy or file_name, 0)
+                
+                # Otherwise transcode one, playback switches to it when done
+                if self.use_proxy_media and proxy is None:
+                    self._proxy_cancel = threading.Event()
+                    self._proxy_thread = threading.Thread(target=self._generate_proxy,
+                                                          args=(file_name, self._proxy_cancel),
+                                                          daemon=True)
+                    self._proxy_thread.start()
                 
-                # Enable video controls
+                # Enable video controls, the first frame shows once decoded
                 self.play_btn.setEnabled(True)
-                self.update_preview()
+                self.stop_btn.setEnabled(False)
+                self._refresh_pending = True
                 
                 # Generate initial audio preview
                 self.preview_audio_with_effects()
@@ -420,15 +504,27 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "Erreur", f"Erreur lors de l'importation: {str(e)}")
     
     def play_video(self):
-        if self.cap is not None:
-            self.preview_timer.start(33)  # ~30 fps
+        if self.preview_decoder is not None:
+            # Carry on from the frame after the one on screen
+            start_index = self.preview_index if self._refresh_pending else self.preview_index + 1
+            self._refresh_pending = False
+            self.preview_dropped = 0
+            self.preview_decoder.dropped = 0
+            self.dropped_label.setText("")
+            self.preview_decoder.clock.start(start_index)
+            
+            # Tick at twice the source frame rate so frames show close to their time
+            self.preview_timer.start(max(1, int(500 / self.preview_decoder.fps)))
             self.play_btn.setEnabled(False)
             self.stop_btn.setEnabled(True)
     
     def stop_video(self):
         self.preview_timer.stop()
-        if self.cap is not None:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        if self.preview_decoder is not None:
+            self.preview_decoder.clock.stop()
+            self.preview_decoder.seek(0)
+            self.preview_index = 0
+            self._refresh_pending = True
         self.play_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
     
@@ -450,25 +546,127 @@ class MainWindow(QMainWindow):
             self.audio_play_btn.setEnabled(True)
             self.audio_stop_btn.setEnabled(False)
     
+    def _compute_face_track(self, video_path, ratio):
+        try:
+            self.face_tracks[(video_path, ratio)] = get_face_track(video_path, ratio)
+        except Exception as e:
+            print(f"Erreur lors de l'analyse du visage: {str(e)}")
+    
+    def _attach_face_track(self, effect):
+        """Give a face-tracked Crop its precomputed path, computing it in the background"""
+        if not getattr(effect, 'track_face', False) or effect.face_track is not None:
+            return
+        
+        key = (self.input_video, effect.ratio)
+        track = self.face_tracks.get(key)
+        if track is not None:
+            effect.set_face_track(track)
+        elif key not in self._face_track_threads:
+            # Live detection is used until the analysis is done
+            thread = threading.Thread(target=self._compute_face_track, args=key, daemon=True)
+            self._face_track_threads[key] = thread
+            thread.start()
+    
+    def _open_preview(self, path, start_index):
+        """Start a preview decoder on ``path`` (the source or its proxy) at ``start_index``"""
+        if self.preview_decoder is not None:
+            self.preview_decoder.stop()
+        self.preview_decoder = PreviewDecoder(
+            path,
+            on_frame_ready=self.previewFrameReady.emit,
+            max_size=self.video_preview.display_size() if self.preview_at_display_size else None,
+            source_size=self.source_size,
+            cache=self.preview_cache
+        )
+        self.preview_source = path
+        self._set_preview_process(start_index)
+        if self.preview_timer.isActive():
+            self.preview_decoder.clock.start(start_index)
+        self.preview_decoder.start()
+    
+    def _generate_proxy(self, video_path, cancel_event):
+        try:
+            proxy = self.proxy_generator.generate(video_path, cancel_event)
+            if proxy:
+                self.proxyReady.emit(video_path, proxy)
+        except Exception as e:
+            print(f"Erreur lors de la création du proxy: {str(e)}")
+    
+    def _on_proxy_ready(self, video_path, proxy):
+        if video_path != self.input_video or self.preview_decoder is None:
+            return
+        # Carry on from the frame after the one on screen
+        start_index = self.preview_index if self._refresh_pending else self.preview_index + 1
+        self._open_preview(proxy, start_index)
+    
+    def _active_video_effects(self):
+        return [
+            effect_widget.get_effect()
+            for effect_widget in self.visual_effects
+            if effect_widget.get_effect()
+        ]
+    
+    def _preview_process(self, effects, scale=1.0):
+        """Frame processing for the preview decoder, runs on its thread"""
+        def process(frame, frame_index):
+            for effect in effects:
+                self._attach_face_track(effect)
+                if hasattr(effect, 'set_scale'):
+                    effect.set_scale(scale)
+                try:
+                    frame = apply_effects(frame, [effect], frame_index=frame_index)
+                except Exception as e:
+                    print(f"Erreur lors de l'application de l'effet: {str(e)}")
+            return frame
+        return process
+    
+    def _preview_cache_key(self, effects, scale):
+        """Key of the preview frames for this chain, None if they can't be reused"""
+        if any(getattr(effect, 'stateful', False) for effect in effects):
+            # Output depends on the frames processed before (LightBar, live face tracking)
+            return None
+        return (self.preview_source, chain_signature(effects), round(scale, 4))
+    
+    def _set_preview_process(self, from_index=None):
+        effects = self._active_video_effects()
+        scale = self.preview_decoder.scale
+        self.preview_decoder.set_process(self._preview_process(effects, scale), from_index,
+                                         cache_key=self._preview_cache_key(effects, scale))
+    
+    def on_video_effects_changed(self):
+        """Reprocess buffered frames with the new effects"""
+        if self.preview_decoder is None:
+            return
+        if self.preview_timer.isActive():
+            self._set_preview_process()
+        else:
+            # Paused: show the current frame again with the new effects
+            self._set_preview_process(self.preview_index)
+            self._refresh_pending = True
+    
+    def _on_preview_frame_ready(self):
+        if self._refresh_pending and not self.preview_timer.isActive():
+            self._refresh_pending = not self.update_preview()
+    
     def update_preview(self):
-        if self.cap is not None:
-            ret, frame = self.cap.read()
-            if ret:
-                # Create a copy of the frame
-                processed_frame = frame.copy()
-                
-                # Apply active effects
-                for effect_widget in self.visual_effects:
-                    effect = effect_widget.get_effect()
-                    if effect:
-                        try:
-                            processed_frame = effect.apply(processed_frame)
-                        except Exception as e:
-                            print(f"Erreur lors de l'application de l'effet: {str(e)}")
-                
-                self.video_preview.update_frame(processed_frame)
-            else:
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        """Show the next buffered frame; returns False if none was ready"""
+        if self.preview_decoder is None:
+            return False
+        
+        # Keep the last frame on screen if the decoder is behind, and skip
+        # frames that are already late
+        item, discarded = self.preview_decoder.read_due()
+        if discarded:
+            self.preview_dropped += discarded
+        if self.preview_timer.isActive():
+            dropped = self.preview_dropped + self.preview_decoder.dropped
+            if dropped:
+                self.dropped_label.setText(f"Images sautées: {dropped}")
+        if item is None:
+            return False
+        self.preview_index, frame = item
+        self.video_preview.update_frame(frame)
+        return True
     
     def update_audio_time(self):
         if self.audio_player and self.audio_player.duration() > 0:
@@ -491,45 +689,75 @@ class MainWindow(QMainWindow):
         )
         
         if file_name:
-            try:
-                # Get active effects
-                active_video_effects = [
-                    effect_widget.get_effect() 
-                    for effect_widget in self.visual_effects 
-                    if effect_widget.get_effect()
-                ]
-                
-                active_audio_effects = [
-                    effect_widget.get_effect() 
-                    for effect_widget in self.audio_effects 
-                    if effect_widget.get_effect()
-                ]
-                
-                # Progress callback
-                def update_progress(progress):
-                    self.progress_bar.setValue(int(progress))
-                    self.status_label.setText(f"Export en cours... {int(progress)}%")
-                    QApplication.processEvents()
-                
-                # Process video and audio
-                self.status_label.setText("Traitement de la vidéo et de l'audio...")
-                self.video_processor.process(
-                    self.input_video,
-                    file_name,
-                    active_video_effects,
-                    active_audio_effects,
-                    update_progress
-                )
-                
-                self.status_label.setText("Export terminé!")
-                QMessageBox.information(self, "Succès", "Vidéo exportée avec succès!")
-                
-            except Exception as e:
-                self.status_label.setText("Erreur lors de l'export!")
-                QMessageBox.critical(self, "Erreur", f"Erreur lors de l'exportation: {str(e)}")
-            finally:
-                self.progress_bar.setValue(0)
-                self.status_label.setText("Prêt")
+            # The export gets its own copies, the preview keeps using (and
+            # mutating) the effects shown in the panel
+            active_video_effects = [
+                copy.deepcopy(effect_widget.get_effect()) 
+                for effect_widget in self.visual_effects 
+                if effect_widget.get_effect()
+            ]
+            for effect in active_video_effects:
+                # The preview may have scaled pixel-sized parameters down
+                if hasattr(effect, 'set_scale'):
+                    effect.set_scale(1.0)
+            
+            active_audio_effects = [
+                copy.deepcopy(effect_widget.get_effect()) 
+                for effect_widget in self.audio_effects 
+                if effect_widget.get_effect()
+            ]
+            
+            self.export_worker = ExportWorker(
+                self.renderer,
+                self.input_video,
+                file_name,
+                active_video_effects,
+                active_audio_effects,
+                parent=self
+            )
+            self.export_worker.progressChanged.connect(self._on_export_progress)
+            self.export_worker.exportFinished.connect(self._on_export_finished)
+            self.export_worker.exportFailed.connect(self._on_export_failed)
+            self.export_worker.exportCancelled.connect(self._on_export_cancelled)
+            self.export_worker.finished.connect(self._on_export_thread_done)
+            
+            self.export_btn.setEnabled(False)
+            self.import_btn.setEnabled(False)
+            self.cancel_export_btn.setEnabled(True)
+            self.cancel_export_btn.setVisible(True)
+            self.progress_bar.setValue(0)
+            self.status_label.setText("Traitement de la vidéo et de l'audio...")
+            self.export_worker.start()
+    
+    def cancel_export(self):
+        if self.export_worker is not None and self.export_worker.isRunning():
+            self.export_worker.cancel()
+            self.cancel_export_btn.setEnabled(False)
+            self.status_label.setText("Annulation de l'export...")
+    
+    def _on_export_progress(self, progress):
+        self.progress_bar.setValue(progress)
+        if not self.export_worker or not self.export_worker.is_cancelling():
+            self.status_label.setText(f"Export en cours... {progress}%")
+    
+    def _on_export_finished(self, output_path):
+        self.status_label.setText("Export terminé!")
+        QMessageBox.information(self, "Succès", "Vidéo exportée avec succès!")
+    
+    def _on_export_failed(self, message):
+        self.status_label.setText("Erreur lors de l'export!")
+        QMessageBox.critical(self, "Erreur", f"Erreur lors de l'exportation: {message}")
+    
+    def _on_export_cancelled(self):
+        self.status_label.setText("Export annulé")
+    
+    def _on_export_thread_done(self):
+        self.export_worker.deleteLater()
+        self.export_worker = None
+        self.progress_bar.setValue(0)
+        self.export_btn.setEnabled(self.input_video is not None)
+        self.import_btn.setEnabled(True)
+        self.cancel_export_btn.setVisible(False)
     
     def closeEvent(self, event):
         # Stop any audio playback
@@ -537,12 +765,23 @@ class MainWindow(QMainWindow):
             self.audio_player.stop()
             self.audio_player = None
         
-        # Release video capture
-        if self.cap is not None:
-            self.cap.release()
+        # Stop the preview decoder and proxy transcode
+        self._proxy_cancel.set()
+        if self._proxy_thread is not None:
+            self._proxy_thread.join(timeout=2)
+        self.preview_timer.stop()
+        if self.preview_decoder is not None:
+            self.preview_decoder.stop()
+            self.preview_decoder = None
+        
+        # Stop a running export, it removes its partial output
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            self.export_worker.wait()
         
         # Cleanup processor
-        self.video_processor.cleanup()
+        self.media_handler.cleanup()
+        self.renderer.export_processor.cleanup()
         
         # Remove preview audio if exists
         if self.preview_audio and os.path.exists(self.preview_audio):
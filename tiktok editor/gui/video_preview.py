@@ -20,6 +20,11 @@ class VideoPreviewWidget(QLabel):
             }
         """)
     
+    def display_size(self):
+        """Size in device pixels that frames are shown at"""
+        ratio = self.devicePixelRatioF()
+        return int(self.width() * ratio), int(self.height() * ratio)
+    
     def update_frame(self, frame):
         if frame is not None:
             try:
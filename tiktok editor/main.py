@@ -1,7 +1,5 @@
 import sys
-from PyQt6.QtWidgets import QApplication
 import os
-from gui.main_window import MainWindow
 
 def ensure_directories():
     """Ensure all necessary directories exist"""
@@ -17,6 +15,20 @@ def ensure_directories():
         os.makedirs(directory, exist_ok=True)
 
 def main():
+    # Optional import-time breakdown, installed before anything heavy is imported
+    profiler = None
+    if '--profile-startup' in sys.argv:
+        sys.argv.remove('--profile-startup')
+        from utils.startup_profiler import StartupProfiler
+        profiler = StartupProfiler()
+        profiler.install()
+    
+    # Imported here so the profiler sees them
+    from PyQt6.QtWidgets import QApplication
+    from gui.main_window import MainWindow
+    if profiler:
+        profiler.mark("imports done")
+    
     # Create necessary directories
     ensure_directories()
     
@@ -33,6 +45,11 @@ def main():
     window = MainWindow()
     window.show()
     
+    if profiler:
+        profiler.mark("first window shown")
+        profiler.uninstall()
+        print(profiler.report())
+    
     # Start application event loop
     sys.exit(app.exec())
 
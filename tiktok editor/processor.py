@@ -2,6 +2,7 @@ import cv2
 import numpy as np
 from effects.visual_effects import *
 from effects.audio_effects import *
+from processors.ffmpeg_reader import open_video_source
 
 class VideoProcessor:
     def __init__(self):
@@ -15,7 +16,7 @@ class VideoProcessor:
         self.audio_effects.append(effect)
     
     def process_video(self, input_path, output_path):
-        cap = cv2.VideoCapture(input_path)
+        cap = open_video_source(input_path)
         
         # Get video properties
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -1,4 +1,5 @@
-from .video_processor import VideoProcessor
+from .export_processor import ExportProcessor
 from .audio_processor import AudioProcessor
+from .frame_pipeline import ExportCancelled
 
-__all__ = ['VideoProcessor', 'AudioProcessor']
+__all__ = ['ExportProcessor', 'AudioProcessor', 'ExportCancelled']
@@ -1,16 +1,18 @@
 import numpy as np
 import soundfile as sf
-import librosa
-import torch
-import torch.cuda
 from concurrent.futures import ThreadPoolExecutor
 import os
 import logging
 from pathlib import Path
 import subprocess
 from typing import List, Tuple, Optional
-import resampy
 import time
+from utils.lazy_import import lazy_import
+
+# Heavy dependencies, imported on first use
+librosa = lazy_import('librosa')
+torch = lazy_import('torch')
+resampy = lazy_import('resampy')
 
 class AudioProcessor:
     def __init__(self, temp_dir: str):
@@ -167,15 +169,15 @@ class AudioProcessor:
                     try:
                         processed_chunk = future.result()
                         processed_chunks.append(processed_chunk)
-                        
-                        if progress_callback:
-                            progress = (i + 1) / total_chunks * 100
-                            progress_callback(progress)
-                            
                     except Exception as e:
                         self.logger.error(f"Error processing chunk {i}: {str(e)}")
                         # Use original chunk if processing failed
                         processed_chunks.append(chunks[i])
+                    
+                    # Outside the try so a cancelling callback stops the export
+                    if progress_callback:
+                        progress = (i + 1) / total_chunks * 100
+                        progress_callback(progress)
             
             # Combine chunks
             processed_audio = np.concatenate(processed_chunks)
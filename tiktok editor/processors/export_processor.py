@@ -4,30 +4,74 @@ import soundfile as sf
 import subprocess
 import os
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import torch
-import torch.cuda
 import logging
 import time
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from dataclasses import asdict
 from typing import Optional, List, Callable
 from .audio_processor import AudioProcessor
+from .frame_pipeline import FramePipeline, ExportCancelled
+from .frame_pool import FramePool, apply_effects, backup_for_in_place
+from .segment_export import SegmentExporter
+from .ffmpeg_writer import FFmpegWriter, EncoderSettings
+from .ffmpeg_reader import open_video_source
+from .face_tracker import get_face_track
+from .render_cache import RenderCache
+from utils.media_probe import get_duration
+from utils.fingerprint import file_fingerprint, chain_signature, cache_dir
+from utils.file_lock import FileLock
+from utils.gpu_utils import opencv_cuda_available
+from effects.visual.planner import EffectChainPlanner, EffectPlan
 
 class ExportProcessor:
-    def __init__(self, temp_dir: str):
+    def __init__(self, temp_dir: str, num_threads: Optional[int] = None):
         self.temp_dir = temp_dir
-        self.use_gpu = torch.cuda.is_available()
-        self.num_threads = os.cpu_count()
+        # The GPU path runs on OpenCV's CUDA module, so ask OpenCV (importing
+        # torch just for this check costs seconds)
+        self.use_gpu = opencv_cuda_available()
+        # Core budget for frame workers and segment processes (all cores by default)
+        self.num_threads = num_threads or os.cpu_count()
         self.logger = self._setup_logger()
         
-        # Initialize GPU if available
+        # Long sources on machines with enough cores are rendered as
+        # keyframe-aligned segments in parallel processes
+        self.segment_min_duration = 120.0  # seconds
+        self.segment_min_cores = 4
+        
+        # Video is encoded by FFmpeg from raw frames (H.264 by default)
+        self.encoder_settings = EncoderSettings()
+        
+        # Frame source: 'ffmpeg', 'opencv' or 'auto'; 0 decoder threads lets FFmpeg decide
+        self.decoder_backend = 'auto'
+        self.decode_threads = 0
+        
+        # Reorders, fuses and skips effects before rendering; exact by
+        # default so exports match the preview, set planner.exact = False
+        # to also allow rewrites that change pixels at the crop edges
+        self.planner = EffectChainPlanner()
+        
+        # Face-tracked crops follow a precomputed (and cached) crop path
+        self.face_track_prepass = True
+        
+        # Segmented exports keep finished segments in a workspace under
+        # cache/exports, so a failed or interrupted export resumes there.
+        # True also segments long exports that would otherwise render in a
+        # single pipeline, to make them resumable; False disables checkpoints
+        self.resumable: Optional[bool] = None
+        self.checkpoint_min_duration = 60.0  # seconds
+        self.checkpoint_max_age = 7 * 24 * 3600.0  # seconds
+        
+        # Finished exports are kept under cache/renders; exporting the same
+        # source with the same effects and settings again reuses them
+        self.use_render_cache = True
+        self.render_cache = RenderCache()
+        
         if self.use_gpu:
-            try:
-                torch.cuda.empty_cache()
-                torch.cuda.init()
-                self.logger.info("GPU initialized successfully")
-            except Exception as e:
-                self.logger.warning(f"GPU initialization failed: {str(e)}")
-                self.use_gpu = False
+            self.logger.info("OpenCV CUDA device available")
         
         # Create temp directory if it doesn't exist
         os.makedirs(temp_dir, exist_ok=True)
@@ -44,7 +88,8 @@ class ExportProcessor:
         
         return logger
     
-    def _process_frame_gpu(self, frame: np.ndarray, effects: list) -> np.ndarray:
+    def _process_frame_gpu(self, frame: np.ndarray, effects: list,
+                           frame_index: Optional[int] = None) -> np.ndarray:
         try:
             gpu_frame = cv2.cuda_GpuMat()
             gpu_frame.upload(frame)
@@ -54,27 +99,47 @@ class ExportProcessor:
                     gpu_frame = effect.apply_gpu(gpu_frame)
                 else:
                     cpu_frame = gpu_frame.download()
-                    cpu_frame = effect.apply(cpu_frame)
+                    cpu_frame = apply_effects(cpu_frame, [effect], frame_index=frame_index)
                     gpu_frame.upload(cpu_frame)
             
             return gpu_frame.download()
         except Exception as e:
             self.logger.error(f"GPU processing error: {str(e)}")
-            return self._process_frame_cpu(frame, effects)
+            return self._process_frame_cpu(frame, effects, frame_index=frame_index)
     
-    def _process_frame_cpu(self, frame: np.ndarray, effects: list) -> np.ndarray:
+    def _process_frame_cpu(self, frame: np.ndarray, effects: list,
+                           pool: Optional[FramePool] = None,
+                           frame_index: Optional[int] = None) -> np.ndarray:
+        # The pipeline owns ``frame``, so in-place effects can write into it;
+        # keep a copy so an error still yields the unprocessed frame
+        backup = backup_for_in_place(frame, effects, pool)
         try:
-            processed_frame = frame.copy()
-            for effect in effects:
-                processed_frame = effect.apply(processed_frame)
-            return processed_frame
+            processed = apply_effects(frame, effects, pool, frame_index)
         except Exception as e:
             self.logger.error(f"CPU processing error: {str(e)}")
-            return frame
+            return backup if backup is not None else frame
+        if pool is not None:
+            pool.release(backup)
+        return processed
+    
+    def plan_effects(self, video_effects: list) -> EffectPlan:
+        """Plan the effect chain that will actually be rendered"""
+        plan = self.planner.plan(video_effects)
+        self.logger.info(f"Effect plan:\n{plan.describe()}")
+        return plan
+    
+    def _split_effects(self, effects: list):
+        """Split effects into a parallel prefix and an in-order suffix"""
+        for i, effect in enumerate(effects):
+            if getattr(effect, 'stateful', False):
+                return effects[:i], effects[i:]
+        return effects, []
     
     def _process_video(self, input_path: str, output_path: str, video_effects: list, 
-                      progress_callback: Optional[Callable] = None) -> bool:
-        """Process video with effects"""
+                      progress_callback: Optional[Callable] = None,
+                      audio_path: Optional[str] = None,
+                      cancel_event: Optional[threading.Event] = None) -> bool:
+        """Process video with effects, muxing ``audio_path`` into the same output"""
         cap = None
         out = None
         
@@ -82,49 +147,48 @@ class ExportProcessor:
             self.logger.info(f"Processing video: {input_path}")
             
             # Open input video
-            cap = cv2.VideoCapture(input_path)
+            cap = open_video_source(input_path, backend=self.decoder_backend,
+                                    threads=self.decode_threads)
             if not cap.isOpened():
                 raise Exception("Cannot open input video")
             
             # Get video properties
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = int(cap.get(cv2.CAP_PROP_FPS))
+            fps = cap.get(cv2.CAP_PROP_FPS)
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             
-            # Create video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            # Frames are piped straight into the FFmpeg encoder
+            out = FFmpegWriter(output_path, fps, audio_path=audio_path,
+                               settings=self.encoder_settings)
             
-            if not out.isOpened():
-                raise Exception("Cannot create output video")
+            # Stateless effects run on worker threads, stateful ones in frame order
+            parallel_effects, serial_effects = self._split_effects(video_effects)
             
-            frames_processed = 0
+            # Decoded and intermediate frames are recycled through one pool
+            pool = FramePool()
             
-            with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-                while True:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    
-                    # Process frame
-                    if self.use_gpu:
-                        processed_frame = self._process_frame_gpu(frame, video_effects)
-                    else:
-                        processed_frame = self._process_frame_cpu(frame, video_effects)
-                    
-                    # Write processed frame
-                    out.write(processed_frame)
-                    
-                    # Update progress
-                    frames_processed += 1
-                    if progress_callback:
-                        progress = (frames_processed / total_frames) * 100
-                        progress_callback(progress)
+            def process_parallel(frame, index):
+                if self.use_gpu:
+                    return self._process_frame_gpu(frame, parallel_effects, index)
+                return self._process_frame_cpu(frame, parallel_effects, pool, index)
+            
+            def process_serial(frame, index):
+                return self._process_frame_cpu(frame, serial_effects, pool, index)
+            
+            pipeline = FramePipeline(process_parallel, num_workers=self.num_threads, pool=pool)
+            frames_processed = pipeline.run(
+                cap, out,
+                serial_process=process_serial if serial_effects else None,
+                total_frames=total_frames,
+                progress_callback=progress_callback,
+                cancel_event=cancel_event
+            )
+            out.release()
             
-            self.logger.info("Video processing completed")
+            self.logger.info(f"Video processing completed ({frames_processed} frames)")
             return True
             
+        except ExportCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"Error processing video: {str(e)}")
             raise
@@ -133,7 +197,108 @@ class ExportProcessor:
             if cap is not None:
                 cap.release()
             if out is not None:
-                out.release()
+                out.abort()
+    
+    def _prepare_face_tracks(self, input_video: str, video_effects: list,
+                             progress_callback: Optional[Callable] = None):
+        """Attach a precomputed crop path to every face-tracked Crop"""
+        crops = [effect for effect in video_effects
+                 if getattr(effect, 'track_face', False) and hasattr(effect, 'set_face_track')]
+        
+        for i, crop in enumerate(crops):
+            def track_progress(p, i=i):
+                if progress_callback:
+                    progress_callback((i + p / 100) / len(crops) * 100)
+            
+            try:
+                crop.set_face_track(get_face_track(input_video, crop.ratio, track_progress,
+                                                   decoder_backend=self.decoder_backend))
+            except ExportCancelled:
+                raise
+            except Exception as e:
+                # Live tracking still works, just slower and in frame order
+                self.logger.warning(f"Face track analysis failed: {str(e)}")
+    
+    def _choose_strategy(self, input_video: str, video_effects: list) -> str:
+        """Pick 'segmented' or 'pipeline' rendering from duration and core count"""
+        # Segments restart effect state, so stateful chains stay in one stream
+        if any(getattr(effect, 'stateful', False) for effect in video_effects):
+            return 'pipeline'
+        
+        try:
+            duration = get_duration(input_video)
+        except Exception as e:
+            self.logger.warning(f"Could not probe duration: {str(e)}")
+            return 'pipeline'
+        
+        # Worth segmenting even on few cores when checkpoints were asked for,
+        # but segments render on the CPU, so not at the expense of the GPU
+        if self.resumable and not self.use_gpu and duration >= self.checkpoint_min_duration:
+            return 'segmented'
+        
+        if (self.num_threads or 1) < self.segment_min_cores:
+            return 'pipeline'
+        
+        return 'segmented' if duration >= self.segment_min_duration else 'pipeline'
+    
+    def checkpoint_key(self, input_video: str, video_effects: list,
+                       audio_effects: Optional[list] = None) -> str:
+        """Identifies an export: same source, effect chains, encoder and rendering settings"""
+        settings = asdict(self.encoder_settings)
+        settings.pop('threads', None)  # Only changes speed
+        data = {
+            'source': file_fingerprint(input_video),
+            'video': chain_signature(video_effects),
+            'audio': chain_signature(audio_effects or []),
+            'encoder': settings,
+            # Both change the rendered pixels
+            'face_track_prepass': self.face_track_prepass,
+            'exact_planning': self.planner.exact,
+        }
+        return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()[:20]
+    
+    def render_cache_key(self, input_video: str, video_effects: list,
+                         audio_effects: Optional[list] = None, with_audio: bool = True) -> str:
+        """Identifies the output file: the export, and whether source audio is muxed"""
+        key = self.checkpoint_key(input_video, video_effects, audio_effects)
+        return hashlib.sha1(f"{key}:audio={with_audio}".encode()).hexdigest()[:20]
+    
+    def checkpoint_workspace(self, key: str) -> str:
+        return os.path.join(cache_dir('exports'), key)
+    
+    def _lock_workspace(self, key: str) -> Optional[FileLock]:
+        """Lock the checkpoint workspace of ``key``, None if another export holds it"""
+        lock = FileLock(os.path.join(cache_dir('exports'), f"{key}.lock"))
+        return lock if lock.acquire(blocking=False) else None
+    
+    def _prune_checkpoints(self):
+        """Drop checkpoints of exports nobody resumed for ``checkpoint_max_age``"""
+        root = cache_dir('exports')
+        now = time.time()
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            try:
+                if now - os.path.getmtime(path) > self.checkpoint_max_age:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        os.remove(path)
+            except OSError:
+                continue
+    
+    def _process_video_segmented(self, input_path: str, output_path: str, video_effects: list,
+                                 progress_callback: Optional[Callable] = None,
+                                 audio_path: Optional[str] = None,
+                                 cancel_event: Optional[threading.Event] = None,
+                                 workspace: Optional[str] = None,
+                                 checkpoint_key: Optional[str] = None) -> bool:
+        """Process video as parallel keyframe-aligned segments"""
+        exporter = SegmentExporter(self.temp_dir, self.num_threads, self.logger,
+                                   settings=self.encoder_settings,
+                                   decoder_backend=self.decoder_backend)
+        return exporter.export(input_path, output_path, video_effects, progress_callback,
+                               audio_path=audio_path, cancel_event=cancel_event,
+                               workspace=workspace, checkpoint_key=checkpoint_key)
     
     def _assemble_final_video(self, video_path: str, audio_path: str, output_path: str) -> bool:
         """Assemble final video with FFmpeg"""
@@ -175,38 +340,79 @@ class ExportProcessor:
     
     def export(self, input_video: str, output_path: str, video_effects: list, 
               audio_effects: Optional[list] = None, temp_audio: Optional[str] = None, 
-              progress_callback: Optional[Callable] = None) -> str:
-        """Export video with effects"""
+              progress_callback: Optional[Callable] = None, strategy: str = 'auto',
+              cancel_event: Optional[threading.Event] = None) -> str:
+        """Export video with effects
+
+        ``strategy`` is 'pipeline' (single process, threaded), 'segmented'
+        (parallel processes) or 'auto' to choose from duration and core count.
+        Chains with stateful effects (LightBar, live face tracking) always
+        use the pipeline, segments would reset their state.
+        Setting ``cancel_event`` stops the export, removes the partial output
+        and raises ExportCancelled. Segmented exports are checkpointed (see
+        ``resumable``): running the same export again after a failure only
+        renders the segments that were not finished. An export whose
+        checkpoint workspace is in use by the same export running elsewhere
+        renders in a private workspace instead. With
+        ``use_render_cache`` an export that was already rendered is linked
+        or copied from the render cache instead.
+        """
         temp_files = []
+        workspace = None
+        checkpoint_key = None
+        workspace_lock = None
+        private_workspace = False
+        render_key = None
+        
+        def check_cancelled():
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled("Export cancelled")
         
         try:
+            if self.use_render_cache and output_path != input_video:
+                render_key = self.render_cache_key(input_video, video_effects, audio_effects,
+                                                   temp_audio is not None)
+                if self.render_cache.fetch(render_key, output_path):
+                    if progress_callback:
+                        progress_callback(100)
+                    self.logger.info(f"Export reused from the render cache: {output_path}")
+                    return output_path
+                if os.path.exists(output_path) and os.stat(output_path).st_nlink > 1:
+                    # Don't overwrite a render cache entry through a link
+                    os.remove(output_path)
+            
             # Create temporary files
             timestamp = str(int(time.time()))
-            temp_video = os.path.join(self.temp_dir, f"temp_video_{timestamp}.mp4")
             temp_audio_processed = os.path.join(self.temp_dir, f"temp_audio_{timestamp}.wav")
-            temp_files.extend([temp_video, temp_audio_processed])
+            temp_files.append(temp_audio_processed)
             
-            # 1. Process video (60% of progress)
-            def video_progress(p):
-                if progress_callback:
-                    progress_callback(p * 0.6)
-            
-            if video_effects:
-                self.logger.info("Processing video with effects")
-                self._process_video(input_video, temp_video, video_effects, video_progress)
-            else:
-                self.logger.info("No video effects, using original video")
-                temp_video = input_video
+            if self.resumable is not False and video_effects:
+                self._prune_checkpoints()
+                checkpoint_key = self.checkpoint_key(input_video, video_effects, audio_effects)
+                workspace_lock = self._lock_workspace(checkpoint_key)
+                if workspace_lock is not None:
+                    workspace = self.checkpoint_workspace(checkpoint_key)
+                else:
+                    # Both would write the same segment files, and the first
+                    # to finish would remove them under the other
+                    self.logger.info("Same export already running, rendering without checkpoints")
+                    workspace = tempfile.mkdtemp(prefix='export_', dir=self.temp_dir)
+                    private_workspace = True
+            checkpointed_audio = os.path.join(workspace, 'audio.wav') if workspace else None
             
-            # 2. Process audio if available (20% of progress)
+            # 1. Process audio first so the video encoder can mux it (20% of progress)
             audio_to_use = temp_audio
-            if temp_audio and audio_effects:
+            if temp_audio and audio_effects and checkpointed_audio and os.path.exists(checkpointed_audio):
+                self.logger.info("Reusing processed audio from the checkpoint")
+                audio_to_use = checkpointed_audio
+            elif temp_audio and audio_effects:
                 self.logger.info("Processing audio with effects")
                 audio_processor = AudioProcessor(self.temp_dir)
                 
                 def audio_progress(p):
+                    check_cancelled()
                     if progress_callback:
-                        progress_callback(60 + p * 0.2)
+                        progress_callback(p * 0.2)
                 
                 audio_processor.process_audio(
                     temp_audio,
@@ -216,29 +422,92 @@ class ExportProcessor:
                 )
                 audio_to_use = temp_audio_processed
             
-            # 3. Final assembly (20% of progress)
+            check_cancelled()
             if progress_callback:
-                progress_callback(80)
+                progress_callback(20)
             
-            if audio_to_use:
-                self._assemble_final_video(temp_video, audio_to_use, output_path)
+            # 2. Face tracking pre-pass (20% of progress when needed)
+            video_start = 20
+            if self.face_track_prepass and any(getattr(e, 'track_face', False) for e in video_effects):
+                self.logger.info("Analyzing face track")
+                
+                def track_progress(p):
+                    check_cancelled()
+                    if progress_callback:
+                        progress_callback(20 + p * 0.2)
+                
+                self._prepare_face_tracks(input_video, video_effects, track_progress)
+                video_start = 40
+            
+            # 3. Encode video and mux audio in a single pass (rest of progress)
+            def video_progress(p):
+                if progress_callback:
+                    progress_callback(video_start + p * (100 - video_start) / 100)
+            
+            if video_effects:
+                video_effects = self.plan_effects(video_effects).effects
+            
+            if video_effects:
+                if strategy == 'auto':
+                    strategy = self._choose_strategy(input_video, video_effects)
+                elif strategy == 'segmented' and any(getattr(e, 'stateful', False) for e in video_effects):
+                    # Segments would restart the effect state at every boundary
+                    self.logger.warning("Stateful effects can't be rendered in segments, using the pipeline")
+                    strategy = 'pipeline'
+                self.logger.info(f"Processing video with effects ({strategy})")
+                if strategy == 'segmented':
+                    if workspace:
+                        os.makedirs(workspace, exist_ok=True)
+                        if audio_to_use == temp_audio_processed:
+                            # Keep the processed audio with the segments
+                            os.replace(temp_audio_processed, checkpointed_audio)
+                            audio_to_use = checkpointed_audio
+                    self._process_video_segmented(input_video, output_path, video_effects,
+                                                  video_progress, audio_path=audio_to_use,
+                                                  cancel_event=cancel_event,
+                                                  workspace=workspace,
+                                                  checkpoint_key=checkpoint_key)
+                else:
+                    self._process_video(input_video, output_path, video_effects,
+                                        video_progress, audio_path=audio_to_use,
+                                        cancel_event=cancel_event)
+            elif audio_to_use:
+                self.logger.info("No video effects, using original video")
+                self._assemble_final_video(input_video, audio_to_use, output_path)
             else:
-                # If no audio, just copy the video
-                if temp_video != input_video:
-                    import shutil
-                    shutil.copy2(temp_video, output_path)
+                # Nothing to change, just copy the video
+                shutil.copy2(input_video, output_path)
             
             if progress_callback:
                 progress_callback(100)
             
+            if workspace and os.path.isdir(workspace):
+                shutil.rmtree(workspace, ignore_errors=True)
+            
+            if render_key:
+                self.render_cache.store(render_key, output_path)
+            
             self.logger.info(f"Export completed: {output_path}")
             return output_path
             
+        except ExportCancelled:
+            self.logger.info("Export cancelled")
+            # Whatever was written is an unusable partial file
+            if os.path.exists(output_path) and output_path != input_video:
+                os.remove(output_path)
+            raise
+            
         except Exception as e:
             self.logger.error(f"Export error: {str(e)}")
+            if workspace and os.path.isdir(workspace) and not private_workspace:
+                self.logger.info(f"Finished segments kept in {workspace}, exporting again resumes from there")
             raise
             
         finally:
+            if private_workspace:
+                shutil.rmtree(workspace, ignore_errors=True)
+            if workspace_lock is not None:
+                workspace_lock.release()
             # Cleanup temporary files
             for temp_file in temp_files:
                 try:
@@ -250,9 +519,6 @@ class ExportProcessor:
     def cleanup(self):
         """Clean up resources"""
         try:
-            if self.use_gpu:
-                torch.cuda.empty_cache()
-            
             if os.path.exists(self.temp_dir):
                 for file in os.listdir(self.temp_dir):
                     file_path = os.path.join(self.temp_dir, file)
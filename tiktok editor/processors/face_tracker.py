@@ -0,0 +1,159 @@
+import os
+import cv2
+import logging
+import threading
+import numpy as np
+from types import SimpleNamespace
+from typing import Optional, Callable
+
+from effects.visual.crop import Crop, CropRegion, VideoRatio
+from effects.visual.face_track import FaceTrack
+from effects.visual.face_detector_pool import get_face_detector_pool
+from utils.fingerprint import file_fingerprint, cache_dir
+from .ffmpeg_reader import open_video_source
+
+# Bump when the analysis changes so stale sidecar files are recomputed
+TRACK_VERSION = 1
+
+
+def face_track_path(video_path: str, ratio: VideoRatio) -> str:
+    """Sidecar file of the face track for ``video_path`` cropped to ``ratio``"""
+    label = ratio.label.replace(':', 'x')
+    name = f"{file_fingerprint(video_path)}_{label}_v{TRACK_VERSION}.npz"
+    return os.path.join(cache_dir('face_tracks'), name)
+
+
+def _smooth(values: np.ndarray, alpha: float) -> np.ndarray:
+    """Zero-lag smoothing: exponential filter run forwards, then backwards"""
+    smoothed = values.astype(np.float64).copy()
+    for i in range(1, len(smoothed)):
+        smoothed[i] = smoothed[i - 1] + alpha * (smoothed[i] - smoothed[i - 1])
+    for i in range(len(smoothed) - 2, -1, -1):
+        smoothed[i] = smoothed[i + 1] + alpha * (smoothed[i] - smoothed[i + 1])
+    return smoothed
+
+
+class FaceTrackAnalyzer:
+    """Detects faces across a whole clip and solves a smooth crop path.
+
+    Faces are detected on downscaled frames every ``sample_every`` frames,
+    interpolated to every frame and smoothed forwards and backwards (so the
+    window does not lag behind the face), then turned into crop windows with
+    the same framing rules as Crop.
+    """
+
+    def __init__(self, sample_every: int = 3, detection_size: int = 320,
+                 smoothing_time: float = 0.4, decoder_backend: str = 'auto'):
+        self.sample_every = max(1, sample_every)
+        self.detection_size = detection_size
+        self.smoothing_time = smoothing_time  # seconds
+        self.decoder_backend = decoder_backend
+        self.logger = logging.getLogger('FaceTrackAnalyzer')
+
+    def _detect_samples(self, video_path: str, progress_callback: Optional[Callable] = None):
+        """Relative face boxes (xmin, ymin, width, height) at sampled frame indices"""
+        probe = open_video_source(video_path, backend=self.decoder_backend)
+        width = int(probe.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = probe.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(probe.get(cv2.CAP_PROP_FRAME_COUNT))
+        probe.release()
+
+        # Decode straight at detection size when FFmpeg can scale for us
+        scale = (self.detection_size, None) if width >= height else (None, self.detection_size)
+        cap = open_video_source(video_path, backend=self.decoder_backend, scale=scale)
+
+        indices, boxes = [], []
+        index = 0
+        try:
+            with get_face_detector_pool().borrow() as detector:
+                while True:
+                    if index % self.sample_every:
+                        if not cap.grab():
+                            break
+                        index += 1
+                        continue
+
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    if max(frame.shape[:2]) > self.detection_size:
+                        factor = self.detection_size / max(frame.shape[:2])
+                        frame = cv2.resize(frame, (int(frame.shape[1] * factor), int(frame.shape[0] * factor)),
+                                           interpolation=cv2.INTER_AREA)
+
+                    results = detector.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    if results.detections:
+                        bbox = results.detections[0].location_data.relative_bounding_box
+                        indices.append(index)
+                        boxes.append((bbox.xmin, bbox.ymin, bbox.width, bbox.height))
+
+                    index += 1
+                    if progress_callback and total_frames > 0:
+                        progress_callback(min(100.0, index / total_frames * 100))
+        finally:
+            cap.release()
+
+        return width, height, fps, index, np.array(indices), np.array(boxes, dtype=np.float64)
+
+    def analyze(self, video_path: str, ratio: VideoRatio,
+                progress_callback: Optional[Callable] = None) -> FaceTrack:
+        """Compute the crop path of ``video_path`` for ``ratio``"""
+        width, height, fps, frame_count, indices, boxes = self._detect_samples(video_path, progress_callback)
+        self.logger.info(f"Face found on {len(indices)} sampled frames out of {frame_count}")
+
+        rects = np.full((frame_count, 4), np.nan, dtype=np.float32)
+        if not len(indices) or not frame_count:
+            return FaceTrack(rects, fps)
+
+        # Face regions in source pixels at the sampled frames
+        regions = np.array([
+            [r.x, r.y, r.width, r.height]
+            for r in (Crop._face_region_from_bbox(SimpleNamespace(xmin=b[0], ymin=b[1], width=b[2], height=b[3]),
+                                                  width, height) for b in boxes)
+        ], dtype=np.float64)
+
+        # Interpolate between samples (holding the ends) and smooth without lag
+        frames = np.arange(frame_count)
+        alpha = 1 - np.exp(-1 / max(1e-3, self.smoothing_time * fps))
+        path = np.stack([_smooth(np.interp(frames, indices, regions[:, i]), alpha) for i in range(4)], axis=1)
+
+        crop = Crop(ratio)
+        for i, (x, y, w, h) in enumerate(path):
+            region = CropRegion(int(round(x)), int(round(y)), int(round(w)), int(round(h)))
+            cx, cy, cw, ch = crop.crop_from_face(region, width, height)
+            rects[i] = (cx / width, cy / height, cw / width, ch / height)
+
+        return FaceTrack(rects, fps)
+
+
+def load_face_track(video_path: str, ratio: VideoRatio) -> Optional[FaceTrack]:
+    """Cached face track of ``video_path`` for ``ratio``, if it was computed before"""
+    path = face_track_path(video_path, ratio)
+    if not os.path.exists(path):
+        return None
+    try:
+        return FaceTrack.load(path)
+    except Exception as e:
+        logging.getLogger('FaceTrackAnalyzer').warning(f"Ignoring unreadable face track {path}: {str(e)}")
+        return None
+
+
+def get_face_track(video_path: str, ratio: VideoRatio,
+                   progress_callback: Optional[Callable] = None, **options) -> FaceTrack:
+    """Load the cached face track, or analyze the video and cache the result"""
+    track = load_face_track(video_path, ratio)
+    if track is not None:
+        if progress_callback:
+            progress_callback(100.0)
+        return track
+
+    track = FaceTrackAnalyzer(**options).analyze(video_path, ratio, progress_callback)
+
+    # Write next to the final name first so readers never see a partial file;
+    # one name per thread, the preview and an export may build it at once
+    path = face_track_path(video_path, ratio)
+    temp_path = f"{path}.{os.getpid()}_{threading.get_ident()}.tmp"
+    track.save(temp_path)
+    os.replace(temp_path, path)
+    return track
@@ -0,0 +1,204 @@
+import cv2
+import shutil
+import subprocess
+import threading
+import collections
+import numpy as np
+from typing import Optional, Tuple, List
+
+from utils.media_probe import get_video_info
+
+
+class FFmpegVideoCapture:
+    """Frame source with the cv2.VideoCapture API that decodes with FFmpeg.
+
+    Frames are read as bgr24 rawvideo from an FFmpeg subprocess. Unlike
+    cv2.VideoCapture it lets the caller pick the decoder thread count, crop
+    (``crop=(x, y, w, h)`` in source pixels, after rotation) and scale
+    (``scale=(w, h)``, one side may be None to keep the aspect ratio) at
+    decode time, and start at ``start_time`` seconds. ``read(image)`` decodes into a caller-provided
+    buffer so steady-state reading does not allocate.
+    """
+
+    # Seeking decodes from the previous keyframe and drops the frames before
+    # the requested time, so a seek lands exactly on a frame time
+    accurate_seek = True
+
+    def __init__(self, path: str, threads: int = 0,
+                 scale: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                 crop: Optional[Tuple[int, int, int, int]] = None,
+                 start_time: float = 0.0, duration: Optional[float] = None,
+                 hwaccel: Optional[str] = None):
+        self.path = path
+        self.threads = threads
+        self.crop = crop
+        self.hwaccel = hwaccel
+        self.duration = duration
+        self.process: Optional[subprocess.Popen] = None
+
+        self.info = get_video_info(path)
+        self.fps = self.info['fps'] or 30.0
+        self._scale = scale is not None
+        self.width, self.height = self._output_size(scale)
+        self.frame_bytes = self.width * self.height * 3
+
+        # ``duration`` counts from the initial start time, even after seeking
+        self._origin = start_time
+        self._start_time = start_time
+        self._frames_read = 0
+        self._scratch: Optional[np.ndarray] = None
+        self._stderr_tail = collections.deque(maxlen=20)
+
+        if self.width > 0 and self.height > 0:
+            self._open(start_time)
+
+    def _output_size(self, scale) -> Tuple[int, int]:
+        width, height = self.info['width'], self.info['height']
+        if self.crop:
+            width, height = self.crop[2], self.crop[3]
+        if scale:
+            target_w, target_h = scale
+            if target_w and not target_h:
+                target_h = int(round(height * target_w / width / 2)) * 2
+            elif target_h and not target_w:
+                target_w = int(round(width * target_h / height / 2)) * 2
+            width, height = target_w, target_h
+        return int(width), int(height)
+
+    def _build_command(self, start_time: float) -> List[str]:
+        command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin']
+        if self.hwaccel:
+            command += ['-hwaccel', self.hwaccel]
+        command += ['-threads', str(self.threads)]
+        if start_time > 0:
+            # Input seeking: jumps to the previous keyframe, then decodes up to start_time
+            command += ['-ss', f'{start_time:.6f}']
+        if self.duration is not None:
+            command += ['-t', f'{max(0.0, self.duration - (start_time - self._origin)):.6f}']
+        command += ['-i', self.path, '-map', '0:v:0', '-an', '-sn']
+
+        filters = []
+        if self.crop:
+            x, y, w, h = self.crop
+            filters.append(f'crop={w}:{h}:{x}:{y}')
+        if self._scale:
+            filters.append(f'scale={self.width}:{self.height}:flags=area')
+        if filters:
+            command += ['-vf', ','.join(filters)]
+
+        command += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', '-vsync', 'passthrough', 'pipe:1']
+        return command
+
+    def _drain_stderr(self, process: subprocess.Popen):
+        for line in iter(process.stderr.readline, b''):
+            self._stderr_tail.append(line.decode(errors='replace').rstrip())
+
+    def _open(self, start_time: float):
+        self._close_process()
+        self._start_time = start_time
+        self._frames_read = 0
+        self.process = subprocess.Popen(
+            self._build_command(start_time),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=self.frame_bytes
+        )
+        threading.Thread(target=self._drain_stderr, args=(self.process,), daemon=True).start()
+
+    def _close_process(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.stdout.close()
+            self.process.wait()
+            self.process = None
+
+    def isOpened(self) -> bool:
+        return self.process is not None
+
+    def _read_into(self, buffer: np.ndarray) -> bool:
+        view = memoryview(buffer).cast('B')
+        filled = 0
+        while filled < self.frame_bytes:
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        self._frames_read += 1
+        return True
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Decode the next frame, into ``image`` when it has the right shape"""
+        if self.process is None:
+            return False, None
+
+        shape = (self.height, self.width, 3)
+        if (image is None or image.shape != shape or image.dtype != np.uint8
+                or not image.flags['C_CONTIGUOUS']):
+            image = np.empty(shape, dtype=np.uint8)
+
+        if not self._read_into(image):
+            return False, None
+        return True, image
+
+    def grab(self) -> bool:
+        """Decode and discard the next frame"""
+        if self.process is None:
+            return False
+        if self._scratch is None:
+            self._scratch = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        return self._read_into(self._scratch)
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            if self.duration is not None:
+                return float(int(round(self.duration * self.fps)))
+            return float(self.info['frame_count'])
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(int(round(self._start_time * self.fps)) + self._frames_read)
+        if prop_id == cv2.CAP_PROP_POS_MSEC:
+            return (self._start_time + self._frames_read / self.fps) * 1000.0
+        return 0.0
+
+    def set(self, prop_id: int, value: float) -> bool:
+        """Seek with CAP_PROP_POS_FRAMES or CAP_PROP_POS_MSEC"""
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            self._open(max(0.0, value / self.fps))
+            return True
+        if prop_id == cv2.CAP_PROP_POS_MSEC:
+            self._open(max(0.0, value / 1000.0))
+            return True
+        return False
+
+    def release(self):
+        self._close_process()
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+def open_video_source(path: str, backend: str = 'auto', **options):
+    """Open a frame source for ``path``.
+
+    ``backend`` is 'ffmpeg', 'opencv' or 'auto' (FFmpeg when installed).
+    ``options`` are passed to FFmpegVideoCapture; the OpenCV backend only
+    honours ``start_time`` and leaves scaling/cropping to the caller.
+    """
+    if backend == 'auto':
+        backend = 'ffmpeg' if ffmpeg_available() else 'opencv'
+
+    if backend == 'ffmpeg':
+        return FFmpegVideoCapture(path, **options)
+
+    cap = cv2.VideoCapture(path)
+    start_time = options.get('start_time') or 0.0
+    if start_time > 0 and cap.isOpened():
+        cap.set(cv2.CAP_PROP_POS_MSEC, start_time * 1000.0)
+    return cap
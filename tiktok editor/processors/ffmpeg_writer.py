@@ -0,0 +1,175 @@
+import cv2
+import logging
+import subprocess
+import threading
+import collections
+import os
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, List
+
+
+@dataclass
+class EncoderSettings:
+    codec: str = 'libx264'        # or 'libx265'
+    preset: str = 'veryfast'
+    crf: int = 20
+    pix_fmt: str = 'yuv420p'
+    audio_codec: str = 'aac'
+    audio_bitrate: str = '192k'
+    threads: int = 0              # Encoder threads, 0 lets FFmpeg decide
+
+    def video_args(self) -> List[str]:
+        args = ['-c:v', self.codec, '-preset', self.preset,
+                '-crf', str(self.crf), '-pix_fmt', self.pix_fmt]
+        if self.threads:
+            args += ['-threads', str(self.threads)]
+        if self.codec == 'libx265':
+            # Lets QuickTime/iOS recognize HEVC in MP4
+            args += ['-tag:v', 'hvc1']
+        return args
+
+    def audio_args(self) -> List[str]:
+        return ['-c:a', self.audio_codec, '-b:a', self.audio_bitrate]
+
+
+class FFmpegWriter:
+    """Drop-in replacement for cv2.VideoWriter that pipes raw BGR frames to FFmpeg.
+
+    The encoder starts on the first frame so the output takes the size of the
+    processed frames. When ``audio_path`` is given the audio is muxed by the
+    same FFmpeg process, so no intermediate video file is written.
+    Later frames of another size are resized to the first one's, as the
+    rawvideo stream has a fixed frame size.
+    """
+
+    def __init__(self, output_path: str, fps: float, audio_path: Optional[str] = None,
+                 settings: Optional[EncoderSettings] = None):
+        self.output_path = output_path
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.audio_path = audio_path
+        self.settings = settings or EncoderSettings()
+        self.process: Optional[subprocess.Popen] = None
+        self.frame_size = None
+
+        self._stderr_tail = collections.deque(maxlen=40)
+        self._stderr_thread: Optional[threading.Thread] = None
+        self._released = False
+        self._warned_resize = False
+        # Reused to pack cropped (non-contiguous) frames before writing
+        self._staging: Optional[np.ndarray] = None
+
+    def isOpened(self) -> bool:
+        return not self._released and (self.process is None or self.process.poll() is None)
+
+    def _build_command(self, width: int, height: int) -> List[str]:
+        command = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-f', 'rawvideo',
+            '-pix_fmt', 'bgr24',
+            '-s', f'{width}x{height}',
+            '-r', f'{self.fps:.6f}',
+            '-i', 'pipe:0'
+        ]
+        if self.audio_path:
+            command += ['-i', self.audio_path, '-map', '0:v:0', '-map', '1:a:0']
+        command += self.settings.video_args()
+        if self.audio_path:
+            command += self.settings.audio_args() + ['-shortest']
+        command += ['-y', self.output_path]
+        return command
+
+    def _drain_stderr(self):
+        # FFmpeg blocks if nobody reads its stderr, keep the last lines for errors
+        for line in iter(self.process.stderr.readline, b''):
+            self._stderr_tail.append(line.decode(errors='replace').rstrip())
+
+    def _start(self, width: int, height: int):
+        self.frame_size = (width, height)
+        self.process = subprocess.Popen(
+            self._build_command(width, height),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+
+    def _error_message(self) -> str:
+        return "\n".join(self._stderr_tail) or "unknown error"
+
+    def write(self, frame: np.ndarray):
+        if self._released:
+            raise Exception("FFmpeg writer already released")
+
+        if self.process is None:
+            height, width = frame.shape[:2]
+            # yuv420p needs even dimensions
+            self._start(width - width % 2, height - height % 2)
+
+        width, height = self.frame_size
+        if frame.shape[1] != width or frame.shape[0] != height:
+            if frame.shape[1] - width in (0, 1) and frame.shape[0] - height in (0, 1):
+                # Odd dimension trimmed for yuv420p
+                frame = frame[:height, :width]
+            else:
+                # Writing fewer (or more) bytes would shift every later frame
+                if not self._warned_resize:
+                    self._warned_resize = True
+                    logging.getLogger('FFmpegWriter').warning(
+                        f"Frame size {frame.shape[1]}x{frame.shape[0]} differs from "
+                        f"{width}x{height}, resizing")
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+        if not frame.flags['C_CONTIGUOUS']:
+            if self._staging is None or self._staging.shape != frame.shape:
+                self._staging = np.empty(frame.shape, dtype=frame.dtype)
+            np.copyto(self._staging, frame)
+            frame = self._staging
+
+        try:
+            self.process.stdin.write(frame.data)
+        except (BrokenPipeError, OSError):
+            self.process.wait()
+            if self._stderr_thread:
+                self._stderr_thread.join(timeout=1)
+            raise Exception(f"FFmpeg encoder error: {self._error_message()}")
+
+    def release(self):
+        """Finish encoding and wait for FFmpeg, raising if it failed"""
+        if self._released:
+            return
+        self._released = True
+        if self.process is None:
+            return
+
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        returncode = self.process.wait()
+        if self._stderr_thread:
+            self._stderr_thread.join(timeout=1)
+
+        if returncode != 0:
+            raise Exception(f"FFmpeg encoder error: {self._error_message()}")
+
+    def abort(self):
+        """Stop FFmpeg without finishing the file (no-op once released)"""
+        if self._released:
+            return
+        self._released = True
+        if self.process is None:
+            return
+
+        self.process.kill()
+        self.process.wait()
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        if os.path.exists(self.output_path):
+            try:
+                os.remove(self.output_path)
+            except OSError:
+                pass
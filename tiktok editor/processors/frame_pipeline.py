@@ -0,0 +1,166 @@
+import queue
+import threading
+from typing import Optional, Callable, List, Any
+
+from .frame_pool import FramePool
+
+# Marks the end of the frame stream in the pipeline queues
+_END = object()
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is stopped through its cancel event"""
+
+
+class FramePipeline:
+    """Decode -> parallel effects -> ordered encode pipeline.
+
+    A decode thread reads frames from ``cap``, ``num_workers`` threads run
+    ``process_frame(frame, index)`` on them (OpenCV releases the GIL) and the
+    calling thread reorders the results, runs ``serial_process(frame, index)``
+    and writes them to ``out``.
+    Stateful effects that depend on the previous frame must run in
+    ``serial_process`` so they still see frames in order.
+
+    With a ``pool``, frames are decoded into pooled buffers and every written
+    frame is released back to it, so steady-state decoding does not allocate.
+    """
+
+    def __init__(self, process_frame: Callable, num_workers: int,
+                 max_in_flight: Optional[int] = None, pool: Optional[FramePool] = None):
+        self.process_frame = process_frame
+        self.num_workers = max(1, num_workers)
+        # Bound the number of decoded frames alive at once (queues + reorder buffer)
+        self.max_in_flight = max_in_flight or self.num_workers * 2 + 2
+        self.pool = pool
+
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        """Put an item on a bounded queue, giving up if the pipeline stops"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        """Get an item from a queue, giving up if the pipeline stops"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _fail(self, error: BaseException):
+        self._errors.append(error)
+        self._stop.set()
+
+    def _decode_loop(self, cap, in_queue: queue.Queue, slots: threading.Semaphore):
+        try:
+            index = 0
+            shape = None
+            while not self._stop.is_set():
+                if not slots.acquire(timeout=0.1):
+                    continue
+                buffer = self.pool.acquire(shape) if self.pool is not None and shape else None
+                ret, frame = cap.read(buffer) if buffer is not None else cap.read()
+                if frame is not buffer and self.pool is not None:
+                    self.pool.release(buffer)
+                if not ret:
+                    slots.release()
+                    break
+                shape = frame.shape
+                if not self._put(in_queue, (index, frame)):
+                    break
+                index += 1
+        except Exception as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.num_workers):
+                self._put(in_queue, _END)
+
+    def _worker_loop(self, in_queue: queue.Queue, out_queue: queue.Queue):
+        try:
+            while True:
+                item = self._get(in_queue)
+                if item is _END:
+                    break
+                index, frame = item
+                self._put(out_queue, (index, self.process_frame(frame, index)))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(out_queue, _END)
+
+    def run(self, cap, out, serial_process: Optional[Callable] = None,
+            total_frames: int = 0, progress_callback: Optional[Callable] = None,
+            cancel_event: Optional[threading.Event] = None) -> int:
+        """Run the pipeline until ``cap`` is exhausted and return the frame count.
+
+        Setting ``cancel_event`` stops decoding and processing and raises
+        ExportCancelled.
+        """
+        self._stop = threading.Event()
+        self._errors = []
+
+        in_queue = queue.Queue(maxsize=self.num_workers * 2)
+        out_queue = queue.Queue(maxsize=self.num_workers * 2)
+        slots = threading.Semaphore(self.max_in_flight)
+
+        threads = [threading.Thread(target=self._decode_loop,
+                                    args=(cap, in_queue, slots),
+                                    name='FramePipeline-decode', daemon=True)]
+        for i in range(self.num_workers):
+            threads.append(threading.Thread(target=self._worker_loop,
+                                            args=(in_queue, out_queue),
+                                            name=f'FramePipeline-worker-{i}', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        # Reorder buffer: frames finished out of order wait here for their turn
+        pending = {}
+        next_index = 0
+        finished_workers = 0
+
+        try:
+            while finished_workers < self.num_workers:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ExportCancelled("Export cancelled")
+                item = self._get(out_queue)
+                if item is _END:
+                    if self._stop.is_set():
+                        break
+                    finished_workers += 1
+                    continue
+
+                index, frame = item
+                pending[index] = frame
+
+                while next_index in pending:
+                    frame = pending.pop(next_index)
+                    if serial_process is not None:
+                        frame = serial_process(frame, next_index)
+                    out.write(frame)
+                    if self.pool is not None:
+                        self.pool.release(frame)
+                    slots.release()
+
+                    next_index += 1
+                    if progress_callback and total_frames > 0:
+                        progress_callback(min(100.0, next_index / total_frames * 100))
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        return next_index
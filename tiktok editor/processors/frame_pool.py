@@ -0,0 +1,101 @@
+import threading
+import weakref
+import numpy as np
+from collections import defaultdict
+from typing import Optional, Tuple
+
+
+def _root(frame: np.ndarray) -> np.ndarray:
+    """The array that owns the memory of ``frame`` (frame itself unless it is a view)"""
+    while isinstance(frame.base, np.ndarray):
+        frame = frame.base
+    return frame
+
+
+class FramePool:
+    """Thread-safe pool that recycles frame buffers of each shape.
+
+    ``acquire`` hands out a buffer, ``release`` gives it back once the frame
+    has been written. Releasing a view (e.g. a cropped frame) releases the
+    buffer it points into; releasing anything the pool did not hand out, or
+    releasing twice, is ignored. Buffers that are never released are simply
+    garbage collected.
+    """
+
+    def __init__(self, max_per_shape: int = 32):
+        self.max_per_shape = max_per_shape
+        self._lock = threading.Lock()
+        self._free = defaultdict(list)
+        self._in_use = weakref.WeakValueDictionary()
+        self.allocations = 0
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        key = (tuple(shape), np.dtype(dtype))
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                frame = free.pop()
+            else:
+                frame = np.empty(shape, dtype=dtype)
+                self.allocations += 1
+            self._in_use[id(frame)] = frame
+        return frame
+
+    def release(self, frame: Optional[np.ndarray]):
+        if frame is None:
+            return
+        root = _root(frame)
+        with self._lock:
+            if self._in_use.get(id(root)) is not root:
+                return
+            del self._in_use[id(root)]
+            free = self._free[(root.shape, root.dtype)]
+            if len(free) < self.max_per_shape:
+                free.append(root)
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+
+
+def apply_effects(frame: np.ndarray, effects: list, pool: Optional[FramePool] = None,
+                  frame_index: Optional[int] = None) -> np.ndarray:
+    """Run ``frame`` through ``effects``, reusing pooled buffers.
+
+    ``frame`` is consumed: in-place effects write into it, and buffers that
+    are no longer part of the result go back to ``pool``. ``frame_index`` is
+    passed to effects that declare ``uses_frame_index``.
+    """
+    processed = frame
+    for effect in effects:
+        kwargs = {}
+        if frame_index is not None and getattr(effect, 'uses_frame_index', False):
+            kwargs['frame_index'] = frame_index
+
+        if getattr(effect, 'in_place', False):
+            if not processed.flags.writeable:
+                processed = processed.copy()
+            result = effect.apply(processed, **kwargs)
+        elif pool is not None and getattr(effect, 'supports_out', False):
+            result = effect.apply(processed, out=pool.acquire(processed.shape, processed.dtype), **kwargs)
+        else:
+            result = effect.apply(processed, **kwargs)
+
+        if pool is not None and _root(result) is not _root(processed):
+            pool.release(processed)
+        processed = result
+    return processed
+
+
+def backup_for_in_place(frame: np.ndarray, effects: list,
+                        pool: Optional[FramePool] = None) -> Optional[np.ndarray]:
+    """Copy of ``frame`` if an effect of the chain writes into it, else None.
+
+    Lets callers fall back to the unprocessed frame when an effect fails,
+    instead of a partly processed one.
+    """
+    if not any(getattr(effect, 'in_place', False) for effect in effects):
+        return None
+    backup = pool.acquire(frame.shape, frame.dtype) if pool is not None else np.empty_like(frame)
+    np.copyto(backup, frame)
+    return backup
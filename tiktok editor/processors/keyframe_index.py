@@ -0,0 +1,156 @@
+import os
+import cv2
+import logging
+import threading
+import numpy as np
+from typing import List
+
+from utils.fingerprint import file_fingerprint, cache_dir
+from utils.media_probe import get_video_packets
+
+# Bump when the index format changes so stale sidecar files are rebuilt
+INDEX_VERSION = 1
+
+
+class KeyframeIndex:
+    """Presentation timestamp of every frame of a video stream, and which frames are keyframes.
+
+    Built from the packet list (no decoding), so frame ``i`` is the i-th
+    frame in presentation order even on variable frame rate files, where
+    ``i / fps`` drifts.
+    """
+
+    def __init__(self, pts: np.ndarray, keyframes: np.ndarray):
+        self.pts = np.asarray(pts, dtype=np.float64)  # Seconds, sorted
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)  # Frame indices, sorted
+        self.start = float(self.pts[0]) if len(self.pts) else 0.0
+
+    @classmethod
+    def build(cls, path: str, stream: str = 'v:0') -> 'KeyframeIndex':
+        packets = get_video_packets(path, stream)
+        # Packets come in decode order, B-frames make that differ from display order
+        order = sorted(range(len(packets)), key=lambda i: packets[i][0])
+        pts = np.array([packets[i][0] for i in order], dtype=np.float64)
+        keyframes = np.array([n for n, i in enumerate(order) if packets[i][1]], dtype=np.int64)
+        if len(pts) and (not len(keyframes) or keyframes[0] != 0):
+            # Decoding always starts at the beginning of the stream
+            keyframes = np.concatenate([[0], keyframes])
+        return cls(pts, keyframes)
+
+    def __len__(self) -> int:
+        return len(self.pts)
+
+    @property
+    def keyframe_times(self) -> List[float]:
+        """Keyframe timestamps from the start of the stream, as FFmpeg's ``-ss`` expects"""
+        return [float(self.pts[i]) - self.start for i in self.keyframes]
+
+    def frame_time(self, index: int) -> float:
+        """Timestamp of frame ``index`` from the start of the stream"""
+        index = min(max(0, index), len(self.pts) - 1)
+        return float(self.pts[index]) - self.start
+
+    def frame_at(self, time: float) -> int:
+        """Index of the frame shown at ``time`` seconds from the start of the stream"""
+        # A microsecond of slack, so a time computed from a frame's own pts
+        # (e.g. keyframe_times) finds that frame despite float rounding
+        index = int(np.searchsorted(self.pts, self.start + time + 1e-6, side='right')) - 1
+        return min(max(0, index), max(0, len(self.pts) - 1))
+
+    def keyframe_before(self, index: int) -> int:
+        """The last keyframe at or before frame ``index``"""
+        position = int(np.searchsorted(self.keyframes, index, side='right')) - 1
+        return int(self.keyframes[max(0, position)]) if len(self.keyframes) else 0
+
+    def seek_time(self, index: int) -> float:
+        """Time to seek to so that frame ``index`` is the first one decoded.
+
+        Half a frame early, so timestamp rounding never skips past it.
+        """
+        if index <= 0 or not len(self.pts):
+            return 0.0
+        index = min(index, len(self.pts) - 1)
+        return max(0.0, (self.pts[index] + self.pts[index - 1]) / 2 - self.start)
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, pts=self.pts, keyframes=self.keyframes)
+
+    @classmethod
+    def load(cls, path: str) -> 'KeyframeIndex':
+        with np.load(path) as data:
+            return cls(data['pts'], data['keyframes'])
+
+
+def keyframe_index_path(video_path: str) -> str:
+    """Sidecar file of the keyframe index for ``video_path``"""
+    name = f"{file_fingerprint(video_path)}_v{INDEX_VERSION}.npz"
+    return os.path.join(cache_dir('keyframe_index'), name)
+
+
+def get_keyframe_index(video_path: str) -> KeyframeIndex:
+    """Load the cached keyframe index, or build it with ffprobe and cache it"""
+    path = keyframe_index_path(video_path)
+    if os.path.exists(path):
+        try:
+            return KeyframeIndex.load(path)
+        except Exception as e:
+            logging.getLogger('KeyframeIndex').warning(f"Ignoring unreadable index {path}: {str(e)}")
+
+    index = KeyframeIndex.build(video_path)
+    # Write next to the final name first so readers never see a partial file;
+    # one name per thread, the preview and an export may build it at once
+    temp_path = f"{path}.{os.getpid()}_{threading.get_ident()}.tmp"
+    index.save(temp_path)
+    os.replace(temp_path, path)
+    return index
+
+
+class FrameSeeker:
+    """Frame-accurate random access on a capture using a KeyframeIndex.
+
+    ``seek(i)`` keeps decoding forward when frame ``i`` is ahead in the
+    current GOP. Otherwise it reopens decoding at the keyframe before ``i``
+    and decodes forward only up to ``i``: captures with ``accurate_seek``
+    (FFmpegVideoCapture) are given the exact frame time and skip the frames
+    in between themselves, others are positioned on the keyframe and grab
+    forward. ``position`` is the index of the frame ``read`` returns next.
+    """
+
+    def __init__(self, cap, index: KeyframeIndex, position: int = 0):
+        self.cap = cap
+        self.index = index
+        self.position = position
+
+    def seek(self, frame_index: int) -> bool:
+        frame_index = min(max(0, frame_index), max(0, len(self.index) - 1))
+        if frame_index == self.position:
+            return True
+
+        keyframe = self.index.keyframe_before(frame_index)
+        if not keyframe <= self.position < frame_index:
+            # Behind us, or past a keyframe: restart from the keyframe
+            if getattr(self.cap, 'accurate_seek', False):
+                self.cap.set(cv2.CAP_PROP_POS_MSEC, self.index.seek_time(frame_index) * 1000.0)
+                self.position = frame_index
+                return True
+            self.cap.set(cv2.CAP_PROP_POS_MSEC, self.index.seek_time(keyframe) * 1000.0)
+            self.position = keyframe
+
+        while self.position < frame_index:
+            if not self.cap.grab():
+                return False
+            self.position += 1
+        return True
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if ret:
+            self.position += 1
+        return ret, frame
+
+    def grab(self) -> bool:
+        if self.cap.grab():
+            self.position += 1
+            return True
+        return False
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import numpy as np
+
+
+class PreviewFrameCache:
+    """Memory-bounded LRU of processed preview frames.
+
+    Frames are stored per ``(chain_key, frame_index)``, where the chain key
+    identifies the source, the effect chain and its settings. Once
+    the cached frames take more than ``max_bytes`` the least recently used
+    ones are dropped. Cached frames are shared, callers must not modify them.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chain_key: Hashable, frame_index: int) -> Optional[np.ndarray]:
+        with self._lock:
+            frame = self._frames.get((chain_key, frame_index))
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end((chain_key, frame_index))
+            self.hits += 1
+            return frame
+
+    def put(self, chain_key: Hashable, frame_index: int, frame: np.ndarray):
+        if frame.base is not None:
+            # Don't keep the whole decoded frame alive behind a cropped view
+            frame = frame.copy()
+        if frame.nbytes > self.max_bytes:
+            return
+        key = (chain_key, frame_index)
+        with self._lock:
+            previous = self._frames.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+            self._frames[key] = frame
+            self.bytes += frame.nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self._frames.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
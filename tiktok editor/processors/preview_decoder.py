@@ -0,0 +1,326 @@
+import cv2
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from utils.media_probe import get_video_info
+from .ffmpeg_reader import open_video_source, ffmpeg_available
+from .preview_cache import PreviewFrameCache
+from .keyframe_index import FrameSeeker, get_keyframe_index
+
+# (frame, frame_index) -> processed frame
+ProcessFrame = Callable[[np.ndarray, int], np.ndarray]
+
+
+class PresentationClock:
+    """Maps wall-clock time to source frame indices during playback.
+
+    ``start(index)`` shows ``index`` now and advances at ``fps`` frames per
+    second, wrapping around after ``frame_count`` frames (when known).
+    """
+
+    def __init__(self, fps: float, frame_count: int = 0):
+        self.fps = fps
+        self.frame_count = frame_count
+        self._origin_index = 0
+        self._origin_time: Optional[float] = None
+
+    def start(self, index: int):
+        self._origin_index = index
+        self._origin_time = time.monotonic()
+
+    def stop(self):
+        self._origin_time = None
+
+    @property
+    def running(self) -> bool:
+        return self._origin_time is not None
+
+    def index(self) -> Optional[int]:
+        """Frame due on screen now, None when stopped"""
+        origin_time = self._origin_time
+        if origin_time is None:
+            return None
+        index = self._origin_index + int((time.monotonic() - origin_time) * self.fps)
+        return index % self.frame_count if self.frame_count > 0 else index
+
+    def lag(self, index: int, due: int) -> int:
+        """Frames ``index`` is behind ``due`` (negative when ahead), across the wrap-around"""
+        if self.frame_count <= 0:
+            return due - index
+        lag = (due - index) % self.frame_count
+        return lag if lag <= self.frame_count // 2 else lag - self.frame_count
+
+
+class PreviewDecoder:
+    """Decodes and processes preview frames ahead of playback.
+
+    A background thread reads frames from ``path``, runs them through
+    ``process_frame`` and queues ``(frame_index, frame)`` pairs in a ring
+    buffer of ``capacity`` frames; it blocks once the buffer is full, so it
+    never runs more than ``capacity`` frames ahead. The GUI only pops ready
+    frames with ``read``. ``seek`` and ``set_process`` (effect changes) drop
+    the buffered frames and refill it from the new position. At the end of
+    the video decoding starts over from the first frame.
+
+    With ``max_size=(width, height)`` frames are downscaled right after
+    decoding (by FFmpeg when it is the backend) to fit in that size, so the
+    effects run at display resolution; ``scale`` is the resulting size
+    relative to the source, for effects with pixel-sized parameters. When
+    ``path`` is a proxy, ``source_size`` is the size of the original video
+    so that ``scale`` stays relative to it.
+
+    With a ``cache``, processed frames are stored under the ``cache_key``
+    given to ``set_process`` and looked up before decoding, so looping over
+    an edited section or toggling an effect back on only costs a lookup.
+    Frames are skipped with ``grab`` (or a seek) past cached runs.
+
+    While ``clock`` runs, frames the clock has already passed are not
+    decoded: the decoder skips ahead (with ``grab`` for short gaps) to the
+    frame that is due and counts the skipped ones in ``dropped``.
+    ``read_due`` gives the GUI the latest frame that is due, discarding
+    older buffered ones.
+
+    Long jumps go through a keyframe index of ``path`` (built on the first
+    one, then cached), so they land on the exact frame even on variable
+    frame rate files.
+
+    ``on_frame_ready`` is called from the decoder thread after a frame is
+    queued.
+    """
+
+    def __init__(self, path: str, process_frame: Optional[ProcessFrame] = None,
+                 capacity: int = 8, loop: bool = True, backend: str = 'auto',
+                 on_frame_ready: Optional[Callable[[], None]] = None,
+                 max_size: Optional[Tuple[int, int]] = None,
+                 source_size: Optional[Tuple[int, int]] = None,
+                 cache: Optional[PreviewFrameCache] = None):
+        self.path = path
+        self.capacity = max(1, capacity)
+        self.loop = loop
+        self.on_frame_ready = on_frame_ready
+        self.logger = logging.getLogger('PreviewDecoder')
+
+        self.scale = 1.0
+        self.size: Optional[Tuple[int, int]] = None  # Frame size after downscaling
+        self.cap = self._open(backend, max_size)
+        if source_size and source_size[0] > 0:
+            width = self.size[0] if self.size else self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+            self.scale = width / source_size[0]
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.clock = PresentationClock(self.fps, self.frame_count)
+        self.dropped = 0  # Frames skipped without decoding
+
+        self.cache = cache
+        self._seeker: Optional[FrameSeeker] = None
+        self._index_failed = False
+        self._process_frame = process_frame
+        self._cache_key = None
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._generation = 0  # Bumped on every flush, stale frames are dropped
+        self._seek_to: Optional[int] = 0
+        self._next_index = 0  # Frame after the last one handed out
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _open(self, backend: str, max_size: Optional[Tuple[int, int]]):
+        if backend == 'auto':
+            backend = 'ffmpeg' if ffmpeg_available() else 'opencv'
+        if max_size is None:
+            return open_video_source(self.path, backend)
+
+        if backend == 'ffmpeg':
+            info = get_video_info(self.path)
+            width, height = info['width'], info['height']
+        else:
+            cap = open_video_source(self.path, backend)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        if width > 0 and height > 0:
+            scale = min(max_size[0] / width, max_size[1] / height)
+            if scale < 1:
+                self.scale = scale
+                self.size = (max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2))
+
+        if backend == 'ffmpeg':
+            return open_video_source(self.path, backend, scale=self.size)
+        return cap  # OpenCV does not scale, read() resizes
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='PreviewDecoder', daemon=True)
+            self._thread.start()
+
+    def _flush(self, index: int):
+        """Drop buffered frames and restart decoding at ``index``; caller holds the lock"""
+        self._buffer.clear()
+        self._generation += 1
+        self._seek_to = max(0, index)
+        self._next_index = self._seek_to
+        self._cond.notify_all()
+
+    def seek(self, index: int):
+        with self._cond:
+            self._flush(index)
+
+    def set_process(self, process_frame: Optional[ProcessFrame], from_index: Optional[int] = None,
+                    cache_key=None):
+        """Use a new processing function, reprocessing from ``from_index``
+        (default: the next frame to be shown). Its frames are cached under
+        ``cache_key``; None disables caching (e.g. for stateful effects)."""
+        with self._cond:
+            self._process_frame = process_frame
+            self._cache_key = cache_key
+            self._flush(self._next_index if from_index is None else from_index)
+
+    def read(self) -> Optional[Tuple[int, np.ndarray]]:
+        """The next ready ``(frame_index, frame)``, or None if the decoder is behind"""
+        with self._cond:
+            if not self._buffer:
+                return None
+            item = self._buffer.popleft()
+            self._next_index = item[0] + 1
+            self._cond.notify_all()
+            return item
+
+    def read_due(self) -> Tuple[Optional[Tuple[int, np.ndarray]], int]:
+        """The latest buffered frame the clock has reached, and how many
+        older ones were discarded. Without a running clock, same as ``read``."""
+        due = self.clock.index()
+        if due is None:
+            return self.read(), 0
+
+        with self._cond:
+            item = None
+            discarded = 0
+            while self._buffer and self.clock.lag(self._buffer[0][0], due) >= 0:
+                if item is not None:
+                    discarded += 1
+                item = self._buffer.popleft()
+            if item is not None:
+                self._next_index = item[0] + 1
+                self._cond.notify_all()
+            return item, discarded
+
+    @property
+    def buffered(self) -> int:
+        with self._cond:
+            return len(self._buffer)
+
+    def _get_seeker(self) -> Optional[FrameSeeker]:
+        if self._seeker is None and not self._index_failed:
+            try:
+                self._seeker = FrameSeeker(self.cap, get_keyframe_index(self.path))
+            except Exception as e:
+                # Fall back to seeking by frame number
+                self._index_failed = True
+                self.logger.warning(f"No keyframe index for {self.path}: {str(e)}")
+        return self._seeker
+
+    def _decode(self, index: int, position: int) -> Tuple[Optional[np.ndarray], int]:
+        """Frame ``index`` and the new read position, given the current one"""
+        if index != position:
+            if 0 < index - position <= max(1, int(self.fps)):
+                # A short skip over cached frames: cheaper to decode than to seek
+                while position < index and self.cap.grab():
+                    position += 1
+            if index != position:
+                seeker = self._get_seeker()
+                if seeker is not None:
+                    if index >= len(seeker.index):
+                        return None, position
+                    seeker.position = position
+                    if not seeker.seek(index):
+                        return None, seeker.position
+                else:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                position = index
+
+        ret, frame = self.cap.read()
+        if not ret:
+            return None, position
+        if self.size is not None and (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return frame, position + 1
+
+    def _run(self):
+        index = 0
+        position = 0  # Next frame the capture will return
+        while True:
+            with self._cond:
+                if self._stopped:
+                    break
+                seek_to, self._seek_to = self._seek_to, None
+                generation = self._generation
+                process_frame = self._process_frame
+                cache_key = self._cache_key
+
+            if seek_to is not None:
+                index = seek_to
+
+            frame = None
+            if self.cache is not None and cache_key is not None:
+                frame = self.cache.get(cache_key, index)
+
+            if frame is None:
+                # Behind the clock: don't decode and process frames that are
+                # already late, jump to the one that is due
+                due = self.clock.index()
+                if due is not None and self.clock.lag(index, due) > 0:
+                    self.dropped += self.clock.lag(index, due)
+                    index = due
+                    continue
+
+                frame, position = self._decode(index, position)
+                if frame is None:
+                    with self._cond:
+                        if self._generation != generation:
+                            continue
+                        if self.loop and index > 0:
+                            self._seek_to = 0
+                        else:
+                            # Nothing to decode until the next seek
+                            self._cond.wait_for(lambda: self._stopped or self._generation != generation)
+                    continue
+
+                if process_frame is not None:
+                    try:
+                        frame = process_frame(frame, index)
+                    except Exception as e:
+                        self.logger.error(f"Error processing preview frame {index}: {str(e)}")
+                        cache_key = None
+                if self.cache is not None and cache_key is not None:
+                    self.cache.put(cache_key, index, frame)
+
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or self._generation != generation
+                                    or len(self._buffer) < self.capacity)
+                if self._stopped:
+                    break
+                if self._generation != generation:
+                    continue
+                self._buffer.append((index, frame))
+            index += 1
+
+            if self.on_frame_ready is not None:
+                self.on_frame_ready()
+
+        self.cap.release()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._buffer.clear()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        else:
+            self.cap.release()
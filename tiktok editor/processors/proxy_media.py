@@ -0,0 +1,132 @@
+import os
+import logging
+import subprocess
+import threading
+from typing import Optional
+
+from utils.fingerprint import file_fingerprint, cache_dir
+from utils.media_probe import get_video_info
+
+# Bump when the proxy encoding changes so stale proxies are regenerated
+PROXY_VERSION = 2
+
+
+class ProxyGenerator:
+    """Low-resolution, short-GOP copies of source videos for the preview.
+
+    Phone footage is often 4K HEVC with long GOPs, too slow to decode and
+    seek for interactive playback. The proxy has the same frames and
+    timestamps as the source (so frame indices and face tracks still line
+    up), scaled to fit ``size`` pixels on its longest side and encoded with
+    a keyframe every ``gop`` frames. Exports keep using the original.
+
+    Proxies are cached in ``cache/proxies`` by source fingerprint; once the
+    cache grows past ``max_cache_bytes`` the least recently used ones are
+    removed.
+    """
+
+    def __init__(self, size: int = 960, gop: int = 10, crf: int = 26,
+                 max_cache_bytes: int = 4 * 1024 ** 3):
+        self.size = size
+        self.gop = max(1, gop)
+        self.crf = crf
+        self.max_cache_bytes = max_cache_bytes
+        self.logger = logging.getLogger('ProxyGenerator')
+
+    def proxy_path(self, video_path: str) -> str:
+        name = f"{file_fingerprint(video_path)}_{self.size}_g{self.gop}_v{PROXY_VERSION}.mp4"
+        return os.path.join(cache_dir('proxies'), name)
+
+    def get_cached(self, video_path: str) -> Optional[str]:
+        """Path of an existing proxy for ``video_path``, or None"""
+        path = self.proxy_path(video_path)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # Mark as recently used
+        return path
+
+    def _build_command(self, video_path: str, output_path: str) -> list:
+        info = get_video_info(video_path)
+        width, height = info['width'], info['height']
+        scale = min(1.0, self.size / max(width, height, 1))
+        width = max(2, int(width * scale) // 2 * 2)
+        height = max(2, int(height * scale) // 2 * 2)
+
+        return [
+            'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-nostdin',
+            '-i', video_path, '-map', '0:v:0', '-an', '-sn',
+            '-vf', f'scale={width}:{height}:flags=area',
+            # Keep every frame and timestamp, indices must match the source
+            '-vsync', 'passthrough',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-tune', 'fastdecode',
+            '-crf', str(self.crf), '-pix_fmt', 'yuv420p',
+            '-g', str(self.gop), '-keyint_min', str(self.gop), '-sc_threshold', '0',
+            '-movflags', '+faststart',
+            output_path
+        ]
+
+    def generate(self, video_path: str, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+        """Proxy of ``video_path``, transcoding it if needed.
+
+        Returns None if ``cancel_event`` was set before it finished.
+        """
+        cached = self.get_cached(video_path)
+        if cached:
+            return cached
+
+        output_path = self.proxy_path(video_path)
+        # Unique per writer, two windows may import the same file
+        partial = f"{output_path}.{os.getpid()}_{threading.get_ident()}.partial.mp4"
+        self.logger.info(f"Generating preview proxy for {video_path}")
+        process = subprocess.Popen(self._build_command(video_path, partial),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            while True:
+                try:
+                    _, stderr = process.communicate(timeout=0.2)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel_event is not None and cancel_event.is_set():
+                        process.kill()
+                        process.communicate()
+                        return None
+
+            if process.returncode != 0:
+                raise Exception(f"Proxy transcode failed: {stderr.decode(errors='replace').strip()}")
+            os.replace(partial, output_path)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        self.evict(keep=output_path)
+        return output_path
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove least recently used proxies until the cache fits ``max_cache_bytes``"""
+        root = cache_dir('proxies')
+        entries = []
+        for name in os.listdir(root):
+            if name.endswith('.partial.mp4'):
+                continue  # Being written
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                self.logger.info(f"Evicted preview proxy {os.path.basename(path)}")
+            except OSError:
+                continue
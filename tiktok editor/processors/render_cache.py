@@ -0,0 +1,153 @@
+import os
+import json
+import shutil
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from utils.fingerprint import cache_dir
+from utils.file_lock import FileLock
+
+
+class RenderCache:
+    """Finished exports stored by content key, so identical exports are not rendered twice.
+
+    The key identifies the source, the effect chains and the encoder
+    settings (see ExportProcessor.render_cache_key). On a hit the cached
+    file is hardlinked to the requested output, or copied when the output
+    is on another filesystem. Entries are evicted least recently used first
+    once the cache grows past ``max_bytes``; recency is the mtime of a
+    ``.used`` sidecar per entry, as the entry's own inode is shared with
+    the outputs linked to it. Hit and miss counts are kept in
+    ``stats.json`` so they add up across runs and processes.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 10 * 1024 ** 3):
+        self.root = root or cache_dir('renders')
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger('RenderCache')
+        os.makedirs(self.root, exist_ok=True)
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.mp4")
+
+    def _used_path(self, entry_path: str) -> str:
+        return f"{os.path.splitext(entry_path)[0]}.used"
+
+    def _touch(self, entry_path: str):
+        """Mark an entry as recently used"""
+        with open(self._used_path(entry_path), 'a'):
+            pass
+        os.utime(self._used_path(entry_path))
+
+    def _last_used(self, entry_path: str, stat: os.stat_result) -> float:
+        try:
+            return os.path.getmtime(self._used_path(entry_path))
+        except OSError:
+            return stat.st_mtime
+
+    def _link_or_copy(self, source: str, target: str):
+        temp_path = f"{target}.{os.getpid()}_{threading.get_ident()}.tmp"
+        try:
+            try:
+                os.link(source, temp_path)
+            except OSError:
+                shutil.copyfile(source, temp_path)
+            # Replacing (rather than writing into) the target never touches
+            # a file that may be another link to the cache entry
+            os.replace(temp_path, target)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """Put the cached render for ``key`` at ``output_path``; False on a miss"""
+        path = self.entry_path(key)
+        try:
+            self._link_or_copy(path, output_path)
+        except FileNotFoundError:
+            self._count('misses')
+            return False
+        self._touch(path)
+        self._count('hits')
+        self.logger.info(f"Render cache hit: {key}")
+        return True
+
+    def store(self, key: str, output_path: str):
+        """Add a finished export to the cache"""
+        try:
+            self._link_or_copy(output_path, self.entry_path(key))
+            self._touch(self.entry_path(key))
+        except OSError as e:
+            self.logger.warning(f"Could not cache render {key}: {str(e)}")
+            return
+        self.evict(keep=self.entry_path(key))
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove least recently used renders until the cache fits ``max_bytes``"""
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.mp4'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((self._last_used(path, stat), stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                # Outputs hardlinked to the entry keep their data
+                os.remove(path)
+                total -= size
+                self._remove_used(path)
+                self._count('evictions')
+            except OSError:
+                continue
+
+    def _remove_used(self, entry_path: str):
+        try:
+            os.remove(self._used_path(entry_path))
+        except OSError:
+            pass
+
+    def _count(self, name: str):
+        # Exports run in several processes (batch, watch), a thread lock is not enough
+        with FileLock(os.path.join(self.root, 'stats.lock')):
+            stats = self._load_stats()
+            stats[name] = stats.get(name, 0) + 1
+            temp_path = os.path.join(self.root, f"stats.json.{os.getpid()}.tmp")
+            with open(temp_path, 'w') as f:
+                json.dump(stats, f)
+            os.replace(temp_path, os.path.join(self.root, 'stats.json'))
+
+    def _load_stats(self) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self.root, 'stats.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits, misses and evictions so far, plus the current entries and size"""
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        stats.update(self._load_stats())
+        sizes = [os.path.getsize(os.path.join(self.root, name))
+                 for name in os.listdir(self.root) if name.endswith('.mp4')]
+        stats['entries'] = len(sizes)
+        stats['bytes'] = sum(sizes)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        for name in os.listdir(self.root):
+            if name.endswith('.mp4'):
+                os.remove(os.path.join(self.root, name))
+                self._remove_used(os.path.join(self.root, name))
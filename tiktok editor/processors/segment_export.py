@@ -0,0 +1,292 @@
+import cv2
+import os
+import json
+import math
+import time
+import logging
+import subprocess
+import threading
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Callable, List, Dict, Any
+
+from utils.media_probe import get_duration, plan_segments
+from .ffmpeg_writer import FFmpegWriter, EncoderSettings
+from .ffmpeg_reader import open_video_source
+from .keyframe_index import get_keyframe_index
+from .frame_pipeline import ExportCancelled
+from .frame_pool import FramePool, apply_effects, backup_for_in_place
+
+# Bump when the manifest layout changes so old checkpoints are ignored
+MANIFEST_VERSION = 1
+
+# Checking the Manager event is a round-trip to the manager process,
+# so workers only look this often (seconds)
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def _render_segment(input_path: str, output_path: str, start: float,
+                    end: Optional[float], first_index: int, max_frames: Optional[int],
+                    effects: list, settings: EncoderSettings,
+                    decoder_backend: str = 'auto', cancel_event=None) -> int:
+    """Render one keyframe-aligned segment (runs in a worker process).
+
+    ``first_index`` is the source index of the segment's first frame and
+    ``max_frames`` its frame count (None: to the end), both taken from the
+    keyframe index so they stay right on variable frame rate sources.
+
+    ``cancel_event`` is a Manager event shared with the parent, polled
+    every CANCEL_POLL_INTERVAL; once set the segment stops and raises
+    ExportCancelled.
+    """
+    # One process per core already, keep OpenCV and FFmpeg from spawning their own threads
+    cv2.setNumThreads(1)
+    logger = logging.getLogger('SegmentExporter')
+
+    cap = open_video_source(input_path, backend=decoder_backend, threads=1,
+                            start_time=start,
+                            duration=(end - start) if end is not None else None)
+    out = None
+    frames = 0
+    finished = False
+
+    try:
+        if not cap.isOpened():
+            raise Exception("Cannot open input video")
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+
+        # Every segment uses the same encoder settings so they concat without re-encoding
+        out = FFmpegWriter(output_path, fps, settings=settings)
+        pool = FramePool(max_per_shape=4)
+        buffer = None
+        next_cancel_check = 0.0
+
+        while max_frames is None or frames < max_frames:
+            if cancel_event is not None and time.monotonic() >= next_cancel_check:
+                if cancel_event.is_set():
+                    raise ExportCancelled("Export cancelled")
+                next_cancel_check = time.monotonic() + CANCEL_POLL_INTERVAL
+            ret, frame = cap.read(buffer) if buffer is not None else cap.read()
+            if not ret:
+                break
+
+            backup = backup_for_in_place(frame, effects, pool)
+            try:
+                processed_frame = apply_effects(frame, effects, pool, first_index + frames)
+                pool.release(backup)
+            except Exception as e:
+                logger.error(f"CPU processing error: {str(e)}")
+                processed_frame = backup if backup is not None else frame
+
+            out.write(processed_frame)
+            pool.release(processed_frame)
+            buffer = pool.acquire(frame.shape)
+            frames += 1
+
+        out.release()
+        finished = True
+        return frames
+
+    finally:
+        cap.release()
+        if out is not None and not finished:
+            out.abort()
+
+
+class SegmentExporter:
+    """Render a video as keyframe-aligned segments in parallel processes.
+
+    Each worker process gets its own copy of the effect chain, and the
+    rendered segments are joined with FFmpeg's concat demuxer without
+    re-encoding.
+    """
+
+    def __init__(self, temp_dir: str, num_workers: int, logger: Optional[logging.Logger] = None,
+                 settings: Optional[EncoderSettings] = None, decoder_backend: str = 'auto'):
+        self.temp_dir = temp_dir
+        self.num_workers = max(1, num_workers)
+        self.logger = logger or logging.getLogger('SegmentExporter')
+        self.settings = settings or EncoderSettings()
+        self.decoder_backend = decoder_backend
+        # Several segments per worker balance the load when segments differ in cost
+        self.segments_per_worker = 4
+        # With a checkpoint workspace, segments are kept short so little is redone
+        self.checkpoint_segment_length = 30.0  # seconds
+
+    def _load_manifest(self, workspace: str, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        path = os.path.join(workspace, 'manifest.json')
+        try:
+            with open(path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('key') != key:
+            return None
+        return manifest
+
+    def _save_manifest(self, workspace: str, manifest: Dict[str, Any]):
+        # Replace atomically, a crash mid-write must not lose the checkpoint
+        path = os.path.join(workspace, 'manifest.json')
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(temp_path, path)
+
+    def _concat_segments(self, segment_files: List[str], list_path: str, output_path: str,
+                         audio_path: Optional[str] = None):
+        """Join rendered segments with FFmpeg's concat demuxer, muxing audio if given"""
+        with open(list_path, 'w') as f:
+            for segment in segment_files:
+                f.write(f"file '{os.path.abspath(segment)}'\n")
+
+        ffmpeg_cmd = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', list_path]
+        if audio_path:
+            ffmpeg_cmd += ['-i', audio_path, '-map', '0:v:0', '-map', '1:a:0',
+                           '-c:v', 'copy'] + self.settings.audio_args() + ['-shortest']
+        else:
+            ffmpeg_cmd += ['-c', 'copy']
+        ffmpeg_cmd += ['-y', output_path]
+
+        process = subprocess.Popen(
+            ffmpeg_cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+        stdout, stderr = process.communicate()
+
+        if process.returncode != 0:
+            raise Exception(f"FFmpeg concat error: {stderr}")
+
+    def export(self, input_path: str, output_path: str, video_effects: list,
+               progress_callback: Optional[Callable] = None,
+               audio_path: Optional[str] = None,
+               cancel_event: Optional[threading.Event] = None,
+               workspace: Optional[str] = None, checkpoint_key: Optional[str] = None) -> bool:
+        """Render ``input_path`` with effects into ``output_path``
+
+        Setting ``cancel_event`` drops the segments that have not started,
+        stops the running ones within CANCEL_POLL_INTERVAL (with their FFmpeg
+        decoder and encoder) and raises ExportCancelled.
+
+        With a ``workspace``, segments are kept there with a manifest listing
+        the finished ones. Running again with the same workspace and
+        ``checkpoint_key`` only renders the missing segments; the caller
+        removes the workspace once the export succeeded.
+        """
+        timestamp = str(int(time.time()))
+        scratch_dir = workspace or self.temp_dir
+        list_path = os.path.join(scratch_dir, f"segments_{timestamp}.txt")
+        segment_files = []
+
+        try:
+            duration = get_duration(input_path)
+            index = get_keyframe_index(input_path)
+            manifest = self._load_manifest(workspace, checkpoint_key) if workspace else None
+
+            if manifest is not None:
+                # Resume with the same boundaries, the finished files depend on them
+                segments = [(entry['start'], entry['end']) for entry in manifest['segments']]
+            else:
+                keyframes = index.keyframe_times
+                num_segments = self.num_workers * self.segments_per_worker
+                if workspace:
+                    num_segments = max(num_segments, math.ceil(duration / self.checkpoint_segment_length))
+                segments = plan_segments(duration, keyframes, num_segments)
+
+            if workspace:
+                segment_files = [os.path.join(workspace, f"segment_{i:04d}.mp4") for i in range(len(segments))]
+            else:
+                segment_files = [
+                    os.path.join(self.temp_dir, f"segment_{timestamp}_{i:04d}.mp4")
+                    for i in range(len(segments))
+                ]
+
+            if workspace and manifest is None:
+                manifest = {
+                    'version': MANIFEST_VERSION,
+                    'key': checkpoint_key,
+                    'input': os.path.abspath(input_path),
+                    'segments': [{'start': start, 'end': end, 'done': False} for start, end in segments],
+                }
+                self._save_manifest(workspace, manifest)
+
+            finished = set()
+            if manifest is not None:
+                finished = {i for i, entry in enumerate(manifest['segments'])
+                            if entry['done'] and os.path.exists(segment_files[i])}
+                if finished:
+                    self.logger.info(f"Resuming: {len(finished)} of {len(segments)} segments already rendered")
+
+            todo = [i for i in range(len(segments)) if i not in finished]
+            self.logger.info(f"Rendering {len(todo)} segments on {self.num_workers} processes")
+
+            def segment_duration(i):
+                start, end = segments[i]
+                return (end if end is not None else duration) - start
+
+            done_duration = sum(segment_duration(i) for i in finished)
+            if progress_callback and duration > 0 and done_duration:
+                progress_callback(min(100.0, done_duration / duration * 100))
+
+            def frame_range(i):
+                """(first frame index, frame count) of segment ``i``"""
+                start, end = segments[i]
+                first = index.frame_at(start)
+                return first, (index.frame_at(end) - first if end is not None else None)
+
+            if todo:
+                # Workers can't see a threading.Event, relay cancellation through a Manager
+                manager = multiprocessing.Manager() if cancel_event is not None else contextlib.nullcontext()
+                with manager, ProcessPoolExecutor(max_workers=min(self.num_workers, len(todo))) as executor:
+                    worker_cancel = manager.Event() if cancel_event is not None else None
+                    futures = {
+                        executor.submit(_render_segment, input_path, segment_files[i],
+                                        segments[i][0], segments[i][1], *frame_range(i),
+                                        video_effects, self.settings, self.decoder_backend,
+                                        worker_cancel): i
+                        for i in todo
+                    }
+
+                    remaining = set(futures)
+                    while remaining:
+                        done, remaining = wait(remaining, timeout=0.5, return_when=FIRST_COMPLETED)
+                        if cancel_event is not None and cancel_event.is_set():
+                            worker_cancel.set()
+                            executor.shutdown(wait=True, cancel_futures=True)
+                            raise ExportCancelled("Export cancelled")
+
+                        for future in done:
+                            future.result()
+
+                            i = futures[future]
+                            if manifest is not None:
+                                manifest['segments'][i]['done'] = True
+                                self._save_manifest(workspace, manifest)
+                            done_duration += segment_duration(i)
+                            if progress_callback and duration > 0:
+                                progress_callback(min(100.0, done_duration / duration * 100))
+
+            # Segments that produced no frame have no file to join
+            rendered = [f for f in segment_files if os.path.exists(f)]
+            self._concat_segments(rendered, list_path, output_path, audio_path)
+            self.logger.info("Segmented video processing completed")
+            return True
+
+        except ExportCancelled:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error processing video segments: {str(e)}")
+            raise
+
+        finally:
+            # Checkpointed segments stay until the caller drops the workspace
+            temp_files = [list_path] if workspace else segment_files + [list_path]
+            for temp_file in temp_files:
+                try:
+                    if os.path.exists(temp_file):
+                        os.remove(temp_file)
+                except Exception as e:
+                    self.logger.warning(f"Could not delete temporary file {temp_file}: {str(e)}")
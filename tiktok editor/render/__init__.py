@@ -0,0 +1,19 @@
+from .spec import RenderSpec, SpecError, load_spec
+from .job_queue import JobQueue, Job
+
+__all__ = [
+    'RenderSpec',
+    'SpecError',
+    'load_spec',
+    'JobQueue',
+    'Job',
+    'Renderer'
+]
+
+
+def __getattr__(name):
+    # The renderer pulls in the export stack, only load it when it is used
+    if name == 'Renderer':
+        from .renderer import Renderer
+        return Renderer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,283 @@
+import argparse
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from utils.media_probe import get_video_info
+from .job_queue import JobQueue, Job, DONE, FAILED
+from .spec import RenderSpec, SpecError, load_spec
+
+# Relative cost of effects per megapixel-second of source, on top of decode + encode
+_EFFECT_COSTS = {
+    'Crop': 0.1,
+    'Blur': 0.6,
+    'LightBar': 0.3,
+    'ColorFilter': 0.2,
+    'Mirror': 0.1,
+    'Vignette': 0.2,
+}
+_FACE_TRACK_COST = 1.5
+_AUDIO_EFFECT_COST = 0.05
+
+
+def estimate_cost(input_path: str, spec: RenderSpec) -> Tuple[float, float]:
+    """(relative cost, media duration in seconds) of rendering ``input_path``.
+
+    The cost is megapixel-seconds of source weighted by the effect chain; it
+    only has to rank jobs against each other.
+    """
+    info = get_video_info(input_path)
+    duration = info['duration']
+    megapixels = max(info['width'] * info['height'], 1) / 1e6
+
+    weight = 1.0
+    for entry in spec.video:
+        weight += _EFFECT_COSTS.get(entry['name'], 0.3)
+        if entry['params'].get('track_face'):
+            weight += _FACE_TRACK_COST
+    weight += _AUDIO_EFFECT_COST * len(spec.audio)
+    return max(duration, 0.1) * megapixels * weight, duration
+
+
+# One renderer per worker process, so imports and model loads happen once
+_worker_renderer = None
+
+
+def run_render_job(job_id: int, input_path: str, output_path: str, spec_data: dict,
+             workspace: str, threads: int) -> float:
+    """Render one job in a worker process; returns the wall time in seconds"""
+    global _worker_renderer
+    import cv2
+    from .renderer import Renderer
+
+    cv2.setNumThreads(threads)
+    if _worker_renderer is None:
+        _worker_renderer = Renderer(workspace, num_threads=threads)
+
+    # Per-job workspace and core budget on the shared renderer
+    shutil.rmtree(workspace, ignore_errors=True)
+    os.makedirs(workspace)
+    _worker_renderer.num_threads = threads
+    _worker_renderer.export_processor.temp_dir = workspace
+    _worker_renderer.export_processor.num_threads = threads
+
+    # Render next to the output and rename, so a crash never leaves a truncated file
+    directory, name = os.path.split(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    partial = os.path.join(directory, f".{os.path.splitext(name)[0]}.job{job_id}.partial.mp4")
+
+    start = time.time()
+    try:
+        _worker_renderer.render(input_path, partial, RenderSpec.from_dict(spec_data))
+        os.replace(partial, output_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+        shutil.rmtree(workspace, ignore_errors=True)
+    return time.time() - start
+
+
+@dataclass
+class BatchReport:
+    completed: int
+    failed: int
+    retried: int
+    wall_time: float
+    media_time: float
+
+    @property
+    def clips_per_hour(self) -> float:
+        return self.completed * 3600 / self.wall_time if self.wall_time > 0 else 0.0
+
+    @property
+    def realtime_factor(self) -> float:
+        """Seconds of media rendered per wall-clock second"""
+        return self.media_time / self.wall_time if self.wall_time > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.completed} done, {self.failed} failed, {self.retried} retried in "
+                f"{self.wall_time:.1f}s: {self.clips_per_hour:.1f} clips/hour, "
+                f"{self.realtime_factor:.2f}x realtime")
+
+
+class BatchScheduler:
+    """Runs queued jobs on worker processes within a core budget.
+
+    Jobs start most expensive first (longest-processing-time order), up to
+    ``max_jobs`` at a time. Each job gets a share of ``cores`` in proportion
+    to its cost relative to the average pending job, so one long clip does
+    not run on a single core while short ones finish around it.
+    """
+
+    def __init__(self, queue: JobQueue, workspace_root: str, cores: Optional[int] = None,
+                 max_jobs: Optional[int] = None):
+        self.queue = queue
+        self.workspace_root = workspace_root
+        self.cores = max(1, cores or os.cpu_count() or 1)
+        self.max_jobs = max(1, min(max_jobs or max(1, self.cores // 2), self.cores))
+        self.logger = logging.getLogger('BatchScheduler')
+
+    def _budget(self, job: Job, pending: List[Job], free_cores: int) -> int:
+        mean_cost = sum(j.cost for j in pending) / len(pending)
+        share = self.cores / self.max_jobs
+        cores = int(round(share * job.cost / mean_cost)) if mean_cost > 0 else int(share)
+        return max(1, min(cores, free_cores))
+
+    def run(self, progress_callback=None) -> BatchReport:
+        """Run until the queue is drained; finished jobs from earlier runs are kept"""
+        interrupted = self.queue.requeue_interrupted()
+        if interrupted:
+            self.logger.info(f"Resuming {interrupted} interrupted jobs")
+        os.makedirs(self.workspace_root, exist_ok=True)
+
+        start = time.time()
+        completed = failed = retried = 0
+        media_time = 0.0
+        running: Dict = {}  # future -> (job, cores)
+        free_cores = self.cores
+        executor = ProcessPoolExecutor(max_workers=self.max_jobs)
+
+        try:
+            while True:
+                # Fill free slots, biggest jobs first
+                pending = self.queue.pending()
+                while pending and len(running) < self.max_jobs and free_cores > 0:
+                    job = pending[0]
+                    cores = self._budget(job, pending, free_cores)
+                    pending.pop(0)
+                    workspace = os.path.join(self.workspace_root, f"job_{job.id}")
+                    self.queue.start(job.id)
+                    future = executor.submit(run_render_job, job.id, job.input, job.output,
+                                             job.spec, workspace, cores)
+                    running[future] = (job, cores)
+                    free_cores -= cores
+                    self.logger.info(f"Job {job.id} started on {cores} cores: {job.input}")
+
+                if not running:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job, cores = running.pop(future)
+                    free_cores += cores
+                    try:
+                        elapsed = future.result()
+                    except Exception as e:
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                        if self.queue.fail(job.id, str(e) or type(e).__name__):
+                            retried += 1
+                            self.logger.warning(f"Job {job.id} failed, will retry: {e}")
+                        else:
+                            failed += 1
+                            self.logger.error(f"Job {job.id} failed: {e}")
+                        continue
+                    self.queue.finish(job.id, elapsed)
+                    completed += 1
+                    media_time += job.duration
+                    self.logger.info(f"Job {job.id} done in {elapsed:.1f}s: {job.output}")
+
+                if broken:
+                    # A worker died (e.g. OOM): the remaining futures are lost
+                    # too, count them as failed attempts and start a new pool
+                    for future, (job, cores) in running.items():
+                        if self.queue.fail(job.id, "Worker process died"):
+                            retried += 1
+                        else:
+                            failed += 1
+                    running.clear()
+                    free_cores = self.cores
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = ProcessPoolExecutor(max_workers=self.max_jobs)
+
+                if progress_callback:
+                    progress_callback(self.queue.counts())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        return BatchReport(completed, failed, retried, time.time() - start, media_time)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m render.batch',
+                                     description="Queue and run batch renders.")
+    parser.add_argument('--db', default='render_jobs.db', help="Job queue database (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="Queue input files")
+    add.add_argument('inputs', nargs='+')
+    add.add_argument('-s', '--spec', required=True, help="JSON spec file, inline JSON or preset name")
+    add.add_argument('-d', '--output-dir', required=True)
+    add.add_argument('--max-attempts', type=int, default=3)
+
+    run = commands.add_parser('run', help="Render every pending job")
+    run.add_argument('--cores', type=int, help="Cores to use in total (default: all)")
+    run.add_argument('--jobs', type=int, help="Jobs rendered at once (default: cores / 2)")
+    run.add_argument('--workspace', default=os.path.join('temp', 'batch'),
+                     help="Root of the per-job workspaces (default: %(default)s)")
+
+    commands.add_parser('status', help="Show queue counts and throughput")
+    commands.add_parser('retry', help="Queue failed jobs again")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    queue = JobQueue(args.db)
+
+    try:
+        if args.command == 'add':
+            try:
+                spec = load_spec(args.spec)
+                spec.build_effects()
+            except SpecError as e:
+                print(f"error: {e}", file=sys.stderr)
+                return 2
+            skipped = 0
+            for input_path in args.inputs:
+                stem = os.path.splitext(os.path.basename(input_path))[0]
+                output_path = os.path.join(args.output_dir, f"{stem}_edited.mp4")
+                try:
+                    cost, duration = estimate_cost(input_path, spec)
+                except Exception as e:
+                    print(f"skipped {input_path}: {e}", file=sys.stderr)
+                    skipped += 1
+                    continue
+                job_id = queue.add(os.path.abspath(input_path), os.path.abspath(output_path),
+                                   spec.to_dict(), cost, duration, args.max_attempts)
+                print(f"queued job {job_id}: {input_path} (cost {cost:.1f})")
+            return 1 if skipped else 0
+
+        elif args.command == 'run':
+            scheduler = BatchScheduler(queue, args.workspace, args.cores, args.jobs)
+            report = scheduler.run()
+            print(report)
+            return 1 if report.failed else 0
+
+        elif args.command == 'status':
+            counts = queue.counts()
+            print(', '.join(f"{n} {status}" for status, n in counts.items()))
+            done = queue.jobs(DONE)
+            render_time = sum(j.elapsed or 0 for j in done)
+            if render_time > 0:
+                print(f"Rendered {sum(j.duration for j in done):.0f}s of media in {render_time:.0f}s of job time "
+                      f"({sum(j.duration for j in done) / render_time:.2f}x realtime per job)")
+            for job in queue.jobs(FAILED):
+                print(f"failed job {job.id}: {job.input}: {job.error}")
+
+        elif args.command == 'retry':
+            print(f"{queue.retry_failed()} jobs queued again")
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import List, Optional
+
+from effects.effect_manager import EffectManager
+from .spec import SpecError, load_spec
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m render',
+        description="Render videos with an effect chain, without the GUI."
+    )
+    parser.add_argument('inputs', nargs='+', help="Input video files")
+    parser.add_argument('-s', '--spec', required=True,
+                        help="JSON spec file, inline JSON or name of a saved preset")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('-o', '--output', help="Output file (single input only)")
+    output.add_argument('-d', '--output-dir',
+                        help="Output directory, files are named <input>_edited.mp4 (default: next to the inputs)")
+    parser.add_argument('--strategy', choices=['auto', 'pipeline', 'segmented'],
+                        help="Override the spec's render strategy")
+    parser.add_argument('--temp-dir', help="Directory for intermediate files (default: a fresh temp dir)")
+    parser.add_argument('--overwrite', action='store_true', help="Replace existing outputs")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only print errors")
+    return parser
+
+
+def _output_path(input_path: str, args) -> str:
+    if args.output:
+        return args.output
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    directory = args.output_dir or os.path.dirname(os.path.abspath(input_path))
+    return os.path.join(directory, f"{stem}_edited.mp4")
+
+
+class _ProgressPrinter:
+    """Prints whole-percent progress to stderr, at most a few times per second"""
+
+    def __init__(self, label: str, enabled: bool):
+        self.label = label
+        self.enabled = enabled
+        self._last_time = 0.0
+        self._last_value = -1
+
+    def __call__(self, progress: float):
+        value = int(progress)
+        now = time.monotonic()
+        if not self.enabled or value == self._last_value:
+            return
+        if value < 100 and now - self._last_time < 0.25:
+            return
+        self._last_time, self._last_value = now, value
+        end = '\n' if value >= 100 else ''
+        sys.stderr.write(f"\r{self.label}: {value:3d}%{end}")
+        sys.stderr.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+
+    if args.quiet:
+        # The processors log progress at INFO level on their own handlers
+        logging.disable(logging.WARNING)
+    if args.output and len(args.inputs) > 1:
+        print("error: --output only works with a single input, use --output-dir", file=sys.stderr)
+        return 2
+
+    effect_manager = EffectManager()
+    try:
+        spec = load_spec(args.spec, effect_manager)
+        spec.build_effects(effect_manager)  # Fail before the first render
+    except SpecError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if args.strategy:
+        spec.strategy = args.strategy
+
+    # Imported here so a bad command line or spec fails fast
+    from .renderer import Renderer
+    renderer = Renderer(args.temp_dir, effect_manager)
+
+    failures = 0
+    try:
+        for input_path in args.inputs:
+            output_path = _output_path(input_path, args)
+            if os.path.exists(output_path) and not args.overwrite:
+                print(f"skipped {input_path}: {output_path} exists (use --overwrite)", file=sys.stderr)
+                failures += 1
+                continue
+
+            start = time.time()
+            try:
+                renderer.render(input_path, output_path, spec,
+                                _ProgressPrinter(os.path.basename(input_path), not args.quiet))
+            except Exception as e:
+                print(f"\nfailed {input_path}: {e}", file=sys.stderr)
+                failures += 1
+                continue
+            if not args.quiet:
+                print(f"{output_path} ({time.time() - start:.1f}s)")
+    finally:
+        renderer.close()
+
+    return 1 if failures else 0
@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    input TEXT NOT NULL,
+    output TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    cost REAL NOT NULL DEFAULT 1.0,
+    duration REAL NOT NULL DEFAULT 0.0,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    elapsed REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    input: str
+    output: str
+    spec: Dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    cost: float
+    duration: float  # Media seconds
+    error: Optional[str]
+    elapsed: Optional[float]  # Wall seconds of the successful attempt
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> 'Job':
+        return cls(
+            id=row['id'], input=row['input'], output=row['output'],
+            spec=json.loads(row['spec']), status=row['status'],
+            attempts=row['attempts'], max_attempts=row['max_attempts'],
+            cost=row['cost'], duration=row['duration'],
+            error=row['error'], elapsed=row['elapsed']
+        )
+
+
+class JobQueue:
+    """Persistent render job queue in a SQLite file.
+
+    Every state change is committed right away, so after a crash the queue
+    knows which jobs finished; ``requeue_interrupted`` puts the ones that were
+    running back in line. Safe to share between threads of one process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def add(self, input_path: str, output_path: str, spec: Dict[str, Any],
+            cost: float = 1.0, duration: float = 0.0, max_attempts: int = 3) -> int:
+        cursor = self._execute(
+            'INSERT INTO jobs (input, output, spec, cost, duration, max_attempts, created) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (input_path, output_path, json.dumps(spec), cost, duration, max_attempts, time.time())
+        )
+        return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[Job]:
+        row = self._execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def jobs(self, status: Optional[str] = None) -> List[Job]:
+        if status is None:
+            rows = self._execute('SELECT * FROM jobs ORDER BY id').fetchall()
+        else:
+            rows = self._execute('SELECT * FROM jobs WHERE status = ? ORDER BY id', (status,)).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def pending(self) -> List[Job]:
+        """Pending jobs, most expensive first"""
+        rows = self._execute('SELECT * FROM jobs WHERE status = ? ORDER BY cost DESC, id',
+                             (PENDING,)).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def start(self, job_id: int):
+        self._execute('UPDATE jobs SET status = ?, started = ?, error = NULL WHERE id = ?',
+                      (RUNNING, time.time(), job_id))
+
+    def finish(self, job_id: int, elapsed: float):
+        self._execute('UPDATE jobs SET status = ?, finished = ?, elapsed = ?, attempts = attempts + 1 '
+                      'WHERE id = ?', (DONE, time.time(), elapsed, job_id))
+
+    def fail(self, job_id: int, error: str) -> bool:
+        """Record a failed attempt; returns True if the job will be retried"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET attempts = attempts + 1, error = ?, finished = ?, '
+                'status = CASE WHEN attempts + 1 < max_attempts THEN ? ELSE ? END WHERE id = ?',
+                (error, time.time(), PENDING, FAILED, job_id)
+            )
+            row = self._conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return row is not None and row['status'] == PENDING
+
+    def requeue_interrupted(self) -> int:
+        """Put jobs left running by a crashed run back in the queue"""
+        return self._execute('UPDATE jobs SET status = ? WHERE status = ?', (PENDING, RUNNING)).rowcount
+
+    def retry_failed(self) -> int:
+        """Give failed jobs a fresh set of attempts"""
+        return self._execute('UPDATE jobs SET status = ?, attempts = 0 WHERE status = ?',
+                             (PENDING, FAILED)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status').fetchall()
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({row['status']: row['n'] for row in rows})
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Optional, Callable
+
+from effects.effect_manager import EffectManager
+from processors.export_processor import ExportProcessor
+from utils.media_handler import MediaHandler
+from utils.media_probe import has_audio
+from .spec import RenderSpec
+
+
+class Renderer:
+    """Renders files with a RenderSpec, without the GUI.
+
+    One renderer keeps its ExportProcessor (and the models it loads) across
+    renders, so it can be reused for many files.
+    """
+
+    def __init__(self, temp_dir: Optional[str] = None, effect_manager: Optional[EffectManager] = None,
+                 num_threads: Optional[int] = None):
+        self._owns_temp_dir = temp_dir is None
+        self.temp_dir = temp_dir or tempfile.mkdtemp(prefix='render_')
+        self.effect_manager = effect_manager or EffectManager()
+        self.num_threads = num_threads
+        self.export_processor = ExportProcessor(self.temp_dir, num_threads)
+        self.logger = logging.getLogger('Renderer')
+
+    def render(self, input_path: str, output_path: str, spec: RenderSpec,
+               progress_callback: Optional[Callable] = None,
+               cancel_event: Optional[threading.Event] = None) -> str:
+        """Render ``input_path`` to ``output_path`` and return the output path"""
+        # Effects keep per-clip state, so every render gets new instances
+        video_effects, audio_effects = spec.build_effects(self.effect_manager)
+        settings = spec.encoder_settings()
+        if self.num_threads and not settings.threads:
+            # Keep the encoder inside the same core budget as the frame workers
+            settings.threads = self.num_threads
+        self.export_processor.encoder_settings = settings
+        try:
+            return self.render_effects(input_path, output_path, video_effects, audio_effects,
+                                       progress_callback, strategy=spec.strategy,
+                                       cancel_event=cancel_event)
+        finally:
+            for effect in video_effects:
+                if hasattr(effect, 'cleanup'):
+                    effect.cleanup()
+
+    def render_effects(self, input_path: str, output_path: str, video_effects: list,
+                       audio_effects: Optional[list] = None,
+                       progress_callback: Optional[Callable] = None, strategy: str = 'auto',
+                       cancel_event: Optional[threading.Event] = None) -> str:
+        """Render with already built effect instances"""
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input video not found: {input_path}")
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        media_handler = MediaHandler()
+        try:
+            temp_audio = None
+            if has_audio(input_path):
+                temp_audio = media_handler.extract_audio(input_path)
+            else:
+                self.logger.info(f"No audio stream in {input_path}")
+
+            return self.export_processor.export(
+                input_path,
+                output_path,
+                video_effects,
+                audio_effects,
+                temp_audio,
+                progress_callback,
+                strategy=strategy,
+                cancel_event=cancel_event
+            )
+        finally:
+            media_handler.cleanup()
+
+    def close(self):
+        if self._owns_temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
@@ -0,0 +1,317 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from effects.effect_manager import EffectManager
+from .spec import RenderSpec, SpecError, load_spec
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class ServiceJob:
+    """State of one submitted export, shared between the worker and HTTP threads"""
+
+    def __init__(self, job_id: str, input_path: str, output_path: str, spec: RenderSpec):
+        self.id = job_id
+        self.input = input_path
+        self.output = output_path
+        self.spec = spec
+        self.status = QUEUED
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel_event = threading.Event()
+        # Notified on every change, for the event streams
+        self.changed = threading.Condition()
+        self.version = 0
+
+    def update(self, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.changed.notify_all()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'input': self.input,
+            'output': self.output,
+            'status': self.status,
+            'progress': round(self.progress, 1),
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class RenderService:
+    """Runs exports on a fixed set of worker threads.
+
+    Each worker thread keeps its own Renderer, so imports, ExportProcessor
+    setup and model loads are paid once per worker rather than per job.
+    """
+
+    def __init__(self, workers: int = 2, results_dir: str = os.path.join('temp', 'service'),
+                 cores: Optional[int] = None):
+        self.workers = max(1, workers)
+        self.results_dir = os.path.abspath(results_dir)
+        self.threads_per_job = max(1, (cores or os.cpu_count() or 1) // self.workers)
+        self.effect_manager = EffectManager()
+        self.logger = logging.getLogger('RenderService')
+        self.jobs: Dict[str, ServiceJob] = {}
+        self._jobs_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._renderers = []
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='RenderService')
+        os.makedirs(self.results_dir, exist_ok=True)
+
+    def _renderer(self):
+        renderer = getattr(self._local, 'renderer', None)
+        if renderer is None:
+            from .renderer import Renderer
+            workspace = os.path.join(self.results_dir, f"work_{threading.get_ident()}")
+            renderer = Renderer(workspace, self.effect_manager, num_threads=self.threads_per_job)
+            self._local.renderer = renderer
+            self._renderers.append(renderer)
+        return renderer
+
+    def submit(self, input_path: str, spec: RenderSpec, output_path: Optional[str] = None) -> ServiceJob:
+        if not os.path.isfile(input_path):
+            raise FileNotFoundError(f"Input video not found: {input_path}")
+        spec.build_effects(self.effect_manager)  # Reject bad specs at submission
+
+        job_id = str(next(self._ids))
+        output_path = os.path.abspath(output_path or os.path.join(self.results_dir, f"{job_id}.mp4"))
+        job = ServiceJob(job_id, os.path.abspath(input_path), output_path, spec)
+        with self._jobs_lock:
+            self.jobs[job_id] = job
+        self._executor.submit(self._run, job)
+        self.logger.info(f"Job {job_id} queued: {input_path}")
+        return job
+
+    def get(self, job_id: str) -> Optional[ServiceJob]:
+        with self._jobs_lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> list:
+        with self._jobs_lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[ServiceJob]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.status == QUEUED:
+            job.update(status=CANCELLED, finished=time.time())
+        return job
+
+    def _run(self, job: ServiceJob):
+        from processors.frame_pipeline import ExportCancelled
+
+        if job.cancel_event.is_set():
+            return
+        job.update(status=RUNNING, started=time.time())
+
+        # Throttle progress events to a few per second
+        last = [0.0]
+
+        def progress(p):
+            now = time.monotonic()
+            if p >= 100 or now - last[0] >= 0.25:
+                last[0] = now
+                job.update(progress=float(p))
+
+        try:
+            self._renderer().render(job.input, job.output, job.spec, progress, job.cancel_event)
+        except ExportCancelled:
+            job.update(status=CANCELLED, finished=time.time())
+            self.logger.info(f"Job {job.id} cancelled")
+        except Exception as e:
+            job.update(status=FAILED, error=str(e), finished=time.time())
+            self.logger.error(f"Job {job.id} failed: {str(e)}")
+        else:
+            job.update(status=DONE, progress=100.0, finished=time.time())
+            self.logger.info(f"Job {job.id} done: {job.output}")
+
+    def shutdown(self):
+        for job in self.list_jobs():
+            self.cancel(job.id)
+        self._executor.shutdown(wait=True)
+        for renderer in self._renderers:
+            renderer.close()
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over a RenderService:
+
+    - ``POST /jobs`` with ``{"input": path, "spec": spec or preset name, "output": path?}``
+    - ``GET /jobs`` and ``GET /jobs/<id>`` for status
+    - ``GET /jobs/<id>/events`` for progress as server-sent events
+    - ``DELETE /jobs/<id>`` to cancel
+    - ``GET /jobs/<id>/result`` for the rendered file
+    """
+
+    service: RenderService = None  # Set by make_server
+    server_version = 'TikTokEditorRender/1.0'
+    _job_path = re.compile(r'^/jobs/([^/]+)(/events|/result)?/?$')
+
+    def log_message(self, format, *args):
+        logging.getLogger('RenderService').debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, status: HTTPStatus, data: Any, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: HTTPStatus, message: str):
+        self._send_json(status, {'error': message})
+
+    def _job(self):
+        match = self._job_path.match(self.path.split('?', 1)[0])
+        if not match:
+            return None, None
+        return self.service.get(match.group(1)), match.group(2)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            return self._send_error(HTTPStatus.NOT_FOUND, "Not found")
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length) or b'{}')
+            spec_data = request.get('spec', {})
+            if isinstance(spec_data, str):
+                spec = load_spec(spec_data, self.service.effect_manager)
+            else:
+                spec = RenderSpec.from_dict(spec_data)
+            job = self.service.submit(request['input'], spec, request.get('output'))
+        except (ValueError, KeyError, TypeError, SpecError, FileNotFoundError) as e:
+            message = f"Missing field {e}" if isinstance(e, KeyError) else str(e)
+            return self._send_error(HTTPStatus.BAD_REQUEST, message)
+        self._send_json(HTTPStatus.ACCEPTED, job.to_dict(), {'Location': f"/jobs/{job.id}"})
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0].rstrip('/') == '/jobs':
+            return self._send_json(HTTPStatus.OK, [job.to_dict() for job in self.service.list_jobs()])
+
+        job, sub = self._job()
+        if job is None:
+            return self._send_error(HTTPStatus.NOT_FOUND, "No such job")
+        if sub == '/events':
+            return self._stream_events(job)
+        if sub == '/result':
+            return self._send_result(job)
+        self._send_json(HTTPStatus.OK, job.to_dict())
+
+    def do_DELETE(self):
+        job, sub = self._job()
+        if job is None or sub:
+            return self._send_error(HTTPStatus.NOT_FOUND, "No such job")
+        self.service.cancel(job.id)
+        self._send_json(HTTPStatus.OK, job.to_dict())
+
+    def _stream_events(self, job: ServiceJob):
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        version = -1
+        try:
+            while True:
+                with job.changed:
+                    if job.version == version:
+                        # Wake up now and then to send a keep-alive comment
+                        job.changed.wait(timeout=15)
+                    if job.version == version:
+                        self.wfile.write(b': keep-alive\n\n')
+                        self.wfile.flush()
+                        continue
+                    version = job.version
+                    data = job.to_dict()
+                event = data['status'] if data['status'] in FINISHED else 'progress'
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                if data['status'] in FINISHED:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_result(self, job: ServiceJob):
+        if job.status != DONE:
+            return self._send_error(HTTPStatus.CONFLICT, f"Job is {job.status}")
+        try:
+            size = os.path.getsize(job.output)
+            with open(job.output, 'rb') as f:
+                self.send_response(HTTPStatus.OK)
+                self.send_header('Content-Type', 'video/mp4')
+                self.send_header('Content-Length', str(size))
+                self.send_header('Content-Disposition',
+                                 f'attachment; filename="{os.path.basename(job.output)}"')
+                self.end_headers()
+                shutil.copyfileobj(f, self.wfile)
+        except FileNotFoundError:
+            self._send_error(HTTPStatus.GONE, "Result file was removed")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def make_server(service: RenderService, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    handler = type('BoundRenderRequestHandler', (RenderRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m render.service',
+                                     description="Local HTTP render service.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to bind (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help="Exports run at once (default: %(default)s)")
+    parser.add_argument('--cores', type=int, help="Cores shared by the workers (default: all)")
+    parser.add_argument('--results-dir', default=os.path.join('temp', 'service'))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    service = RenderService(args.workers, args.results_dir, args.cores)
+    server = make_server(service, args.host, args.port)
+    logging.getLogger('RenderService').info(f"Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
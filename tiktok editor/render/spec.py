@@ -0,0 +1,131 @@
+import json
+import os
+from dataclasses import dataclass, field, fields, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from effects.effect_manager import EffectManager, EffectCategory
+from processors.ffmpeg_writer import EncoderSettings
+
+STRATEGIES = ('auto', 'pipeline', 'segmented')
+
+
+class SpecError(Exception):
+    """Raised when a render spec is malformed or names an unknown effect"""
+
+
+@dataclass
+class RenderSpec:
+    """Effect chain and encoder settings of a headless render.
+
+    Same layout as the presets saved by EffectChain::
+
+        {
+            "video": [{"name": "Crop", "params": {"ratio": "9:16", "track_face": true}},
+                      {"name": "Vignette", "params": {"intensity": 0.4}}],
+            "audio": [{"name": "Echo", "params": {"intensity": 0.3}}],
+            "encoder": {"codec": "libx264", "crf": 20},
+            "strategy": "auto"
+        }
+
+    Effect names and parameters are the ones registered in EffectManager.
+    """
+    video: List[Dict[str, Any]] = field(default_factory=list)
+    audio: List[Dict[str, Any]] = field(default_factory=list)
+    encoder: Dict[str, Any] = field(default_factory=dict)
+    strategy: str = 'auto'
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RenderSpec':
+        if not isinstance(data, dict):
+            raise SpecError("Render spec must be a JSON object")
+        unknown = set(data) - {f.name for f in fields(cls)}
+        if unknown:
+            raise SpecError(f"Unknown spec keys: {', '.join(sorted(unknown))}")
+
+        spec = cls(
+            video=_effect_list(data.get('video', []), 'video'),
+            audio=_effect_list(data.get('audio', []), 'audio'),
+            encoder=dict(data.get('encoder') or {}),
+            strategy=data.get('strategy', 'auto'),
+        )
+        if spec.strategy not in STRATEGIES:
+            raise SpecError(f"Unknown strategy '{spec.strategy}' (expected one of {', '.join(STRATEGIES)})")
+        spec.encoder_settings()  # Validate the keys now rather than mid-render
+        return spec
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def encoder_settings(self) -> EncoderSettings:
+        known = {f.name for f in fields(EncoderSettings)}
+        unknown = set(self.encoder) - known
+        if unknown:
+            raise SpecError(f"Unknown encoder settings: {', '.join(sorted(unknown))}")
+        return EncoderSettings(**self.encoder)
+
+    def build_effects(self, manager: Optional[EffectManager] = None) -> Tuple[list, list]:
+        """Fresh (video, audio) effect instances for one render"""
+        manager = manager or EffectManager()
+        video = [_create_effect(manager, entry, EffectCategory.VIDEO) for entry in self.video]
+        audio = [_create_effect(manager, entry, EffectCategory.AUDIO) for entry in self.audio]
+        return video, audio
+
+
+def _effect_list(entries: Any, section: str) -> List[Dict[str, Any]]:
+    if not isinstance(entries, list):
+        raise SpecError(f"'{section}' must be a list of effects")
+    result = []
+    for entry in entries:
+        # A bare name uses the default parameters
+        if isinstance(entry, str):
+            entry = {'name': entry}
+        if not isinstance(entry, dict) or 'name' not in entry:
+            raise SpecError(f"Invalid {section} effect entry: {entry!r}")
+        params = entry.get('params') or {}
+        if not isinstance(params, dict):
+            raise SpecError(f"Parameters of {entry['name']} must be an object")
+        result.append({'name': entry['name'], 'params': dict(params)})
+    return result
+
+
+def _create_effect(manager: EffectManager, entry: Dict[str, Any], category: EffectCategory):
+    name, params = entry['name'], entry['params']
+    info = manager.get_effect(name)
+    if info is None:
+        available = ', '.join(sorted(e.name for e in manager.get_effects_by_category(category)))
+        raise SpecError(f"Unknown {category.value} effect '{name}' (available: {available})")
+    if info.category != category:
+        raise SpecError(f"'{name}' belongs to the {info.category.value} effects, not {category.value}")
+
+    declared = {p.name: p for p in info.parameters}
+    unknown = set(params) - set(declared)
+    if unknown:
+        raise SpecError(f"Unknown parameters for {name}: {', '.join(sorted(unknown))}")
+    for key, value in params.items():
+        param = declared[key]
+        # EffectManager quietly falls back to the default, a spec should fail loudly
+        if param.type == 'choice' and param.choices and value not in param.choices:
+            raise SpecError(f"{name}.{key} must be one of {', '.join(map(str, param.choices))}")
+
+    return manager.create_effect_instance(name, **params)
+
+
+def load_spec(source: str, manager: Optional[EffectManager] = None) -> RenderSpec:
+    """Spec from a JSON file, an inline JSON string or the name of a saved preset"""
+    if os.path.isfile(source):
+        with open(source, 'r', encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise SpecError(f"Invalid JSON in {source}: {e}")
+    elif source.lstrip().startswith('{'):
+        try:
+            data = json.loads(source)
+        except json.JSONDecodeError as e:
+            raise SpecError(f"Invalid JSON spec: {e}")
+    else:
+        manager = manager or EffectManager()
+        data = manager.get_preset(source)
+        if data is None:
+            raise SpecError(f"No spec file or preset named '{source}'")
+    return RenderSpec.from_dict(data)
@@ -0,0 +1,371 @@
+import argparse
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import shutil
+import signal
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Set, Tuple
+
+from .batch import run_render_job
+from .spec import RenderSpec, SpecError, load_spec
+
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.m4v', '.mkv', '.avi', '.webm'}
+
+# Portrait crop that follows the speaker, used when no spec is given
+DEFAULT_SPEC = {'video': [{'name': 'Crop', 'params': {'ratio': '9:16', 'track_face': True}}]}
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal inotify binding through ctypes (Linux only)"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories: Dict[int, str] = {}
+
+    def add_watch(self, directory: str):
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_MODIFY
+        wd = self._add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self._directories[wd] = directory
+
+    def read(self, timeout: float) -> Set[str]:
+        """Paths touched within ``timeout`` seconds"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        paths = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name and wd in self._directories:
+                paths.add(os.path.join(self._directories[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Reports files that appear or change in a set of directories.
+
+    Uses inotify where available and falls back to listing the directories
+    every ``poll_interval`` seconds. Even with inotify the directories are
+    rescanned now and then, so nothing is missed if the event queue overflows.
+    """
+
+    def __init__(self, directories: List[str], poll_interval: float = 2.0,
+                 rescan_interval: float = 60.0, use_inotify: bool = True):
+        self.directories = directories
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.logger = logging.getLogger('FolderWatcher')
+        self._inotify: Optional[_Inotify] = None
+        self._last_scan = 0.0
+
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify()
+                for directory in directories:
+                    self._inotify.add_watch(directory)
+            except (OSError, AttributeError) as e:
+                self.logger.warning(f"inotify unavailable, polling instead: {str(e)}")
+                self.close()
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    def scan(self) -> Set[str]:
+        paths = set()
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    paths.update(entry.path for entry in entries if entry.is_file())
+            except OSError as e:
+                self.logger.warning(f"Cannot list {directory}: {str(e)}")
+        self._last_scan = time.monotonic()
+        return paths
+
+    def poll(self, timeout: float) -> Set[str]:
+        """Paths that may have changed, waiting up to ``timeout`` seconds"""
+        if self._inotify is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return self.scan()
+        paths = self._inotify.read(timeout)
+        if time.monotonic() - self._last_scan >= self.rescan_interval:
+            paths |= self.scan()
+        return paths
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+class FileSettler:
+    """Debounces files that are still being written.
+
+    A file is ready once its size and modification time have not changed for
+    ``settle_time`` seconds.
+    """
+
+    def __init__(self, settle_time: float = 3.0):
+        self.settle_time = settle_time
+        self._seen: Dict[str, Tuple[int, int, float]] = {}  # path -> (size, mtime_ns, since)
+
+    def touch(self, path: str, now: float):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._seen.pop(path, None)
+            return
+        size, mtime = stat.st_size, stat.st_mtime_ns
+        previous = self._seen.get(path)
+        if previous is None or previous[:2] != (size, mtime):
+            self._seen[path] = (size, mtime, now)
+
+    def ready(self, now: float) -> List[str]:
+        """Settled files (oldest first), which are then forgotten"""
+        for path in list(self._seen):
+            self.touch(path, now)
+        settled = sorted((since, path) for path, (size, _, since) in self._seen.items()
+                         if size > 0 and now - since >= self.settle_time)
+        for _, path in settled:
+            del self._seen[path]
+        return [path for _, path in settled]
+
+    @property
+    def waiting(self) -> int:
+        return len(self._seen)
+
+
+class WatchDaemon:
+    """Renders every video dropped into ``inbox`` to ``outbox``.
+
+    Settled files are queued and handed to at most ``workers`` render
+    processes at a time; the rest wait in line, so a burst of uploads never
+    starts more renders (and FFmpeg processes) than that. Sources are moved
+    to ``inbox/processed`` or ``inbox/failed`` (with a ``.error.txt`` next
+    to them) once handled.
+
+    When a render process dies (e.g. out of memory) it takes every render
+    in flight down with it. Those sources are rendered again in a new pool,
+    one at a time, and only a source that kills its render on its own is
+    failed. Renders interrupted by a shutdown leave their source in the
+    inbox, to be picked up on the next start.
+    """
+
+    def __init__(self, inbox: str, outbox: str, spec: RenderSpec, workers: int = 2,
+                 cores: Optional[int] = None, settle_time: float = 3.0,
+                 workspace_root: str = os.path.join('temp', 'watch'), use_inotify: bool = True):
+        self.inbox = os.path.abspath(inbox)
+        self.outbox = os.path.abspath(outbox)
+        self.processed_dir = os.path.join(self.inbox, 'processed')
+        self.failed_dir = os.path.join(self.inbox, 'failed')
+        self.spec = spec
+        self.workers = max(1, workers)
+        self.threads_per_job = max(1, (cores or os.cpu_count() or 1) // self.workers)
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.settler = FileSettler(settle_time)
+        self.use_inotify = use_inotify
+        self.logger = logging.getLogger('WatchDaemon')
+        self._stop = threading.Event()
+        self._job_counter = 0
+
+        for directory in (self.inbox, self.outbox, self.processed_dir, self.failed_dir, self.workspace_root):
+            os.makedirs(directory, exist_ok=True)
+
+    def _is_candidate(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return (os.path.dirname(path) == self.inbox and not name.startswith('.')
+                and os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS)
+
+    def _output_path(self, input_path: str) -> str:
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        return os.path.join(self.outbox, f"{stem}_edited.mp4")
+
+    def _move(self, path: str, directory: str) -> str:
+        target = os.path.join(directory, os.path.basename(path))
+        if os.path.exists(target):
+            stem, ext = os.path.splitext(os.path.basename(path))
+            target = os.path.join(directory, f"{stem}_{int(time.time())}{ext}")
+        shutil.move(path, target)
+        return target
+
+    def _finish(self, path: str, error: Optional[BaseException]):
+        try:
+            if error is None:
+                self._move(path, self.processed_dir)
+                self.logger.info(f"Rendered {path} -> {self._output_path(path)}")
+            else:
+                target = self._move(path, self.failed_dir)
+                with open(f"{target}.error.txt", 'w') as f:
+                    f.write(f"{type(error).__name__}: {error}\n")
+                self.logger.error(f"Failed {path}: {error}")
+        except OSError as e:
+            self.logger.error(f"Could not move {path}: {str(e)}")
+
+    def _done(self, path: str, error: Optional[BaseException]):
+        if error is not None and self._stop.is_set():
+            # Most likely the shutdown signal killing FFmpeg, not a bad source
+            self.logger.info(f"Interrupted, left in the inbox: {path}")
+            return
+        self._finish(path, error)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        watcher = FolderWatcher([self.inbox], use_inotify=self.use_inotify)
+        self.logger.info(f"Watching {self.inbox} ({'inotify' if watcher.uses_inotify else 'polling'}), "
+                         f"{self.workers} workers x {self.threads_per_job} threads")
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        backlog = deque()
+        claimed: Set[str] = set()
+        running: Dict = {}  # future -> input path
+        suspects = deque()  # In flight when a render process died
+        spec_data = self.spec.to_dict()
+
+        def submit(path: str):
+            self._job_counter += 1
+            workspace = os.path.join(self.workspace_root, f"job_{self._job_counter}")
+            future = executor.submit(run_render_job, self._job_counter, path, self._output_path(path),
+                                     spec_data, workspace, self.threads_per_job)
+            running[future] = path
+
+        try:
+            # Files dropped while the daemon was down
+            changed = watcher.scan()
+            while not self._stop.is_set():
+                now = time.monotonic()
+                for path in changed:
+                    if path not in claimed and self._is_candidate(path):
+                        self.settler.touch(path, now)
+                for path in self.settler.ready(now):
+                    claimed.add(path)
+                    backlog.append(path)
+
+                # After a crash, the suspects run alone until each is cleared
+                if suspects and not running:
+                    submit(suspects.popleft())
+
+                # Back-pressure: only as many renders in flight as workers
+                while backlog and not suspects and len(running) < self.workers:
+                    path = backlog.popleft()
+                    if not os.path.exists(path):
+                        claimed.discard(path)
+                        continue
+                    submit(path)
+
+                if running:
+                    done, _ = wait(list(running), timeout=0)
+                    crashed = []
+                    for future in done:
+                        path = running.pop(future)
+                        error = future.exception()
+                        if isinstance(error, BrokenProcessPool):
+                            crashed.append(path)
+                            continue
+                        self._done(path, error)
+                        claimed.discard(path)
+
+                    if crashed:
+                        # A dead worker breaks the pool: every render in flight
+                        # is lost, not only the one that crashed
+                        for future, path in running.items():
+                            if future.done() and future.exception() is None:
+                                self._done(path, None)
+                                claimed.discard(path)
+                            else:
+                                crashed.append(path)
+                        running.clear()
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = ProcessPoolExecutor(max_workers=self.workers)
+
+                        if len(crashed) == 1:
+                            claimed.discard(crashed[0])
+                            self._done(crashed[0], BrokenProcessPool("Render process died on this source"))
+                        else:
+                            self.logger.warning(f"Render process died, rendering {len(crashed)} "
+                                                f"sources again one at a time")
+                            suspects.extend(crashed)
+
+                # Wake up often while files settle or renders run
+                busy = running or self.settler.waiting or backlog or suspects
+                changed = watcher.poll(0.5 if busy else 2.0)
+        finally:
+            watcher.close()
+            self.logger.info(f"Stopping, waiting for {len(running)} renders")
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future, path in running.items():
+                if future.done() and not future.cancelled():
+                    self._done(path, future.exception())
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m render.watch',
+                                     description="Render every video dropped into an inbox directory.")
+    parser.add_argument('--inbox', default='inbox')
+    parser.add_argument('--outbox', default='outbox')
+    parser.add_argument('-s', '--spec', help="JSON spec file, inline JSON or preset name "
+                                             "(default: 9:16 face-tracked crop)")
+    parser.add_argument('--workers', type=int, default=2, help="Renders at once (default: %(default)s)")
+    parser.add_argument('--cores', type=int, help="Cores shared by the workers (default: all)")
+    parser.add_argument('--settle', type=float, default=3.0,
+                        help="Seconds a file must stay unchanged before it is rendered (default: %(default)s)")
+    parser.add_argument('--poll', action='store_true', help="Poll the inbox instead of using inotify")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        spec = load_spec(args.spec) if args.spec else RenderSpec.from_dict(DEFAULT_SPEC)
+        spec.build_effects()
+    except SpecError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    daemon = WatchDaemon(args.inbox, args.outbox, spec, workers=args.workers, cores=args.cores,
+                         settle_time=args.settle, use_inotify=not args.poll)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: daemon.stop())
+    daemon.run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import numpy as np
+
+from effects.visual import ColorFilter, Crop
+from processors.frame_pool import FramePool, apply_effects, backup_for_in_place
+
+
+class FailingEffect:
+    in_place = True
+
+    def apply(self, frame):
+        raise RuntimeError("boom")
+
+
+def make_frame():
+    return np.random.default_rng(0).integers(0, 256, size=(48, 64, 3), dtype=np.uint8)
+
+
+def test_backup_keeps_the_unprocessed_frame_when_an_effect_fails():
+    pool = FramePool()
+    frame = make_frame()
+    original = frame.copy()
+    effects = [ColorFilter(0.8), FailingEffect()]
+
+    backup = backup_for_in_place(frame, effects, pool)
+    try:
+        apply_effects(frame, effects, pool)
+    except RuntimeError:
+        pass
+
+    # ColorFilter already wrote into the frame, the backup did not change
+    assert not np.array_equal(frame, original)
+    assert np.array_equal(backup, original)
+
+
+def test_no_backup_without_in_place_effects():
+    assert backup_for_in_place(make_frame(), [Crop('1:1')]) is None
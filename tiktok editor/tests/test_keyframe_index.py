@@ -0,0 +1,145 @@
+import cv2
+import numpy as np
+import pytest
+
+from processors import keyframe_index
+from processors.keyframe_index import FrameSeeker, KeyframeIndex
+
+
+def build(monkeypatch, packets):
+    monkeypatch.setattr(keyframe_index, 'get_video_packets', lambda path, stream: packets)
+    return KeyframeIndex.build('video.mp4')
+
+
+def test_build_sorts_b_frames_into_presentation_order(monkeypatch):
+    # Decode order of an I P B B I P B B stream at 10 fps
+    packets = [(0.0, True), (0.3, False), (0.1, False), (0.2, False),
+               (0.4, True), (0.7, False), (0.5, False), (0.6, False)]
+    index = build(monkeypatch, packets)
+
+    assert list(index.pts) == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7])
+    assert list(index.keyframes) == [0, 4]
+    assert index.keyframe_before(3) == 0
+    assert index.keyframe_before(4) == 4
+    assert index.keyframe_before(7) == 4
+
+
+def test_build_starts_with_a_keyframe(monkeypatch):
+    index = build(monkeypatch, [(0.0, False), (0.1, False), (0.2, True)])
+    assert list(index.keyframes) == [0, 2]
+
+
+def test_times_are_relative_to_the_stream_start(monkeypatch):
+    index = build(monkeypatch, [(1.4, True), (1.5, False), (1.6, True), (1.7, False)])
+
+    assert index.keyframe_times == pytest.approx([0.0, 0.2])
+    assert index.frame_time(2) == pytest.approx(0.2)
+    assert index.frame_at(0.25) == 2
+    # Half a frame before frame 2, after frame 1
+    assert index.seek_time(2) == pytest.approx(0.15)
+    assert index.seek_time(0) == 0.0
+
+
+def test_variable_frame_rate(monkeypatch):
+    index = build(monkeypatch, [(0.0, True), (0.1, False), (0.15, False), (0.5, False)])
+
+    assert index.frame_at(0.12) == 1
+    assert index.frame_at(0.4) == 2
+    assert index.frame_at(10.0) == 3
+    assert index.seek_time(3) == pytest.approx(0.325)
+
+
+def test_save_and_load(tmp_path, monkeypatch):
+    index = build(monkeypatch, [(0.0, True), (0.1, False), (0.2, True)])
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    loaded = KeyframeIndex.load(path)
+
+    assert np.array_equal(loaded.pts, index.pts)
+    assert np.array_equal(loaded.keyframes, index.keyframes)
+
+
+class FakeCapture:
+    """Records seeks and frames decoded"""
+
+    def __init__(self, accurate_seek=False):
+        self.accurate_seek = accurate_seek
+        self.seeks = []
+        self.grabs = 0
+
+    def set(self, prop, value):
+        assert prop == cv2.CAP_PROP_POS_MSEC
+        self.seeks.append(value / 1000.0)
+        return True
+
+    def grab(self):
+        self.grabs += 1
+        return True
+
+    def read(self):
+        self.grabs += 1
+        return True, None
+
+
+@pytest.fixture
+def index():
+    # 12 frames at 10 fps, keyframes every 4 frames
+    pts = np.arange(12) / 10.0
+    return KeyframeIndex(pts, np.array([0, 4, 8]))
+
+
+def test_seek_forward_in_gop_decodes_without_seeking(index):
+    cap = FakeCapture()
+    seeker = FrameSeeker(cap, index, position=5)
+
+    assert seeker.seek(7)
+    assert cap.seeks == []
+    assert cap.grabs == 2
+    assert seeker.position == 7
+
+
+def test_seek_backward_restarts_at_keyframe(index):
+    cap = FakeCapture()
+    seeker = FrameSeeker(cap, index, position=7)
+
+    assert seeker.seek(6)
+    assert cap.seeks == pytest.approx([index.seek_time(4)])
+    assert cap.grabs == 2
+    assert seeker.position == 6
+
+
+def test_seek_past_keyframe_restarts_at_it(index):
+    cap = FakeCapture()
+    seeker = FrameSeeker(cap, index, position=2)
+
+    assert seeker.seek(9)
+    assert cap.seeks == pytest.approx([index.seek_time(8)])
+    assert cap.grabs == 1
+
+
+def test_seek_on_accurate_capture_goes_to_the_frame_time(index):
+    cap = FakeCapture(accurate_seek=True)
+    seeker = FrameSeeker(cap, index, position=2)
+
+    assert seeker.seek(9)
+    assert cap.seeks == pytest.approx([0.85])
+    assert cap.grabs == 0
+    assert seeker.position == 9
+
+
+def test_seek_clamps_and_reads_advance(index):
+    cap = FakeCapture()
+    seeker = FrameSeeker(cap, index, position=10)
+
+    assert seeker.seek(100)
+    assert seeker.position == 11
+    seeker.read()
+    assert seeker.position == 12
+
+
+def test_frame_at_keyframe_times_finds_the_keyframe(monkeypatch):
+    # Segment boundaries are keyframe times, each must map back to its keyframe
+    packets = [(0.1 + i / 30.0, i % 7 == 0) for i in range(100)]
+    index = build(monkeypatch, packets)
+
+    assert [index.frame_at(t) for t in index.keyframe_times] == list(index.keyframes)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from effects.visual import Blur, ColorFilter, Crop, EffectChainPlanner, Mirror, Vignette
+
+
+def make_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(72, 128, 3), dtype=np.uint8)
+
+
+def run_unplanned(effects, frame):
+    for effect in effects:
+        frame = effect.apply(frame)
+    return frame
+
+
+CHAINS = [
+    lambda: [ColorFilter(0.5), Crop('9:16')],
+    lambda: [Blur(0.3), ColorFilter(0.7), Crop('1:1'), Mirror(0.2)],
+    lambda: [ColorFilter(0.4), Vignette(0.6), Mirror(0.8), Crop('9:16')],
+    lambda: [Vignette(0.5), ColorFilter(0.3), Blur(0.2), Mirror(0.2)],
+]
+
+
+@pytest.mark.parametrize('make_chain', CHAINS)
+def test_exact_plan_renders_the_same_frames(make_chain):
+    plan = EffectChainPlanner(exact=True).plan(make_chain())
+    planned = plan.apply(make_frame().copy())
+    expected = run_unplanned(make_chain(), make_frame().copy())
+
+    assert planned.shape == expected.shape
+    assert np.array_equal(planned, expected), plan.describe()
+
+
+def test_exact_is_the_default():
+    assert EffectChainPlanner().exact
+
+
+def test_color_filter_moves_after_crop_only_when_approximate():
+    chain = [ColorFilter(0.5), Crop('9:16')]
+    exact = EffectChainPlanner(exact=True).plan(chain).effects
+    approximate = EffectChainPlanner(exact=False).plan(chain).effects
+
+    assert isinstance(exact[0], ColorFilter)
+    assert isinstance(approximate[0], Crop)
+
+
+def test_color_filter_stays_before_face_tracking_crop():
+    chain = [ColorFilter(0.5), Crop('9:16', track_face=True)]
+    assert isinstance(EffectChainPlanner().plan(chain).effects[0], ColorFilter)
+
+
+def test_color_filter_commutes_with_mirror():
+    plan = EffectChainPlanner().plan([ColorFilter(0.5), Mirror(0.2)])
+    assert isinstance(plan.effects[0], Mirror)
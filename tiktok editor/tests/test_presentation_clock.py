@@ -0,0 +1,57 @@
+import pytest
+
+from processors import preview_decoder
+from processors.preview_decoder import PresentationClock
+
+
+@pytest.fixture
+def now(monkeypatch):
+    """Controllable time.monotonic for the clock"""
+    clock_time = [1000.0]
+    monkeypatch.setattr(preview_decoder.time, 'monotonic', lambda: clock_time[0])
+    return clock_time
+
+
+def test_stopped_clock_has_no_due_frame():
+    clock = PresentationClock(30.0, 300)
+    assert not clock.running
+    assert clock.index() is None
+
+
+def test_index_advances_at_fps_and_wraps(now):
+    clock = PresentationClock(10.0, 50)
+    clock.start(45)
+    assert clock.running
+    assert clock.index() == 45
+
+    now[0] += 0.35
+    assert clock.index() == 48
+    now[0] += 0.5
+    assert clock.index() == 3
+
+    clock.stop()
+    assert clock.index() is None
+
+
+def test_index_without_frame_count_does_not_wrap(now):
+    clock = PresentationClock(10.0)
+    clock.start(45)
+    now[0] += 1.0
+    assert clock.index() == 55
+
+
+@pytest.mark.parametrize('index, due, lag', [
+    (10, 15, 5),     # Behind
+    (15, 10, -5),    # Ahead
+    (98, 2, 4),      # Behind across the wrap-around
+    (2, 98, -4),     # Ahead across the wrap-around
+    (0, 50, 50),     # Half the loop away counts as behind
+    (0, 51, -49),
+])
+def test_lag_across_wrap_around(index, due, lag):
+    assert PresentationClock(30.0, 100).lag(index, due) == lag
+
+
+def test_lag_without_frame_count():
+    clock = PresentationClock(30.0)
+    assert clock.lag(98, 2) == -96
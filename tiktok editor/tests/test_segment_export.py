@@ -0,0 +1,123 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from processors import segment_export
+from processors.segment_export import MANIFEST_VERSION, SegmentExporter
+
+SEGMENTS = [(0.0, 30.0), (30.0, 60.0), (60.0, None)]
+
+
+class FakeIndex:
+    keyframe_times = [0.0, 30.0, 60.0]
+
+    def frame_at(self, time):
+        # Variable frame rate: 30 fps for a minute, then 15 fps
+        return int(time * 30) if time <= 60 else 1800 + int((time - 60) * 15)
+
+
+@pytest.fixture
+def render(monkeypatch):
+    """Renders segments in threads with a stub, recording (start, first index, frame count)"""
+    rendered = []
+
+    def fake_render_segment(input_path, output_path, start, end, first_index, max_frames,
+                            effects, settings, decoder_backend='auto', cancel_event=None):
+        rendered.append((start, first_index, max_frames))
+        with open(output_path, 'wb') as f:
+            f.write(b'segment')
+        return 1
+
+    monkeypatch.setattr(segment_export, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(segment_export, '_render_segment', fake_render_segment)
+    monkeypatch.setattr(segment_export, 'get_duration', lambda path: 90.0)
+    monkeypatch.setattr(segment_export, 'get_keyframe_index', lambda path: FakeIndex())
+    monkeypatch.setattr(segment_export, 'plan_segments', lambda *args: list(SEGMENTS))
+    return rendered
+
+
+@pytest.fixture
+def exporter(tmp_path, monkeypatch):
+    exporter = SegmentExporter(str(tmp_path), num_workers=2)
+    joined = []
+    monkeypatch.setattr(exporter, '_concat_segments',
+                        lambda files, list_path, output_path, audio_path=None: joined.append(files))
+    exporter.joined = joined
+    return exporter
+
+
+def write_manifest(workspace, key, done, version=MANIFEST_VERSION):
+    manifest = {
+        'version': version,
+        'key': key,
+        'input': 'input.mp4',
+        'segments': [{'start': start, 'end': end, 'done': d} for (start, end), d in zip(SEGMENTS, done)],
+    }
+    with open(os.path.join(workspace, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+
+
+def segment_file(workspace, i):
+    return os.path.join(workspace, f"segment_{i:04d}.mp4")
+
+
+def test_resume_renders_only_missing_segments(tmp_path, render, exporter):
+    workspace = str(tmp_path / 'workspace')
+    os.makedirs(workspace)
+    write_manifest(workspace, 'key', [True, True, False])
+    with open(segment_file(workspace, 0), 'wb') as f:
+        f.write(b'segment')
+    # Segment 1 is marked done but its file is gone: it must be rendered again
+
+    exporter.export('input.mp4', 'output.mp4', [], workspace=workspace, checkpoint_key='key')
+
+    assert sorted(start for start, _, _ in render) == [30.0, 60.0]
+    assert exporter.joined == [[segment_file(workspace, i) for i in range(3)]]
+    manifest = exporter._load_manifest(workspace, 'key')
+    assert all(entry['done'] for entry in manifest['segments'])
+
+
+def test_resume_keeps_planned_boundaries(tmp_path, render, exporter, monkeypatch):
+    workspace = str(tmp_path / 'workspace')
+    os.makedirs(workspace)
+    write_manifest(workspace, 'key', [True, False, False])
+    with open(segment_file(workspace, 0), 'wb') as f:
+        f.write(b'segment')
+    monkeypatch.setattr(segment_export, 'plan_segments', lambda *args: [(0.0, 45.0), (45.0, None)])
+
+    exporter.export('input.mp4', 'output.mp4', [], workspace=workspace, checkpoint_key='key')
+
+    assert sorted(start for start, _, _ in render) == [30.0, 60.0]
+
+
+@pytest.mark.parametrize('key, version', [('other', MANIFEST_VERSION), ('key', MANIFEST_VERSION + 1)])
+def test_stale_manifest_renders_everything(tmp_path, render, exporter, key, version):
+    workspace = str(tmp_path / 'workspace')
+    os.makedirs(workspace)
+    write_manifest(workspace, key, [True, True, True], version=version)
+    for i in range(3):
+        with open(segment_file(workspace, i), 'wb') as f:
+            f.write(b'old')
+
+    assert exporter._load_manifest(workspace, 'key') is None
+    exporter.export('input.mp4', 'output.mp4', [], workspace=workspace, checkpoint_key='key')
+
+    assert sorted(start for start, _, _ in render) == [0.0, 30.0, 60.0]
+    assert exporter._load_manifest(workspace, 'key')['key'] == 'key'
+
+
+def test_unreadable_manifest_is_ignored(tmp_path, exporter):
+    with open(tmp_path / 'manifest.json', 'w') as f:
+        f.write('{"version": 1, "segm')
+    assert exporter._load_manifest(str(tmp_path), 'key') is None
+
+
+def test_frame_ranges_come_from_the_keyframe_index(tmp_path, render, exporter):
+    workspace = str(tmp_path / 'workspace')
+    os.makedirs(workspace)
+
+    exporter.export('input.mp4', 'output.mp4', [], workspace=workspace, checkpoint_key='key')
+
+    assert sorted(render) == [(0.0, 0, 900), (30.0, 900, 900), (60.0, 1800, None)]
@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+
+from effects.effect_manager import EffectChain, EffectManager
+from render.spec import load_spec
+
+
+def test_saved_preset_loads_as_render_spec(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Presets are saved in the working directory
+    manager = EffectManager()
+    chain = EffectChain(manager)
+    chain.add_effect('Crop', {'ratio': '9:16', 'track_face': True})
+    chain.add_effect('LightBar', {'intensity': 0.4})
+    chain.add_effect('Vignette', {'intensity': 0.6})
+    chain.add_effect('Echo', {'intensity': 0.3})
+
+    # Runtime state that must not end up in the preset
+    vignette = chain.video_effects[2]
+    vignette.get_resource('mask', (8, 8), lambda shape: np.zeros(shape))
+    chain.video_effects[1].apply(np.zeros((8, 8, 3), dtype=np.uint8))
+
+    chain.save_as_preset('portrait')
+    with open(tmp_path / 'presets.json') as f:
+        saved = json.load(f)['portrait']
+
+    assert saved['video'] == [
+        {'name': 'Crop', 'params': {'ratio': '9:16', 'track_face': True}},
+        {'name': 'LightBar', 'params': {'intensity': 0.4}},
+        {'name': 'Vignette', 'params': {'intensity': 0.6}},
+    ]
+    spec = load_spec('portrait', manager)
+    video, audio = spec.build_effects(manager)
+    assert [type(effect).__name__ for effect in video] == ['Crop', 'LightBar', 'Vignette']
+    assert [type(effect).__name__ for effect in audio] == ['Echo']
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from render.watch import FileSettler
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / 'clip.mp4'
+    path.write_bytes(b'x' * 10)
+    return str(path)
+
+
+def test_file_is_ready_once_unchanged_for_settle_time(video):
+    settler = FileSettler(settle_time=3.0)
+    settler.touch(video, 100.0)
+
+    assert settler.ready(102.9) == []
+    assert settler.waiting == 1
+    assert settler.ready(103.0) == [video]
+    # Handed out once, then forgotten
+    assert settler.waiting == 0
+    assert settler.ready(110.0) == []
+
+
+def test_growing_file_restarts_the_wait(video):
+    settler = FileSettler(settle_time=3.0)
+    settler.touch(video, 100.0)
+    with open(video, 'ab') as f:
+        f.write(b'more')
+
+    # ready() re-checks the file, the size changed at 102
+    assert settler.ready(102.0) == []
+    assert settler.ready(104.9) == []
+    assert settler.ready(105.0) == [video]
+
+
+def test_touched_file_restarts_the_wait(video):
+    settler = FileSettler(settle_time=3.0)
+    settler.touch(video, 100.0)
+    stat = os.stat(video)
+    os.utime(video, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    settler.touch(video, 102.0)
+    assert settler.ready(104.0) == []
+    assert settler.ready(105.0) == [video]
+
+
+def test_empty_file_is_not_ready(tmp_path):
+    path = str(tmp_path / 'empty.mp4')
+    open(path, 'wb').close()
+    settler = FileSettler(settle_time=1.0)
+    settler.touch(path, 100.0)
+
+    assert settler.ready(200.0) == []
+    assert settler.waiting == 1
+
+
+def test_deleted_file_is_forgotten(video):
+    settler = FileSettler(settle_time=1.0)
+    settler.touch(video, 100.0)
+    os.remove(video)
+
+    assert settler.ready(200.0) == []
+    assert settler.waiting == 0
+
+
+def test_oldest_settled_file_comes_first(tmp_path):
+    first, second = str(tmp_path / 'a.mp4'), str(tmp_path / 'b.mp4')
+    for path in (second, first):
+        with open(path, 'wb') as f:
+            f.write(b'x')
+    settler = FileSettler(settle_time=1.0)
+    settler.touch(second, 100.0)
+    settler.touch(first, 101.0)
+
+    assert settler.ready(105.0) == [second, first]
@@ -1,3 +1,9 @@
-from .gpu_utils import get_device, get_optimal_thread_count, frame_to_gpu, frame_to_cpu
-
 __all__ = ['get_device', 'get_optimal_thread_count', 'frame_to_gpu', 'frame_to_cpu']
+
+
+def __getattr__(name):
+    # Loaded on first use so importing a utils submodule stays cheap
+    if name in __all__:
+        from . import gpu_utils
+        return getattr(gpu_utils, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,48 @@
+import os
+import json
+import hashlib
+
+# Bytes hashed at the start, middle and end of a file
+SAMPLE_SIZE = 1024 * 1024
+
+
+def file_fingerprint(path: str, sample_size: int = SAMPLE_SIZE) -> str:
+    """Identify a media file by its content.
+
+    Hashes the size plus samples from the start, middle and end, so it stays
+    fast on large videos and does not change when the file is copied or
+    touched (no path or mtime involved).
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+
+    with open(path, 'rb') as f:
+        if size <= sample_size * 3:
+            digest.update(f.read())
+        else:
+            for offset in (0, (size - sample_size) // 2, size - sample_size):
+                f.seek(offset)
+                digest.update(f.read(sample_size))
+
+    return digest.hexdigest()
+
+
+def cache_dir(*parts: str) -> str:
+    """Directory for derived data (created if needed).
+
+    Defaults to ``cache`` in the working directory, next to ``temp``; set
+    TIKTOK_EDITOR_CACHE to move it.
+    """
+    root = os.environ.get('TIKTOK_EDITOR_CACHE') or os.path.join(os.getcwd(), 'cache')
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def chain_signature(effects: list) -> str:
+    """Hash of an effect chain: effect classes, order and parameters"""
+    chain = [
+        [type(effect).__name__, effect.params() if hasattr(effect, 'params') else vars(effect)]
+        for effect in effects
+    ]
+    return hashlib.sha1(json.dumps(chain, sort_keys=True, default=str).encode()).hexdigest()
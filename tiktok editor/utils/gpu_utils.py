@@ -1,6 +1,9 @@
-import torch
 import cv2
 import multiprocessing
+from .lazy_import import lazy_import
+
+# Importing torch takes seconds, only do it when a GPU question is asked
+torch = lazy_import('torch')
 
 def get_device():
     if torch.cuda.is_available():
@@ -15,6 +18,13 @@ def frame_to_gpu(frame):
         return cv2.cuda_GpuMat(frame)
     return frame
 
+def opencv_cuda_available():
+    """True when OpenCV was built with CUDA and sees a device (no torch import)"""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
 def frame_to_cpu(frame):
     if torch.cuda.is_available() and isinstance(frame, cv2.cuda_GpuMat):
         return frame.download()
@@ -0,0 +1,145 @@
+import json
+import subprocess
+from typing import List, Optional, Dict, Any, Tuple
+
+
+def _run_ffprobe(args: List[str]) -> Dict[str, Any]:
+    """Run ffprobe with JSON output and return the parsed result"""
+    command = ['ffprobe', '-v', 'error', '-of', 'json'] + args
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFprobe error: {result.stderr}")
+    return json.loads(result.stdout or '{}')
+
+
+def get_duration(path: str) -> float:
+    """Get media duration in seconds"""
+    info = _run_ffprobe(['-show_entries', 'format=duration', path])
+    try:
+        return float(info['format']['duration'])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+def _parse_rate(rate: str) -> float:
+    """Parse an FFmpeg rational such as '30000/1001'"""
+    try:
+        num, _, den = rate.partition('/')
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _get_rotation(video: Dict[str, Any]) -> int:
+    """Display rotation of a probed stream, in degrees (0, 90, 180 or 270)"""
+    rotation = 0.0
+    for side_data in video.get('side_data_list') or []:
+        if 'rotation' in side_data:
+            rotation = side_data['rotation']
+            break
+    else:
+        rotation = (video.get('tags') or {}).get('rotate', 0)
+    try:
+        return int(round(float(rotation) / 90.0)) * 90 % 360
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_video_info(path: str, stream: str = 'v:0') -> Dict[str, Any]:
+    """Get width, height, fps, frame count and duration of a video stream.
+
+    Width and height are those of the displayed picture: FFmpeg autorotates
+    on decode, so they are swapped for streams tagged with a 90 or 270
+    degree rotation (portrait phone footage).
+    """
+    info = _run_ffprobe([
+        '-select_streams', stream,
+        '-show_entries',
+        'stream=width,height,avg_frame_rate,r_frame_rate,nb_frames,duration:'
+        'stream_tags=rotate:stream_side_data=rotation:format=duration',
+        path
+    ])
+    streams = info.get('streams') or [{}]
+    video = streams[0]
+    width, height = int(video.get('width') or 0), int(video.get('height') or 0)
+    rotation = _get_rotation(video)
+    if rotation in (90, 270):
+        width, height = height, width
+
+    fps = _parse_rate(video.get('avg_frame_rate', '')) or _parse_rate(video.get('r_frame_rate', ''))
+    try:
+        duration = float(video.get('duration') or info.get('format', {}).get('duration') or 0)
+    except ValueError:
+        duration = 0.0
+    try:
+        frame_count = int(video.get('nb_frames') or 0)
+    except ValueError:
+        frame_count = 0
+    if not frame_count and fps and duration:
+        frame_count = int(round(duration * fps))
+
+    return {
+        'width': width,
+        'height': height,
+        'rotation': rotation,
+        'fps': fps,
+        'frame_count': frame_count,
+        'duration': duration,
+    }
+
+
+def has_audio(path: str) -> bool:
+    """Whether the file has at least one audio stream"""
+    info = _run_ffprobe(['-select_streams', 'a', '-show_entries', 'stream=index', path])
+    return bool(info.get('streams'))
+
+
+def get_video_packets(path: str, stream: str = 'v:0') -> List[Tuple[float, bool]]:
+    """(pts in seconds, is keyframe) of every packet of a video stream, in file order.
+
+    Reads the packet list only, so no frame is decoded. Packets without a
+    timestamp are left out.
+    """
+    info = _run_ffprobe([
+        '-select_streams', stream,
+        '-show_entries', 'packet=pts_time,flags',
+        path
+    ])
+    packets = []
+    for packet in info.get('packets', []):
+        try:
+            packets.append((float(packet['pts_time']), 'K' in packet.get('flags', '')))
+        except (KeyError, ValueError):
+            continue
+    return packets
+
+
+def get_keyframe_times(path: str, stream: str = 'v:0') -> List[float]:
+    """List keyframe timestamps (seconds) of a video stream"""
+    return sorted({pts for pts, keyframe in get_video_packets(path, stream) if keyframe})
+
+
+def plan_segments(duration: float, keyframes: List[float], num_segments: int,
+                  min_length: float = 5.0) -> List[tuple]:
+    """Split [0, duration) into ``num_segments`` ranges cut on keyframes.
+
+    Every boundary is snapped to the nearest keyframe so each segment can be
+    decoded on its own. Returns a list of ``(start, end)`` tuples; the last
+    segment ends at ``None`` (end of stream).
+    """
+    if duration <= 0 or num_segments <= 1 or not keyframes:
+        return [(0.0, None)]
+
+    num_segments = max(1, min(num_segments, int(duration // min_length)))
+    boundaries = [0.0]
+    for i in range(1, num_segments):
+        ideal = duration * i / num_segments
+        nearest = min(keyframes, key=lambda t: abs(t - ideal))
+        if nearest - boundaries[-1] >= min_length and duration - nearest >= min_length:
+            boundaries.append(nearest)
+
+    segments = []
+    for i, start in enumerate(boundaries):
+        end: Optional[float] = boundaries[i + 1] if i + 1 < len(boundaries) else None
+        segments.append((start, end))
+    return segments
@@ -1,10 +1,12 @@
 import cv2
 import numpy as np
-import librosa
 import soundfile as sf
 import tempfile
 import os
 from concurrent.futures import ThreadPoolExecutor
+from .lazy_import import lazy_import
+
+librosa = lazy_import('librosa')
 
 class MediaProcessor:
     def __init__(self):
@@ -0,0 +1,105 @@
+import sys
+import time
+from importlib.abc import MetaPathFinder
+from typing import Dict, List, Optional, Tuple
+
+
+class _TimedLoader:
+    """Wraps a module loader to time ``exec_module``"""
+
+    def __init__(self, loader, name: str, profiler: 'StartupProfiler'):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(self._name)
+
+
+class _TimingFinder(MetaPathFinder):
+    def __init__(self, profiler: 'StartupProfiler'):
+        self.profiler = profiler
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, name, self.profiler)
+                return spec
+        return None
+
+
+class StartupProfiler:
+    """Import-time breakdown for ``main.py --profile-startup``.
+
+    Times every module imported after ``install()``: inclusive time of each
+    top-level import (what the application asked for) and self time of the
+    slowest individual modules, plus named checkpoints such as the first
+    window being shown.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.self_times: Dict[str, float] = {}
+        self.top_level: List[Tuple[str, float]] = []
+        self.marks: List[Tuple[str, float]] = []
+        self._stack: List[List] = []  # [name, start, child time]
+        self._finder: Optional[_TimingFinder] = None
+
+    def install(self):
+        if self._finder is None:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    def _enter(self, name: str):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name: str):
+        _, started, children = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.self_times[name] = self.self_times.get(name, 0.0) + elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        else:
+            self.top_level.append((name, elapsed))
+
+    def mark(self, label: str):
+        """Record a checkpoint (seconds since the profiler was created)"""
+        self.marks.append((label, time.perf_counter() - self.start))
+
+    def report(self, limit: int = 15) -> str:
+        lines = ["Startup profile", "", "Top-level imports (inclusive):"]
+        by_package: Dict[str, float] = {}
+        for name, elapsed in self.top_level:
+            package = name.split('.')[0]
+            by_package[package] = by_package.get(package, 0.0) + elapsed
+        for package, elapsed in sorted(by_package.items(), key=lambda item: -item[1])[:limit]:
+            lines.append(f"  {elapsed * 1000:8.1f} ms  {package}")
+
+        lines += ["", "Slowest modules (self):"]
+        for name, elapsed in sorted(self.self_times.items(), key=lambda item: -item[1])[:limit]:
+            lines.append(f"  {elapsed * 1000:8.1f} ms  {name}")
+
+        if self.marks:
+            lines += ["", "Checkpoints:"]
+            for label, elapsed in self.marks:
+                lines.append(f"  {elapsed * 1000:8.1f} ms  {label}")
+        return "\n".join(lines)